@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Measures Endpoint.client_authentication for different client authentication methods.
+
+Compares trying every allowed method that is usable, in order, until one succeeds (what
+verify_client used to do) with the per endpoint dispatch table, which picks the
+methods to try from the shape of the request.
+
+Usage: python benchmark/client_authentication.py
+"""
+import base64
+import timeit
+
+from cryptojwt import JWT
+from cryptojwt import KeyJar
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.defaults import JWT_BEARER
+from idpyoidc.server import Server
+from idpyoidc.server.client_authn import ClientAuthnDispatch
+from idpyoidc.server.client_authn import verify_client
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oidc.token import Token
+
+ISSUER = "https://example.com/"
+CLIENT_ID = "client_1"
+CLIENT_SECRET = "hemligt_hemligt_hemligt"
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+NUMBER = 1000
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+        "iterations": 1,
+    }
+}
+
+CONF = {
+    "issuer": ISSUER,
+    "httpc_params": {"verify": False, "timeout": 1},
+    "keys": {"key_defs": KEYDEFS},
+    "token_handler_args": {"code": {"kwargs": {"crypt_conf": CRYPT_CONFIG}}},
+    "endpoint": {
+        "token": {
+            "path": "token",
+            "class": Token,
+            "kwargs": {
+                "client_authn_method": [
+                    "private_key_jwt",
+                    "client_secret_jwt",
+                    "client_secret_post",
+                    "client_secret_basic",
+                ]
+            },
+        },
+    },
+    "client_authn": verify_client,
+    "template_dir": "template",
+}
+
+
+class LinearDispatch(ClientAuthnDispatch):
+    """Asks every method whether it is usable, every time."""
+
+    def candidates(self, methods, request=None, authorization_token=None):
+        return [
+            _method
+            for _method in methods
+            if _method.is_usable(request=request, authorization_token=authorization_token)
+        ]
+
+
+def setup():
+    server = Server(OPConfiguration(conf=CONF, base_path="."), cwd=".")
+    server.context.cdb[CLIENT_ID] = {"client_id": CLIENT_ID, "client_secret": CLIENT_SECRET}
+
+    # The client's own keys, for private_key_jwt
+    client_keyjar = build_keyjar(KEYDEFS, issuer_id="")
+    server.keyjar.import_jwks(client_keyjar.export_jwks(), CLIENT_ID)
+    server.keyjar.add_symmetric(CLIENT_ID, CLIENT_SECRET, ["sig"])
+    client_keyjar.add_symmetric("", CLIENT_SECRET, ["sig"])
+    return server, client_keyjar
+
+
+def requests(endpoint, client_keyjar):
+    _aud = [endpoint.full_path]
+    _basic = base64.b64encode(f"{CLIENT_ID}:{CLIENT_SECRET}".encode()).decode()
+    _private_key_jwt = JWT(client_keyjar, iss=CLIENT_ID, sign_alg="ES256").pack({"aud": _aud})
+    _hmac_keyjar = KeyJar()
+    _hmac_keyjar.add_symmetric("", CLIENT_SECRET, ["sig"])
+    _client_secret_jwt = JWT(_hmac_keyjar, iss=CLIENT_ID, sign_alg="HS256").pack({"aud": _aud})
+    return {
+        "client_secret_basic": ({}, {"headers": {"authorization": f"Basic {_basic}"}}),
+        "client_secret_post": ({"client_id": CLIENT_ID, "client_secret": CLIENT_SECRET}, None),
+        "private_key_jwt": (
+            {"client_assertion": _private_key_jwt, "client_assertion_type": JWT_BEARER},
+            None,
+        ),
+        "client_secret_jwt": (
+            {"client_assertion": _client_secret_jwt, "client_assertion_type": JWT_BEARER},
+            None,
+        ),
+    }
+
+
+def best(func):
+    return min(timeit.repeat(func, number=NUMBER, repeat=5))
+
+
+def run():
+    server, client_keyjar = setup()
+    endpoint = server.get_endpoint("token")
+
+    print(f"{'method':>20} {'linear/s':>10} {'dispatch/s':>11}")
+    for method, (request, http_info) in requests(endpoint, client_keyjar).items():
+
+        def authenticate():
+            _res = endpoint.client_authentication(dict(request), http_info=http_info)
+            assert _res["method"] == method
+
+        endpoint.client_authn_dispatch = LinearDispatch()
+        _linear = best(authenticate)
+        endpoint.client_authn_dispatch = ClientAuthnDispatch()
+        _dispatch = best(authenticate)
+        print(f"{method:>20} {NUMBER / _linear:>10.0f} {NUMBER / _dispatch:>11.0f}")
+
+
+if __name__ == "__main__":
+    run()
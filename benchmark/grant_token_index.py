@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Measures the cost of token lookups in a Grant as the number of issued tokens grows.
+
+With the token index in place the cost of get_token, last_issued_token_of_type and
+revoke_token should stay flat, while a linear scan of issued_token grows with the size
+of the grant.
+
+Usage: python benchmark/grant_token_index.py
+"""
+import timeit
+
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.token import AccessToken
+from idpyoidc.server.session.token import RefreshToken
+
+SIZES = [10, 100, 1000, 10000]
+ROUNDS = 2000
+
+
+def build_grant(size):
+    grant = Grant()
+    based_on = None
+    for n in range(size):
+        if n % 2:
+            token = AccessToken("access_token", value=f"AT{n}", based_on=based_on)
+        else:
+            token = RefreshToken("refresh_token", value=f"RT{n}", based_on=based_on)
+            based_on = token.value
+        grant.add_issued_token(token)
+    return grant
+
+
+def linear_get_token(grant, value):
+    for t in grant.issued_token:
+        if t.value == value:
+            return t
+    return None
+
+
+def run():
+    print(f"{'tokens':>8} {'scan (us)':>12} {'get_token (us)':>16} {'last_of_type (us)':>18}")
+    for size in SIZES:
+        grant = build_grant(size)
+        # look for the token farthest from the head of the list
+        value = grant.issued_token[-1].value
+
+        _scan = timeit.timeit(lambda: linear_get_token(grant, value), number=ROUNDS)
+        _get = timeit.timeit(lambda: grant.get_token(value), number=ROUNDS)
+        _last = timeit.timeit(
+            lambda: grant.last_issued_token_of_type("access_token"), number=ROUNDS
+        )
+        print(
+            f"{size:>8} {_scan / ROUNDS * 1e6:>12.2f} {_get / ROUNDS * 1e6:>16.2f} "
+            f"{_last / ROUNDS * 1e6:>18.2f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measures mint and verify throughput of JWT access tokens.
+
+Compares building a new cryptojwt.JWT, and looking up keys, for every token (what
+JWTToken used to do) with the signers/verifiers and keys cached by JWTToken.
+
+Usage: python benchmark/jwt_token_sign_verify.py
+"""
+import timeit
+
+from cryptojwt import JWT
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.server.token.jwt_token import JWTToken
+
+ISSUER = "https://example.com/op"
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+ROUNDS = 1000
+PAYLOAD = {"sid": "session_id", "token_class": "access_token", "sub": "diana"}
+
+
+class Context(object):
+    issuer = ISSUER
+    cdb = {}
+
+
+def make_upstream_get(keyjar):
+    _context = Context()
+
+    def upstream_get(what, *args):
+        if what == "context":
+            return _context
+        elif what == "attribute" and args[0] == "keyjar":
+            return keyjar
+
+    return upstream_get
+
+
+class UncachedJWTToken(JWTToken):
+    """Builds a new JWT, which looks up the keys again, for every token."""
+
+    def get_signer(self, lifetime, with_jti=False):
+        _keyjar = self.upstream_get("attribute", "keyjar")
+        _signer = JWT(key_jar=_keyjar, iss=self.issuer, lifetime=lifetime, sign_alg=self.alg)
+        _signer.with_jti = with_jti
+        return _signer
+
+    def get_verifier(self):
+        _keyjar = self.upstream_get("attribute", "keyjar")
+        return JWT(key_jar=_keyjar, allowed_sign_algs=[self.alg])
+
+
+def best(func):
+    return min(timeit.repeat(func, number=ROUNDS, repeat=5))
+
+
+def run():
+    keyjar = build_keyjar(KEYDEFS)
+    # Same as the server, the keys are also stored under the issuer ID
+    keyjar.import_jwks(keyjar.export_jwks(private=True), ISSUER)
+    upstream_get = make_upstream_get(keyjar)
+
+    print(f"{'alg':>6} {'':>10} {'mint/s':>10} {'verify/s':>10}")
+    for alg in ["ES256", "RS256"]:
+        for name, cls in [("uncached", UncachedJWTToken), ("cached", JWTToken)]:
+            handler = cls("access_token", alg=alg, lifetime=3600, upstream_get=upstream_get)
+            token = handler("session_id", **PAYLOAD)
+
+            _mint = best(lambda: handler("session_id", **PAYLOAD))
+            _verify = best(lambda: handler.get_payload(token))
+            print(f"{alg:>6} {name:>10} {ROUNDS / _mint:>10.0f} {ROUNDS / _verify:>10.0f}")
+
+
+if __name__ == "__main__":
+    run()
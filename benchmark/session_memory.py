@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measures the memory used per token, per session node and per grant.
+
+Compares the ordinary token classes with the compact ones (shared empty values, interned
+scope and resources, shared usage rules). Run it on different versions of the code to
+compare before and after.
+
+Usage: python benchmark/session_memory.py
+"""
+import tracemalloc
+from uuid import uuid4
+
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.info import ClientSessionInfo
+from idpyoidc.server.session.token import AccessToken
+from idpyoidc.server.session.token import AuthorizationCode
+from idpyoidc.server.session.token import RefreshToken
+
+try:
+    from idpyoidc.server.session.token import CompactAccessToken
+    from idpyoidc.server.session.token import CompactAuthorizationCode
+    from idpyoidc.server.session.token import CompactRefreshToken
+except ImportError:  # Older version
+    CompactAccessToken = CompactAuthorizationCode = CompactRefreshToken = None
+
+NUMBER = 20000
+SCOPE = ["openid", "profile", "email"]
+USAGE_RULES = {"supports_minting": ["access_token", "refresh_token"], "expires_in": 3600}
+
+
+def bytes_per_item(factory, number=NUMBER):
+    """Average number of bytes allocated per created item."""
+    tracemalloc.start()
+    _before = tracemalloc.get_traced_memory()[0]
+    _items = [factory(n) for n in range(number)]
+    _after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(_items) == number
+    return (_after - _before) / number
+
+
+def token_factory(cls):
+    def _factory(n):
+        return cls(
+            token_class="access_token",
+            value=f"{uuid4().hex}{n}",
+            based_on="CODE",
+            scope=list(SCOPE),
+            usage_rules=dict(USAGE_RULES),
+            expires_in=3600,
+        )
+
+    return _factory
+
+
+def run():
+    print(f"{'class':>28} {'bytes/item':>12}")
+    for cls in [
+        AuthorizationCode,
+        CompactAuthorizationCode,
+        AccessToken,
+        CompactAccessToken,
+        RefreshToken,
+        CompactRefreshToken,
+    ]:
+        if cls is None:
+            continue
+        print(f"{cls.__name__:>28} {bytes_per_item(token_factory(cls)):>12.0f}")
+
+    _node = bytes_per_item(lambda n: ClientSessionInfo(f"client_{n}", subordinate=[f"G{n}"]))
+    print(f"{'ClientSessionInfo':>28} {_node:>12.0f}")
+    _grant = bytes_per_item(lambda n: Grant(scope=list(SCOPE)), number=NUMBER // 10)
+    print(f"{'Grant':>28} {_grant:>12.0f}")
+
+
+if __name__ == "__main__":
+    run()
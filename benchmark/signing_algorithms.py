@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compares the cost of minting and verifying JWT access tokens, and verifying them the way a
+client or resource server does with a fresh cryptojwt.JWT, for different signing algorithms.
+
+Usage: python benchmark/signing_algorithms.py
+"""
+import timeit
+
+from cryptojwt import JWT
+from cryptojwt import KeyJar
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.server.token.jwt_token import JWTToken
+
+ISSUER = "https://example.com/op"
+KEYDEFS = {
+    "RS256": {"type": "RSA", "key": "", "use": ["sig"]},
+    "PS256": {"type": "RSA", "key": "", "use": ["sig"]},
+    "ES256": {"type": "EC", "crv": "P-256", "use": ["sig"]},
+    "EdDSA": {"type": "OKP", "crv": "Ed25519", "use": ["sig"]},
+}
+ROUNDS = 1000
+PAYLOAD = {"sid": "session_id", "token_class": "access_token", "sub": "diana"}
+
+
+class Context(object):
+    issuer = ISSUER
+    cdb = {}
+
+
+def make_upstream_get(keyjar):
+    _context = Context()
+
+    def upstream_get(what, *args):
+        if what == "context":
+            return _context
+        elif what == "attribute" and args[0] == "keyjar":
+            return keyjar
+
+    return upstream_get
+
+
+def best(func):
+    return min(timeit.repeat(func, number=ROUNDS, repeat=5))
+
+
+def run():
+    print(f"{'alg':>6} {'mint/s':>10} {'verify/s':>10} {'client/s':>10} {'length':>7}")
+    for alg, key_def in KEYDEFS.items():
+        keyjar = build_keyjar([key_def])
+        # Same as the server, the keys are also stored under the issuer ID
+        keyjar.import_jwks(keyjar.export_jwks(private=True), ISSUER)
+        # The client only has the public keys
+        client_keyjar = KeyJar()
+        client_keyjar.import_jwks(keyjar.export_jwks(), ISSUER)
+
+        handler = JWTToken(
+            "access_token", alg=alg, lifetime=3600, upstream_get=make_upstream_get(keyjar)
+        )
+        token = handler("session_id", **PAYLOAD)
+
+        def client_verify():
+            JWT(key_jar=client_keyjar, allowed_sign_algs=[alg]).unpack(token)
+
+        _mint = best(lambda: handler("session_id", **PAYLOAD))
+        _verify = best(lambda: handler.get_payload(token))
+        _client = best(client_verify)
+        print(
+            f"{alg:>6} {ROUNDS / _mint:>10.0f} {ROUNDS / _verify:>10.0f} "
+            f"{ROUNDS / _client:>10.0f} {len(token):>7}"
+        )
+
+
+if __name__ == "__main__":
+    run()
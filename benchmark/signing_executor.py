@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Measures the throughput of minting JWT access tokens with the different signing
+executors.
+
+Tokens are minted through JWTToken.submit in batches, like the tokens minted together
+by Grant.mint_tokens or the logout tokens sent when a user logs out of all clients, and
+the executor is expected to use more than one core while doing so. "call" is minting
+the same batches one at a time by calling the token handler. The number of cores
+available puts an upper limit on how much a pool can help.
+
+Usage: python benchmark/signing_executor.py [number of workers]
+"""
+import os
+import sys
+import time
+
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.server.signing_executor import ProcessSigningExecutor
+from idpyoidc.server.signing_executor import SigningExecutor
+from idpyoidc.server.signing_executor import ThreadSigningExecutor
+from idpyoidc.server.token.jwt_token import JWTToken
+
+ISSUER = "https://example.com/op"
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+BATCH = 32
+BATCHES = 20
+PAYLOAD = {"sub": "diana", "scope": ["openid", "email"], "client_id": "client_1"}
+
+
+class Context(object):
+    issuer = ISSUER
+    cdb = {}
+    signing_executor = None
+
+
+def make_upstream_get(keyjar, context):
+    def upstream_get(what, *args):
+        if what == "context":
+            return context
+        elif what == "attribute" and args[0] == "keyjar":
+            return keyjar
+
+    return upstream_get
+
+
+def throughput(handler) -> float:
+    # Warm up, worker processes and threads are started lazily.
+    for _future in [handler.submit("session_id", **PAYLOAD) for _ in range(BATCH)]:
+        _future.result()
+
+    _start = time.perf_counter()
+    for _ in range(BATCHES):
+        _futures = [handler.submit("session_id", **PAYLOAD) for _ in range(BATCH)]
+        for _future in _futures:
+            _future.result()
+    return BATCH * BATCHES / (time.perf_counter() - _start)
+
+
+def call_throughput(handler) -> float:
+    _start = time.perf_counter()
+    for _ in range(BATCHES * BATCH):
+        handler("session_id", **PAYLOAD)
+    return BATCH * BATCHES / (time.perf_counter() - _start)
+
+
+def run(workers: int):
+    keyjar = build_keyjar(KEYDEFS)
+    keyjar.import_jwks(keyjar.export_jwks(private=True), ISSUER)
+    context = Context()
+
+    print(f"{os.cpu_count()} cores, {workers} workers")
+    print(f"{'alg':>6} {'executor':>10} {'tokens/s':>10}")
+    for alg in ["RS256", "ES256"]:
+        handler = JWTToken(
+            "access_token", alg=alg, lifetime=300, upstream_get=make_upstream_get(keyjar, context)
+        )
+        print(f"{alg:>6} {'call':>10} {call_throughput(handler):>10.0f}")
+        for name, cls in [
+            ("inline", SigningExecutor),
+            ("thread", ThreadSigningExecutor),
+            ("process", ProcessSigningExecutor),
+        ]:
+            context.signing_executor = cls(max_workers=workers)
+            print(f"{alg:>6} {name:>10} {throughput(handler):>10.0f}")
+            context.signing_executor.shutdown()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Measures the full code to token exchange at the OpenID Connect token endpoint.
+
+Every request is parsed and processed, an access token, a refresh token and an ID token
+are minted. Also counts how many times the user info backend is called per request.
+Run it on different versions of the code to compare before and after.
+
+Usage: python benchmark/token_endpoint.py
+"""
+import time
+
+from idpyoidc.message.oidc import AccessTokenRequest
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.authz import AuthzHandling
+from idpyoidc.server.client_authn import verify_client
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from idpyoidc.server.user_info import UserInfo
+from idpyoidc.time_util import utc_time_sans_frac
+
+NUMBER = 300
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+        "iterations": 1,
+    }
+}
+USERS = {
+    "diana": {
+        "sub": "diana",
+        "name": "Diana Krall",
+        "given_name": "Diana",
+        "family_name": "Krall",
+        "nickname": "Dina",
+        "email": "diana@example.org",
+        "email_verified": False,
+        "phone_number": "+46907865000",
+    }
+}
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid", "profile", "email", "offline_access"],
+    state="STATE",
+    response_type="code",
+    nonce="NONCE",
+)
+
+CONF = {
+    "issuer": "https://example.com/",
+    "httpc_params": {"verify": False, "timeout": 1},
+    "keys": {"key_defs": KEYDEFS},
+    "token_handler_args": {
+        "code": {"lifetime": 600, "kwargs": {"crypt_conf": CRYPT_CONFIG}},
+        "token": {
+            "class": "idpyoidc.server.token.jwt_token.JWTToken",
+            "kwargs": {"lifetime": 3600, "add_claims_by_scope": True},
+        },
+        "refresh": {
+            "class": "idpyoidc.server.token.jwt_token.JWTToken",
+            "kwargs": {"lifetime": 86400},
+        },
+        "id_token": {
+            "class": "idpyoidc.server.token.id_token.IDToken",
+            "kwargs": {"add_claims_by_scope": True},
+        },
+    },
+    "endpoint": {
+        "token": {
+            "path": "token",
+            "class": Token,
+            "kwargs": {"client_authn_method": ["client_secret_post"]},
+        },
+    },
+    "authentication": {
+        "anon": {
+            "acr": INTERNETPROTOCOLPASSWORD,
+            "class": "idpyoidc.server.user_authn.user.NoAuthn",
+            "kwargs": {"user": "diana"},
+        }
+    },
+    "userinfo": {"class": UserInfo, "kwargs": {"db": {}}},
+    "client_authn": verify_client,
+    "template_dir": "template",
+    "authz": {
+        "class": AuthzHandling,
+        "kwargs": {
+            "grant_config": {
+                "usage_rules": {
+                    "authorization_code": {
+                        "expires_in": 300,
+                        "supports_minting": ["access_token", "refresh_token", "id_token"],
+                        "max_usage": 1,
+                    },
+                    "access_token": {"expires_in": 600},
+                    "refresh_token": {
+                        "expires_in": 86400,
+                        "supports_minting": ["access_token", "refresh_token"],
+                    },
+                },
+                "expires_in": 43200,
+            }
+        },
+    },
+    "session_params": {"encrypter": CRYPT_CONFIG},
+}
+
+
+class CountingUserInfo(UserInfo):
+    calls = 0
+
+    def __call__(self, *args, **kwargs):
+        CountingUserInfo.calls += 1
+        return UserInfo.__call__(self, *args, **kwargs)
+
+
+def setup():
+    server = Server(OPConfiguration(conf=CONF, base_path="."), cwd=".")
+    context = server.context
+    context.cdb["client_1"] = {
+        "client_secret": "hemligt",
+        "redirect_uris": [("https://example.com/cb", None)],
+        "client_salt": "salted",
+        "token_endpoint_auth_method": "client_secret_post",
+        "response_types": ["code"],
+        "allowed_scopes": ["openid", "profile", "email", "offline_access"],
+    }
+    context.userinfo = CountingUserInfo(USERS)
+    return server
+
+
+def create_code(server):
+    context = server.context
+    _mngr = context.session_manager
+    session_id = _mngr.create_session(
+        create_authn_event("diana"), AUTH_REQ, "diana", client_id="client_1"
+    )
+    grant = _mngr[session_id]
+    code = grant.mint_token(
+        session_id=session_id,
+        context=context,
+        token_class="authorization_code",
+        token_handler=_mngr.token_handler["authorization_code"],
+        usage_rules=grant.usage_rules.get("authorization_code", {}),
+    )
+    code.expires_at = utc_time_sans_frac() + 300
+    return code.value
+
+
+def run():
+    server = setup()
+    endpoint = server.get_endpoint("token")
+    codes = [create_code(server) for _ in range(NUMBER)]
+
+    CountingUserInfo.calls = 0
+    _start = time.perf_counter()
+    for code in codes:
+        _req = endpoint.parse_request(
+            AccessTokenRequest(
+                client_id="client_1",
+                client_secret="hemligt",
+                redirect_uri="https://example.com/cb",
+                grant_type="authorization_code",
+                code=code,
+            ).to_dict()
+        )
+        _resp = endpoint.process_request(request=_req)
+        assert "id_token" in _resp["response_args"]
+        assert "refresh_token" in _resp["response_args"]
+    _time = time.perf_counter() - _start
+
+    print(f"{'requests/s':>12} {'ms/request':>12} {'userinfo calls/request':>24}")
+    print(
+        f"{NUMBER / _time:>12.0f} {_time / NUMBER * 1000:>12.2f} "
+        f"{CountingUserInfo.calls / NUMBER:>24.1f}"
+    )
+
+
+if __name__ == "__main__":
+    run()
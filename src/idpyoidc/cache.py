@@ -0,0 +1,99 @@
+"""A small, thread safe, size and time bounded least recently used cache."""
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Optional
+
+from idpyoidc.time_util import utc_time_sans_frac
+
+
+class LRUCache(object):
+    def __init__(self, max_size: Optional[int] = 1024, ttl: Optional[int] = 0):
+        """
+        :param max_size: Max number of entries in the cache. 0 means caching is disabled.
+        :param ttl: Default number of seconds an entry is valid. 0 means no time limit.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._db = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            try:
+                value, expires_at = self._db[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires_at and utc_time_sans_frac() > expires_at:
+                del self._db[key]
+                self.misses += 1
+                return default
+
+            self._db.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any, expires_at: Optional[int] = 0):
+        """
+        Add an entry to the cache.
+
+        :param key: The key
+        :param value: The value
+        :param expires_at: When the entry expires. If not given the default ttl is used.
+        """
+        if not self.max_size:
+            return
+
+        if not expires_at and self.ttl:
+            expires_at = utc_time_sans_frac() + self.ttl
+
+        with self._lock:
+            self._db[key] = (value, expires_at)
+            self._db.move_to_end(key)
+            while len(self._db) > self.max_size:
+                self._db.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Any):
+        with self._lock:
+            self._db.pop(key, None)
+
+    def delete_if(self, func: Callable) -> int:
+        """
+        Remove all entries whose value matches a condition.
+
+        :param func: Called with the value, should return True if the entry is to be removed
+        :return: Number of removed entries
+        """
+        with self._lock:
+            _keys = [k for k, (v, _) in self._db.items() if func(v)]
+            for k in _keys:
+                del self._db[k]
+        return len(_keys)
+
+    def clear(self):
+        with self._lock:
+            self._db.clear()
+
+    def stats(self) -> dict:
+        _lookups = self.hits + self.misses
+        return {
+            "size": len(self._db),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / _lookups if _lookups else 0.0,
+        }
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._db
+
+    def __len__(self) -> int:
+        return len(self._db)
@@ -217,7 +217,7 @@ class Claims(ImpExp):
             return _val
 
 
-SIGNING_ALGORITHM_SORT_ORDER = ["RS", "ES", "PS", "HS"]
+SIGNING_ALGORITHM_SORT_ORDER = ["RS", "ES", "PS", "Ed", "HS"]
 
 
 def cmp(a, b):
@@ -59,6 +59,7 @@ DEFAULT_CLIENT_CONFIGS = {
 DEFAULT_KEY_DEFS = [
     {"type": "RSA", "use": ["sig"]},
     {"type": "EC", "crv": "P-256", "use": ["sig"]},
+    {"type": "OKP", "crv": "Ed25519", "use": ["sig"]},
 ]
 
 DEFAULT_RP_KEY_DEFS = {
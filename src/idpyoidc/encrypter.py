@@ -1,11 +1,23 @@
+import hashlib
 import os
 from typing import Optional
+from typing import Union
 
+from cryptography.fernet import InvalidToken
 from cryptojwt.key_jar import init_key_jar
+from cryptojwt.utils import as_bytes
+from cryptojwt.utils import b64d
+from cryptojwt.utils import b64e
 
 from idpyoidc.util import instantiate
+from idpyoidc.util import rndstr
 
 DEFAULT_CRYPTO = "cryptojwt.jwe.fernet.FernetEncrypter"
+KEYED_CRYPTO = "idpyoidc.encrypter.KeyedEncrypter"
+
+# First byte of a ciphertext produced by KeyedEncrypter. Fernet tokens start with 'g'
+# so a ciphertext from a plain encrypter is never mistaken for a tagged one.
+KEYED_VERSION = b"\x01"
 
 
 def default_crypt_config():
@@ -79,7 +91,10 @@ def init_encrypter(conf: Optional[dict] = None):
             else:
                 _kwargs = default_crypt_config().get("kwargs")
         else:
-            if "keys" in _cargs:
+            if _class in [KEYED_CRYPTO, KeyedEncrypter]:
+                # Handles its own keys
+                _kwargs = dict(_cargs)
+            elif "keys" in _cargs:
                 _kj = init_key_jar(**_cargs["keys"])
                 _kwargs = {}
                 for usage in ["password", "salt"]:
@@ -102,3 +117,187 @@ def init_encrypter(conf: Optional[dict] = None):
         "encrypter": instantiate(_class, **_kwargs),
         "conf": {"class": _class, "kwargs": _kwargs},
     }
+
+
+class KeyedEncrypter(object):
+    """
+    Encrypter that can have more than one key. The ID of the key used is prepended to
+    the ciphertext so decryption is done with exactly that key, there is no trial and error.
+
+    New ciphertexts are always produced with the current key. After a rotation everything
+    encrypted from then on uses the new key while things encrypted with older keys can
+    still be decrypted until those keys are removed. So values are moved over to the new
+    key lazily, the next time they are written.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[dict] = None,
+        current_kid: Optional[str] = "",
+        encrypter: Optional[str] = DEFAULT_CRYPTO,
+        legacy: Optional[dict] = None,
+        key_set: Optional[dict] = None,
+        **kwargs
+    ):
+        """
+        :param keys: Key jar specification (key_defs, private_path, read_only). Every
+            symmetric key becomes an encryption key. If neither this nor key_set is given a
+            random key is used.
+        :param current_kid: The ID of the key to encrypt with. Default is the first active key.
+        :param encrypter: The encrypter class to use per key. It must accept a 32 bytes 'key'.
+        :param legacy: Configuration of the encrypter used before this one was introduced.
+            Ciphertexts without a key ID are decrypted with it, nothing is encrypted with it.
+        :param key_set: Keys as returned by :py:meth:`export_key_set`, key ID -> base64url
+            encoded key. Used to get back the keys, including keys added by rotation, when
+            a dump is loaded.
+        """
+        self.encrypter_class = encrypter
+        self.encrypters = {}
+        # key ID -> key, so the keys can be exported
+        self._keys = {}
+        self.kid = ""
+        if key_set:
+            for _kid, _key in key_set.items():
+                self.add_key(b64d(as_bytes(_key)), _kid)
+        if keys:
+            _keyjar = init_key_jar(**keys)
+            for _key in _keyjar.get_issuer_keys(""):
+                if _key.kty != "oct":
+                    continue
+                self.add_key(_key.key, _key.kid)
+                if not self.kid and not _key.inactive_since:
+                    self.kid = _key.kid
+            if not self.encrypters:
+                raise ValueError("No symmetric keys to encrypt with")
+        elif not self.encrypters:
+            self.kid = self.add_key(os.urandom(32))
+
+        if current_kid:
+            if current_kid not in self.encrypters:
+                raise ValueError(f"Unknown key ID: {current_kid}")
+            self.kid = current_kid
+        elif not self.kid:
+            self.kid = list(self.encrypters.keys())[0]
+
+        self.legacy_conf = legacy
+        if legacy:
+            self.legacy = init_encrypter(legacy)["encrypter"]
+        else:
+            self.legacy = None
+
+    @property
+    def kwargs(self) -> dict:
+        """Keyword arguments that gives an encrypter with the same keys as this one has now."""
+        _kwargs = {
+            "key_set": self.export_key_set(),
+            "current_kid": self.kid,
+            "encrypter": self.encrypter_class,
+        }
+        if self.legacy_conf:
+            _kwargs["legacy"] = self.legacy_conf
+        return _kwargs
+
+    def export_key_set(self) -> dict:
+        """
+        :return: The keys, key ID -> base64url encoded key
+        """
+        return {_kid: b64e(_key).decode("ascii") for _kid, _key in self._keys.items()}
+
+    def add_key(self, key: bytes, kid: Optional[str] = "") -> str:
+        """
+        Add a key that can be used for decryption. It is not used for encryption
+        until it is made the current key.
+
+        :param key: Key material, if not 32 bytes long a 32 bytes key is derived from it.
+        :param kid: Key ID. If not given a random one is assigned.
+        :return: The key ID
+        """
+        if not kid:
+            kid = rndstr(8)
+        _kid = as_bytes(kid)
+        if len(_kid) > 255:
+            raise ValueError("Key ID too long")
+        if len(key) != 32:
+            key = hashlib.sha256(key).digest()
+        self.encrypters[kid] = instantiate(self.encrypter_class, key=key)
+        self._keys[kid] = key
+        return kid
+
+    def rotate(self, key: Optional[bytes] = None, kid: Optional[str] = "") -> str:
+        """
+        Start encrypting with a new key. Older keys are kept for decryption.
+
+        :param key: Key material. If not given a random key is created.
+        :param kid: Key ID. If not given a random one is assigned.
+        :return: The key ID of the new current key
+        """
+        self.kid = self.add_key(key or os.urandom(32), kid)
+        return self.kid
+
+    def remove_key(self, kid: str):
+        """
+        Remove a key. After this anything encrypted with it can not be decrypted.
+
+        :param kid: Key ID
+        """
+        if kid == self.kid:
+            raise ValueError("Can not remove the current key")
+        del self.encrypters[kid]
+        del self._keys[kid]
+
+    def key_id(self, msg: Union[str, bytes]) -> str:
+        """
+        Return the ID of the key a ciphertext was encrypted with.
+
+        :param msg: The ciphertext
+        :return: Key ID. An empty string if the ciphertext has no key ID.
+        """
+        msg = as_bytes(msg)
+        if msg[:1] != KEYED_VERSION or len(msg) < 2:
+            return ""
+        _len = msg[1]
+        return msg[2 : 2 + _len].decode()
+
+    def is_current(self, msg: Union[str, bytes]) -> bool:
+        """
+        :param msg: The ciphertext
+        :return: True if the ciphertext was encrypted with the current key.
+        """
+        return self.key_id(msg) == self.kid
+
+    def encrypt(self, msg: Union[str, bytes], **kwargs) -> bytes:
+        _kid = as_bytes(self.kid)
+        return (
+            KEYED_VERSION
+            + bytes([len(_kid)])
+            + _kid
+            + self.encrypters[self.kid].encrypt(msg, **kwargs)
+        )
+
+    def decrypt(self, msg: Union[str, bytes], **kwargs) -> bytes:
+        msg = as_bytes(msg)
+        if msg[:1] != KEYED_VERSION:
+            if self.legacy:
+                return self.legacy.decrypt(msg, **kwargs)
+            raise InvalidToken("No key ID")
+        if len(msg) < 2:
+            raise InvalidToken("Too short")
+
+        _len = msg[1]
+        try:
+            _encrypter = self.encrypters[msg[2 : 2 + _len].decode()]
+        except (KeyError, UnicodeDecodeError):
+            raise InvalidToken("Unknown key ID")
+        return _encrypter.decrypt(msg[2 + _len :], **kwargs)
+
+    def reencrypt(self, msg: Union[str, bytes], **kwargs) -> bytes:
+        """
+        Make sure a ciphertext is encrypted with the current key.
+
+        :param msg: The ciphertext
+        :return: The ciphertext as is if it was encrypted with the current key otherwise
+            the decrypted message encrypted with the current key.
+        """
+        if self.is_current(msg):
+            return as_bytes(msg)
+        return self.encrypt(self.decrypt(msg, **kwargs), **kwargs)
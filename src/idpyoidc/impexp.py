@@ -16,6 +16,7 @@ def fully_qualified_name(cls):
 
 
 class ImpExp:
+    __slots__ = ()
     parameter = {}
     special_load_dump = {}
     init_args = []
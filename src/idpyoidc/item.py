@@ -13,15 +13,22 @@ class DLDict(ImpExp):
     def __init__(self, **kwargs):
         ImpExp.__init__(self)
         self.db = kwargs
+        # Keys that has been set or deleted since the last checkpoint
+        self._changed = set()
+        self._deleted = set()
 
     def __setitem__(self, key: str, val):
         self.db[key] = val
+        self._changed.add(key)
+        self._deleted.discard(key)
 
     def __getitem__(self, key: str):
         return self.db[key]
 
     def __delitem__(self, key: str):
         del self.db[key]
+        self._deleted.add(key)
+        self._changed.discard(key)
 
     def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
         res = {}
@@ -78,3 +85,52 @@ class DLDict(ImpExp):
 
     def __len__(self):
         return len(self.db)
+
+    def clear(self):
+        self._deleted.update(self.db.keys())
+        self._changed = set()
+        self.db = {}
+
+    def checkpoint(self):
+        """Forget about all changes made so far."""
+        self._changed = set()
+        self._deleted = set()
+
+    def dump_delta(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        """
+        Dump the items that has been changed or deleted since the last checkpoint.
+        Sets a new checkpoint.
+
+        :param exclude_attributes: Attributes that should not be dumped
+        :return: A dictionary with the keys *set* (same format as dump) and *delete*
+            (list of keys)
+        """
+        res = {
+            "set": {
+                k: [
+                    qualified_name(self.db[k].__class__),
+                    self.db[k].dump(exclude_attributes=exclude_attributes),
+                ]
+                for k in self._changed
+            },
+            "delete": list(self._deleted),
+        }
+        self.checkpoint()
+        return res
+
+    def apply_delta(
+        self, delta: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None
+    ) -> "DLDict":
+        """
+        Apply changes produced by dump_delta. Applying a delta is not regarded as a change.
+
+        :param delta: Output from dump_delta
+        """
+        _changed = self._changed
+        _deleted = self._deleted
+        self.load(delta.get("set", {}), init_args=init_args, load_args=load_args)
+        for key in delta.get("delete", []):
+            self.db.pop(key, None)
+        self._changed = _changed
+        self._deleted = _deleted
+        return self
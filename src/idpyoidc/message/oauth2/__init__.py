@@ -629,6 +629,10 @@ class TokenRevocationResponse(Message):
     pass
 
 
+class RevocationListRequest(Message):
+    c_param = {"since": SINGLE_OPTIONAL_INT}
+
+
 class TokenRevocationErrorResponse(ResponseMessage):
     """
     Error response from the revocation endpoint
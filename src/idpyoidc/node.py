@@ -3,6 +3,7 @@ from typing import Optional
 from typing import Union
 
 from cryptojwt import KeyJar
+from cryptojwt.key_bundle import K2C
 from cryptojwt.key_jar import build_keyjar
 from cryptojwt.key_jar import init_key_jar
 
@@ -12,6 +13,26 @@ from idpyoidc.impexp import ImpExp
 from idpyoidc.util import instantiate
 
 
+def check_key_defs(key_defs: Optional[list]):
+    """
+    Make sure all the key types in a key specification can be handled by cryptojwt.
+    Key types it does not know about are otherwise silently ignored.
+
+    :param key_defs: List of key specifications
+    """
+    _known = [_typ.upper() for _typ in K2C.keys()]
+    for _def in key_defs or []:
+        if _def.get("type", "").upper() not in _known:
+            raise ValueError(
+                f"Key type {_def.get('type')} is not supported by the installed cryptojwt"
+            )
+
+
+def _init_key_jar(keys_args: dict) -> KeyJar:
+    check_key_defs(keys_args.get("key_defs"))
+    return init_key_jar(**keys_args)
+
+
 def create_keyjar(
         keyjar: Optional[KeyJar] = None,
         conf: Optional[Union[dict, Configuration]] = None,
@@ -21,14 +42,14 @@ def create_keyjar(
     if keyjar is None:
         if key_conf:
             keys_args = {k: v for k, v in key_conf.items() if k != "uri_path"}
-            _keyjar = init_key_jar(**keys_args)
+            _keyjar = _init_key_jar(keys_args)
         elif conf:
             if "keys" in conf:
                 keys_args = {k: v for k, v in conf["keys"].items() if k != "uri_path"}
-                _keyjar = init_key_jar(**keys_args)
+                _keyjar = _init_key_jar(keys_args)
             elif "key_conf" in conf:
                 keys_args = {k: v for k, v in conf["key_conf"].items() if k != "uri_path"}
-                _keyjar = init_key_jar(**keys_args)
+                _keyjar = _init_key_jar(keys_args)
             else:
                 _keyjar = KeyJar()
                 if "jwks" in conf:
@@ -1,4 +1,5 @@
 import base64
+import json
 import logging
 from typing import Callable
 from typing import Dict
@@ -12,6 +13,7 @@ from cryptojwt.jwt import JWT
 from cryptojwt.jwt import utc_time_sans_frac
 from cryptojwt.utils import as_bytes
 from cryptojwt.utils import as_unicode
+from cryptojwt.utils import b64d
 
 from idpyoidc.message import Message
 from idpyoidc.message.oidc import JsonWebToken
@@ -23,6 +25,7 @@ from idpyoidc.server.exception import InvalidClient
 from idpyoidc.server.exception import InvalidToken
 from idpyoidc.server.exception import ToOld
 from idpyoidc.server.exception import UnknownClient
+from idpyoidc.server.replay_cache import first_use
 from idpyoidc.util import importer
 from idpyoidc.util import sanitize
 
@@ -323,10 +326,8 @@ class JWSAuthnMethod(ClientAuthnMethod):
         _jti = ca_jwt.get("jti")
         if _jti:
             _key = "{}:{}".format(ca_jwt["iss"], _jti)
-            if _key in _context.jti_db:
+            if not first_use(_context.jti_db, _key, ca_jwt.get("exp")):
                 raise InvalidToken("Have seen this token once before")
-            else:
-                _context.jti_db[_key] = utc_time_sans_frac()
 
         request[verified_claim_name("client_assertion")] = ca_jwt
         client_id = kwargs.get("client_id") or ca_jwt["iss"]
@@ -409,10 +410,8 @@ class RequestParam(ClientAuthnMethod):
         _jti = _jwt.get("jti")
         if _jti:
             _key = "{}:{}".format(_jwt["iss"], _jti)
-            if _key in _context.jti_db:
+            if not first_use(_context.jti_db, _key, _jwt.get("exp")):
                 raise InvalidToken("Have seen this token once before")
-            else:
-                _context.jti_db[_key] = utc_time_sans_frac()
 
         request[verified_claim_name("client_assertion")] = _jwt
         client_id = kwargs.get("client_id") or _jwt["iss"]
@@ -434,6 +433,135 @@ CLIENT_AUTHN_METHOD = dict(
 
 TYPE_METHOD = [(JWT_BEARER, JWSAuthnMethod)]
 
+# is_usable methods that only look at the shape of the request, that is the authorization
+# scheme and which parameters there are in the request.
+SHAPE_IS_USABLE = {
+    NoneAuthn.is_usable,
+    PublicAuthn.is_usable,
+    ClientSecretBasic.is_usable,
+    ClientSecretPost.is_usable,
+    BearerHeader.is_usable,
+    BearerBody.is_usable,
+    JWSAuthnMethod.is_usable,
+    RequestParam.is_usable,
+}
+
+SHAPE_SCHEMES = ["Basic ", "Bearer "]
+SHAPE_PARAMETERS = ["client_id", "client_secret", "access_token", "client_assertion", "request"]
+
+# Client assertion methods that only accept assertions signed with HMAC (True) or
+# not signed with HMAC (False).
+HMAC_ASSERTION = {ClientSecretJWT: True, PrivateKeyJWT: False}
+
+
+def assertion_alg(assertion: str) -> Optional[str]:
+    """
+    :param assertion: A signed JWT
+    :return: The signing algorithm from the JWS header, without verifying anything.
+        None if the header can't be parsed.
+    """
+    try:
+        return json.loads(b64d(assertion.split(".")[0].encode())).get("alg", "")
+    except Exception:
+        return None
+
+
+def request_shape(
+    request: Optional[Union[dict, Message]] = None, authorization_token: Optional[str] = None
+) -> tuple:
+    """
+    The properties of a request that decides which client authentication methods that
+    can be used.
+
+    :param request: The request
+    :param authorization_token: The authorization header
+    :return: A tuple
+    """
+    _scheme = None
+    if authorization_token is not None:
+        _scheme = ""  # None of the methods look for it
+        for _prefix in SHAPE_SCHEMES:
+            if authorization_token.startswith(_prefix):
+                _scheme = _prefix
+                break
+
+    if request is None:
+        return _scheme, None
+
+    _params = tuple(map(request.__contains__, SHAPE_PARAMETERS))
+    _hmac = None
+    if _params[3]:  # client_assertion
+        _alg = assertion_alg(request["client_assertion"])
+        if _alg is not None:
+            _hmac = _alg.startswith("HS")
+    return _scheme, bool(request), _params, _hmac
+
+
+class ClientAuthnDispatch(object):
+    """
+    Keeps track of which client authentication methods that can be used for requests of
+    a certain shape. Methods whose is_usable method looks at more than the shape of
+    the request are asked every time.
+    """
+
+    def __init__(self):
+        # request shape -> (methods, False) or, if some of the methods must be asked
+        # every time, ([(method, whether is_usable must be called)], True)
+        self.table = {}
+        self._methods = None
+
+    def _usable(self, methods, request, authorization_token, hmac) -> tuple:
+        _res = []
+        _ask = False
+        for _method in methods:
+            if type(_method).is_usable not in SHAPE_IS_USABLE:
+                _res.append((_method, True))
+                _ask = True
+                continue
+            if hmac is not None and HMAC_ASSERTION.get(type(_method), hmac) != hmac:
+                # Would fail when it sees the signing algorithm anyway
+                continue
+            if _method.is_usable(request=request, authorization_token=authorization_token):
+                _res.append((_method, False))
+
+        if _ask:
+            return _res, True
+        return [_method for _method, _ in _res], False
+
+    def candidates(
+        self,
+        methods: list,
+        request: Optional[Union[dict, Message]] = None,
+        authorization_token: Optional[str] = None,
+    ) -> list:
+        """
+        :param methods: The allowed client authentication methods, in order of preference
+        :param request: The request
+        :param authorization_token: The authorization header
+        :return: The methods to try, in order of preference
+        """
+        if methods != self._methods:
+            self.table = {}
+            self._methods = methods
+
+        _shape = request_shape(request, authorization_token)
+        try:
+            _usable, _ask = self.table[_shape]
+        except KeyError:
+            _hmac = _shape[3] if request is not None else None
+            _usable, _ask = self.table[_shape] = self._usable(
+                methods, request, authorization_token, _hmac
+            )
+
+        if not _ask:
+            return _usable
+        return [
+            _method
+            for _method, _dynamic in _usable
+            if not _dynamic
+            or _method.is_usable(request=request, authorization_token=authorization_token)
+        ]
+
 
 def valid_client_info(cinfo):
     eta = cinfo.get("client_secret_expires_at", 0)
@@ -478,10 +606,11 @@ def verify_client(
     if not allowed_methods:
         allowed_methods = list(methods.keys())  # If not specific for this endpoint then all
 
+    _methods = [methods[meth] for meth in allowed_methods]
+    _dispatch = getattr(endpoint, "client_authn_dispatch", None) or ClientAuthnDispatch()
+
     _method = None
-    for _method in (methods[meth] for meth in allowed_methods):
-        if not _method.is_usable(request=request, authorization_token=authorization_token):
-            continue
+    for _method in _dispatch.candidates(_methods, request, authorization_token):
         try:
             logger.info(f"Verifying client authentication using {_method.tag}")
             auth_info = _method.verify(
@@ -539,16 +668,40 @@ def verify_client(
 
     # store what authn method was used
     if "method" in auth_info and client_id:
-        _request_type = request.__class__.__name__
-        _used_authn_method = _cinfo.get("auth_method")
-        if _used_authn_method:
-            _context.cdb[client_id]["auth_method"][_request_type] = auth_info["method"]
-        else:
-            _context.cdb[client_id]["auth_method"] = {_request_type: auth_info["method"]}
+        record_auth_method(_context.cdb, client_id, request.__class__.__name__, auth_info["method"])
 
     return auth_info
 
 
+def record_auth_method(cdb: dict, client_id: str, request_type: str, method: str) -> bool:
+    """
+    Remember which client authentication method a client used for a type of request.
+    Clients seldom change method so the client database is only written to when the
+    method differs from the one already recorded.
+
+    :param cdb: The client database
+    :param client_id: Client ID
+    :param request_type: Name of the request class
+    :param method: Name of the client authentication method
+    :return: True if the client database was updated
+    """
+    try:
+        _cinfo = cdb[client_id]
+    except KeyError:
+        return False
+
+    _used = _cinfo.get("auth_method") or {}
+    if _used.get(request_type) == method:
+        return False
+
+    _used = dict(_used)
+    _used[request_type] = method
+    _cinfo["auth_method"] = _used
+    # Write it back so a persistent database is updated
+    cdb[client_id] = _cinfo
+    return True
+
+
 def client_auth_setup(upstream_get, auth_set=None):
     if auth_set is None:
         auth_set = CLIENT_AUTHN_METHOD
@@ -0,0 +1,291 @@
+"""
+Fetching the keys of clients that have registered a jwks_uri away from the threads that
+handle requests.
+
+A ClientKeyRefresher fetches the keys of every registered client when the server starts
+and when a client registers, and fetches them again, in a background worker, before they
+expire. Expired keys are used while new ones are being fetched, so verifying a client
+assertion or a request object does not have to wait for the client's web server.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError
+from typing import Optional
+
+from cryptojwt import KeyJar
+from cryptojwt.key_bundle import KeyBundle
+
+from idpyoidc.util import instantiate
+
+logger = logging.getLogger(__name__)
+
+
+def cache_max_age(headers: Optional[dict]) -> Optional[int]:
+    """
+    :param headers: HTTP response headers
+    :return: How many seconds the response may be cached according to the Cache-Control
+        header, None if the header does not say.
+    """
+    if not headers:
+        return None
+
+    _value = headers.get("Cache-Control") or headers.get("cache-control")
+    if not _value:
+        return None
+
+    for _directive in _value.split(","):
+        _name, _, _arg = _directive.strip().partition("=")
+        _name = _name.lower()
+        if _name in ["no-cache", "no-store"]:
+            return 0
+        if _name == "max-age":
+            try:
+                return int(_arg.strip('"'))
+            except ValueError:
+                return None
+    return None
+
+
+class RefreshedKeyBundle(KeyBundle):
+    """
+    The keys from a client's jwks_uri. How long the keys are used before they are fetched
+    again is taken from the Cache-Control header of the response. When the keys have
+    expired, the old keys are used while the refresher fetches new ones. Only a bundle
+    that has never got any keys fetches them in the calling thread.
+    """
+
+    def __init__(
+        self,
+        refresher=None,
+        min_cache_time: Optional[int] = 60,
+        max_cache_time: Optional[int] = 86400,
+        **kwargs,
+    ):
+        """
+        :param refresher: The ClientKeyRefresher this bundle belongs to
+        :param min_cache_time: Fetch the keys at most this often, whatever the
+            Cache-Control header says.
+        :param max_cache_time: Fetch the keys at least this often
+        :param kwargs: Keyword arguments to KeyBundle
+        """
+        self.refresher = refresher
+        self.min_cache_time = min_cache_time
+        self.max_cache_time = max_cache_time
+        self._max_age = None
+        KeyBundle.__init__(self, **kwargs)
+        # Look at the response headers
+        self._httpc = self.httpc
+        self.httpc = self._fetch
+
+    def _fetch(self, method: str, url: str, **kwargs):
+        _response = self._httpc(method, url, **kwargs)
+        self._max_age = cache_max_age(getattr(_response, "headers", None))
+        return _response
+
+    def _do_remote(self, set_keys=True):
+        self._max_age = None
+        _res = KeyBundle._do_remote(self, set_keys=set_keys)
+        if self._max_age is not None:
+            _cache_time = min(max(self._max_age, self.min_cache_time), self.max_cache_time)
+            self.time_out = time.time() + _cache_time
+        return _res
+
+    def _uptodate(self):
+        if not self.remote or time.time() <= self.time_out:
+            return False
+
+        if self.refresher is None:
+            return self.update()
+        if self._keys:
+            # Use the keys there are until new ones have been fetched
+            self.refresher.schedule(self)
+            return False
+        return self.refresher.fetch(self)
+
+
+class ClientKeyRefresher(object):
+    """
+    Keeps the keys from the jwks_uri of registered clients up to date. Keys are fetched
+    by a pool of threads, a background thread schedules keys that are about to expire.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = 4,
+        interval: Optional[int] = 30,
+        min_cache_time: Optional[int] = 60,
+        max_cache_time: Optional[int] = 86400,
+        retry_after: Optional[int] = 60,
+        timeout: Optional[float] = 10.0,
+        **kwargs,
+    ):
+        """
+        :param max_workers: How many keys sets can be fetched at the same time
+        :param interval: How often, in seconds, to look for keys that are about to expire.
+            Keys are fetched again if they expire within this time.
+        :param min_cache_time: Fetch a client's keys at most this often
+        :param max_cache_time: Fetch a client's keys at least this often
+        :param retry_after: When to try again if the keys could not be fetched
+        :param timeout: How long a request waits for the keys of a client whose keys have
+            never been fetched
+        """
+        self.max_workers = max_workers
+        self.interval = interval
+        self.min_cache_time = min_cache_time
+        self.max_cache_time = max_cache_time
+        self.retry_after = retry_after
+        self.timeout = timeout
+
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jwks")
+        # client_id -> RefreshedKeyBundle
+        self.bundles = {}
+        # RefreshedKeyBundle -> (Future, when it was scheduled)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(
+        self, keyjar: KeyJar, client_id: str, jwks_uri: str, prefetch: Optional[bool] = True
+    ) -> RefreshedKeyBundle:
+        """
+        Use the keys from a client's jwks_uri. Replaces keys from another jwks_uri added
+        before for the same client.
+
+        :param keyjar: The key jar the client's keys are kept in
+        :param client_id: Client ID
+        :param jwks_uri: Where the client publishes its keys
+        :param prefetch: Whether to start fetching the keys right away
+        :return: The key bundle
+        """
+        with self._lock:
+            _old = self.bundles.get(client_id)
+            if _old is not None and _old.source == jwks_uri:
+                return _old
+
+            _bundle = RefreshedKeyBundle(
+                refresher=self,
+                min_cache_time=self.min_cache_time,
+                max_cache_time=self.max_cache_time,
+                source=jwks_uri,
+                httpc=keyjar.httpc,
+                httpc_params=keyjar.httpc_params,
+            )
+            self.bundles[client_id] = _bundle
+
+        if _old is not None:
+            _issuer = keyjar.return_issuer(client_id)
+            _issuer.set([_kb for _kb in _issuer.get_bundles() if _kb is not _old])
+            keyjar[client_id] = _issuer
+        keyjar.add_kb(client_id, _bundle)
+
+        if prefetch:
+            self.schedule(_bundle)
+        self.start()
+        return _bundle
+
+    def prefetch(self, cdb: dict, keyjar: KeyJar):
+        """
+        Start fetching the keys of all clients in a client database that have a jwks_uri.
+
+        :param cdb: The client database
+        :param keyjar: The key jar the clients' keys are kept in
+        """
+        for _client_id in list(cdb.keys()):
+            _jwks_uri = cdb[_client_id].get("jwks_uri")
+            if _jwks_uri:
+                self.add(keyjar, _client_id, _jwks_uri)
+
+    def _refresh(self, bundle: RefreshedKeyBundle, scheduled: float):
+        if bundle.last_updated > scheduled:
+            # Someone else got there first
+            return True
+
+        _updated = bundle.update() and bundle.last_updated > scheduled
+        if not _updated:
+            logger.warning(f"Could not fetch keys from {bundle.source}")
+            bundle.time_out = time.time() + self.retry_after
+        return _updated
+
+    def schedule(self, bundle: RefreshedKeyBundle) -> Future:
+        """
+        Fetch the keys of a bundle in the background, unless that is already being done.
+
+        :param bundle: The key bundle
+        :return: A future that is done when the keys have been fetched
+        """
+        with self._lock:
+            _pending = self._pending.get(bundle)
+            if _pending is not None:
+                return _pending[0]
+
+            _scheduled = time.time()
+            _future = self.pool.submit(self._refresh, bundle, _scheduled)
+            self._pending[bundle] = (_future, _scheduled)
+
+        _future.add_done_callback(lambda _: self._done(bundle))
+        return _future
+
+    def _done(self, bundle: RefreshedKeyBundle):
+        with self._lock:
+            self._pending.pop(bundle, None)
+
+    def fetch(self, bundle: RefreshedKeyBundle) -> bool:
+        """
+        Fetch the keys of a bundle that has no keys. Waits for a fetch that has already
+        started, otherwise the keys are fetched in the calling thread.
+
+        :param bundle: The key bundle
+        :return: True if there are new keys
+        """
+        with self._lock:
+            _pending = self._pending.get(bundle)
+
+        if _pending is not None and _pending[0].running():
+            try:
+                return _pending[0].result(timeout=self.timeout)
+            except TimeoutError:
+                return False
+        return self._refresh(bundle, time.time())
+
+    def due(self, when: Optional[float] = 0) -> list:
+        """
+        :param when: The time to compare the expiration times with. Default is now plus
+            the interval.
+        :return: The bundles whose keys expire before then
+        """
+        when = when or time.time() + self.interval
+        with self._lock:
+            return [_bundle for _bundle in self.bundles.values() if _bundle.time_out < when]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for _bundle in self.due():
+                self.schedule(_bundle)
+
+    def start(self):
+        """Start the background thread, if it is not already running."""
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name="jwks-refresher", daemon=True
+                )
+                self._thread.start()
+
+    def shutdown(self, wait: Optional[bool] = True):
+        self._stop.set()
+        self.pool.shutdown(wait=wait)
+
+
+def init_client_key_refresher(conf: Optional[dict] = None) -> Optional[ClientKeyRefresher]:
+    """
+    :param conf: Dictionary with the keys 'class' and 'kwargs'
+    :return: A ClientKeyRefresher instance or None if none is configured. Without one
+        client keys are fetched by the key jar when they are needed.
+    """
+    if not conf:
+        return None
+    return instantiate(conf["class"], **conf.get("kwargs", {}))
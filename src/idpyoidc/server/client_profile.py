@@ -0,0 +1,141 @@
+"""
+Compiled views of client registrations. The parts of a client's registration that are
+used on every request are turned into the form they are used in, sets for membership
+tests and dictionaries for URI matching, once instead of on every request.
+"""
+from typing import Optional
+
+# The registration parameters a profile is compiled from
+PROFILE_PARAMETERS = (
+    "allowed_scopes",
+    "scopes_to_claims",
+    "redirect_uris",
+    "post_logout_redirect_uri",
+    "add_claims",
+)
+
+
+def uri_matcher(uris: Optional[list]) -> Optional[dict]:
+    """
+    :param uris: Registered URIs, either as strings or as (base, query) pairs
+    :return: Dictionary with base URIs as keys and query components as values. If a base
+        URI is registered more than once the first registration is used.
+    """
+    if uris is None:
+        return None
+
+    _res = {}
+    for _item in uris:
+        if isinstance(_item, str):
+            _base, _query = _item, {}
+        else:
+            _base, _query = _item
+        _res.setdefault(_base, _query)
+    return _res
+
+
+class ClientProfile(object):
+    """
+    What is needed from a client's registration on the hot paths. Read only, if the
+    registration changes a new profile is compiled.
+    """
+
+    __slots__ = (
+        "client_id",
+        "source",
+        "allowed_scopes",
+        "allowed_scope_set",
+        "scopes_to_claims",
+        "uris",
+        "add_claims_by_scope",
+        "add_claims_always",
+    )
+
+    def __init__(self, client_id: str, client_info: dict, source: Optional[tuple] = None):
+        """
+        :param client_id: Client ID
+        :param client_info: The client's registration information
+        :param source: The values of PROFILE_PARAMETERS in client_info
+        """
+        if source is None:
+            source = tuple(client_info.get(_param) for _param in PROFILE_PARAMETERS)
+        _allowed_scopes, _scopes_to_claims, _redirect_uris, _post_logout, _add_claims = source
+
+        self.client_id = client_id
+        self.source = source
+        # None means the server's defaults apply
+        self.allowed_scopes = _allowed_scopes
+        self.allowed_scope_set = None if _allowed_scopes is None else frozenset(_allowed_scopes)
+        self.scopes_to_claims = _scopes_to_claims
+        self.uris = {
+            "redirect_uri": uri_matcher(_redirect_uris),
+            "post_logout_redirect_uri": uri_matcher(_post_logout),
+        }
+        _add_claims = _add_claims or {}
+        self.add_claims_by_scope = _add_claims.get("by_scope", {})
+        self.add_claims_always = _add_claims.get("always", {})
+
+    def is_compiled_from(self, source: tuple) -> bool:
+        """
+        :param source: The values of PROFILE_PARAMETERS in a client's registration
+        :return: True if this profile was compiled from the very same values
+        """
+        for _old, _new in zip(self.source, source):
+            if _old is not _new:
+                return False
+        return True
+
+
+class ClientProfileCache(object):
+    """
+    Compiled client profiles per client. A profile is used as long as the registration
+    parameters it was compiled from are the same objects as when it was compiled. Values
+    that are changed in place, like a list that is appended to, must be followed by a
+    call to invalidate.
+    """
+
+    def __init__(self):
+        # client_id -> ClientProfile
+        self.db = {}
+
+    def get(self, client_id: str, client_info: dict) -> ClientProfile:
+        """
+        :param client_id: Client ID
+        :param client_info: The client's registration information
+        :return: A ClientProfile instance
+        """
+        _source = tuple(client_info.get(_param) for _param in PROFILE_PARAMETERS)
+        _profile = self.db.get(client_id)
+        if _profile is None or not _profile.is_compiled_from(_source):
+            _profile = self.db[client_id] = ClientProfile(client_id, client_info, _source)
+        return _profile
+
+    def invalidate(self, client_id: Optional[str] = None):
+        """
+        Forget compiled profiles.
+
+        :param client_id: Only forget the profile of this client. If not given
+            everything is forgotten.
+        """
+        if client_id is None:
+            self.db = {}
+        else:
+            self.db.pop(client_id, None)
+
+
+def client_profile(context, client_id: str) -> Optional[ClientProfile]:
+    """
+    The compiled profile of a client, from the context's profile cache if there is one.
+
+    :param context: Server context
+    :param client_id: Client ID
+    :return: A ClientProfile instance or None if the client is not known
+    """
+    client_info = context.cdb.get(client_id)
+    if client_info is None:
+        return None
+
+    _cache = getattr(context, "client_profiles", None)
+    if _cache is None:
+        return ClientProfile(client_id, client_info)
+    return _cache.get(client_id, client_info)
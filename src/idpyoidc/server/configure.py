@@ -217,13 +217,16 @@ class EntityConfiguration(Base):
         "claims_interface": None,
         "client_db": None,
         "client_authn_methods": {},
+        "client_key_refresher": None,
         "cookie_handler": None,
         "endpoint": {},
         "httpc_params": {},
         "issuer": "",
         "key_conf": None,
         "preference": {},
+        "replay_cache": None,
         "session_params": None,
+        "signing_executor": None,
         "template_dir": None,
         "token_handler_args": {},
         "userinfo": None,
@@ -422,6 +425,10 @@ DEFAULT_EXTENDED_CONF = {
     },
     "scopes_handler": {"class": "idpyoidc.server.scopes.Scopes"},
     "claims_interface": {"class": "idpyoidc.server.session.claims.ClaimsInterface", "kwargs": {}},
+    "client_key_refresher": {
+        "class": "idpyoidc.server.client_keys.ClientKeyRefresher",
+        "kwargs": {"max_workers": 4},
+    },
     "cookie_handler": {
         "class": "idpyoidc.server.cookie_handler.CookieHandler",
         "kwargs": {
@@ -536,6 +543,7 @@ DEFAULT_EXTENDED_CONF = {
         "key_defs": [
             {"type": "RSA", "use": ["sig"]},
             {"type": "EC", "crv": "P-256", "use": ["sig"]},
+            {"type": "OKP", "crv": "Ed25519", "use": ["sig"]},
         ],
         "public_path": "static/jwks.json",
         "read_only": False,
@@ -549,6 +557,11 @@ DEFAULT_EXTENDED_CONF = {
             }
         },
     },
+    "replay_cache": {"class": "idpyoidc.server.replay_cache.ReplayCache", "kwargs": {"skew": 60}},
+    "signing_executor": {
+        "class": "idpyoidc.server.signing_executor.ThreadSigningExecutor",
+        "kwargs": {"max_workers": 4},
+    },
     "template_dir": "templates",
     "token_handler_args": {
         "jwks_def": {
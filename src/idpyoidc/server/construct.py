@@ -5,7 +5,7 @@ from functools import cmp_to_key
 from cryptojwt import jwe
 from cryptojwt.jws.jws import SIGNER_ALGS
 
-ALG_SORT_ORDER = {"RS": 0, "ES": 1, "HS": 2, "PS": 3, "no": 4}
+ALG_SORT_ORDER = {"RS": 0, "ES": 1, "HS": 2, "PS": 3, "Ed": 4, "no": 5}
 WEAK_ALGS = ["RSA1_5", "none"]
 
 logger = logging.getLogger(__name__)
@@ -30,7 +30,7 @@ def sort_sign_alg(alg1, alg2):
 def assign_algorithms(typ):
     if typ == "signing_alg":
         # Pick supported signing algorithms from crypto library
-        # Sort order RS, ES, HS, PS
+        # Sort order RS, ES, HS, PS, Ed
         sign_algs = list(SIGNER_ALGS.keys())
         return sorted(sign_algs, key=cmp_to_key(sort_sign_alg))
     elif typ == "encryption_alg":
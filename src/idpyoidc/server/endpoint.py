@@ -14,6 +14,7 @@ from idpyoidc.message import Message
 from idpyoidc.message.oauth2 import ResponseMessage
 from idpyoidc.message.oidc import RegistrationRequest
 from idpyoidc.node import Node
+from idpyoidc.server.client_authn import ClientAuthnDispatch
 from idpyoidc.server.client_authn import verify_client
 from idpyoidc.server.exception import UnAuthorizedClient
 from idpyoidc.server.util import OAUTH2_NOCACHE_HEADERS
@@ -118,6 +119,8 @@ class Endpoint(Node):
                 setattr(self, param, _val)
 
         self.kwargs = self.set_client_authn_methods(**kwargs)
+        # Which client authentication methods to try for which kind of request
+        self.client_authn_dispatch = ClientAuthnDispatch()
         # This is for matching against aud in JWTs
         # By default the endpoint's endpoint URL is an allowed target
         self.allowed_targets = [self.name]
@@ -200,6 +203,10 @@ class Endpoint(Node):
         _context = self.upstream_get("context")
         _keyjar = self.upstream_get("attribute", "keyjar")
 
+        _session_manager = getattr(_context, "session_manager", None)
+        if _session_manager and _session_manager.expiry_sweeper:
+            _session_manager.expiry_sweeper.tick()
+
         if http_info is None:
             http_info = {}
 
@@ -16,12 +16,17 @@ from idpyoidc.server.claims import Claims
 from idpyoidc.server.claims.oauth2 import Claims as OAUTH2_Claims
 from idpyoidc.server.claims.oidc import Claims as OIDC_Claims
 from idpyoidc.server.client_authn import client_auth_setup
+from idpyoidc.server.client_keys import init_client_key_refresher
+from idpyoidc.server.client_profile import ClientProfileCache
 from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.replay_cache import init_replay_cache
 from idpyoidc.server.scopes import SCOPE2CLAIMS
 from idpyoidc.server.scopes import Scopes
 from idpyoidc.server.session.manager import create_session_manager
 from idpyoidc.server.session.manager import SessionManager
+from idpyoidc.server.signing_executor import init_signing_executor
 from idpyoidc.server.template_handler import Jinja2TemplateHandler
+from idpyoidc.server.token.id_token import AlgorithmCache
 from idpyoidc.server.user_authn.authn_context import populate_authn_broker
 from idpyoidc.server.util import get_http_params
 from idpyoidc.util import importer
@@ -84,7 +89,7 @@ class EndpointContext(OidcContext):
         "httpc_params": {},
         # "idtoken": IDToken,
         "issuer": "",
-        "jti_db": {},
+        "jti_db": "DICT_TYPE",
         "jwks_uri": "",
         "keyjar": KeyJar,
         "login_hint_lookup": None,
@@ -139,8 +144,8 @@ class EndpointContext(OidcContext):
             logger.debug("No special client db, will use memory based dictionary")
             self.cdb = {}
 
-        # For my Dev claims
-        self.jti_db = {}
+        # One-time identifiers that has been used
+        self.jti_db = init_replay_cache(conf.get("replay_cache"))
         self.registration_access_token = {}
         # self.session_db = {}
 
@@ -221,6 +226,10 @@ class EndpointContext(OidcContext):
 
         # which signing/encryption algorithms to use in what context
         self.jwx_def = {}
+        # the algorithms resolved per client
+        self.jwx_cache = AlgorithmCache()
+        # the compiled client registrations
+        self.client_profiles = ClientProfileCache()
 
         # The HTTP clients request arguments
         _cnf = conf.get("httpc_params")
@@ -229,6 +238,9 @@ class EndpointContext(OidcContext):
         else:  # Backward compatibility
             self.httpc_params = {"verify": conf.get("verify_ssl", True)}
 
+        # Where JWTs are signed
+        self.signing_executor = init_signing_executor(conf.get("signing_executor"))
+
         self.set_scopes_handler()
         self.dev_auth_db = None
         _interface = conf.get("claims_interface")
@@ -239,6 +251,10 @@ class EndpointContext(OidcContext):
             conf = conf.conf
         _supports = self.supports()
         self.keyjar = self.claims.load_conf(conf, supports=_supports, keyjar=keyjar)
+        # Fetches the keys of clients that have a jwks_uri
+        self.client_key_refresher = init_client_key_refresher(conf.get("client_key_refresher"))
+        if self.client_key_refresher:
+            self.client_key_refresher.prefetch(self.cdb, self.keyjar)
         self.provider_info = self.claims.provider_info(_supports)
         self.provider_info["issuer"] = self.issuer
         self.provider_info.update(self._get_endpoint_info())
@@ -423,6 +439,7 @@ class EndpointContext(OidcContext):
                     _info["acr_values_supported"] = acr_values
 
         self.provider_info = _info
+        self.jwx_cache.invalidate()
 
     def get_preference(self, claim, default=None):
         return self.claims.get_preference(claim, default=default)
@@ -16,6 +16,13 @@ from idpyoidc.message import SINGLE_REQUIRED_INT
 from idpyoidc.message import SINGLE_REQUIRED_JSON
 from idpyoidc.message import SINGLE_REQUIRED_STRING
 from idpyoidc.server.client_authn import BearerHeader
+from idpyoidc.server.replay_cache import first_use
+from idpyoidc.time_util import utc_time_sans_frac
+
+# How long after it was issued a DPoP proof is remembered, to be able to detect replays
+DPOP_PROOF_LIFETIME = 300
+# How far into the future the issued at time of a DPoP proof may be, to allow for clock skew
+DPOP_PROOF_SKEW = 60
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +98,28 @@ class DPoPProof(Message):
             return None
 
 
+def check_replay(dpop: DPoPProof, context):
+    """
+    Make sure a DPoP proof is recent and only used once. A proof that is older than
+    proof_lifetime can not be checked for replay, since it is no longer remembered.
+
+    :param dpop: A verified DPoP proof
+    :param context: Server context
+    """
+    _conf = context.add_on.get("dpop", {})
+    _lifetime = _conf.get("proof_lifetime", DPOP_PROOF_LIFETIME)
+    _iat = int(dpop["iat"])
+    _now = utc_time_sans_frac()
+    if _iat < _now - _lifetime:
+        raise ValueError("DPoP proof is too old")
+    if _iat > _now + _conf.get("proof_skew", DPOP_PROOF_SKEW):
+        raise ValueError("DPoP proof is issued in the future")
+
+    _key = "dpop:{}:{}".format(as_unicode(dpop.key.thumbprint("SHA-256")), dpop["jti"])
+    if not first_use(context.jti_db, _key, _iat + _lifetime):
+        raise ValueError("DPoP proof has been used before")
+
+
 def token_post_parse_request(request, client_id, context, **kwargs):
     """
     Expect http_info attribute in kwargs. http_info should be a dictionary
@@ -121,6 +150,8 @@ def token_post_parse_request(request, client_id, context, **kwargs):
     if not _dpop.key:
         _dpop.key = key_from_jwk_dict(_dpop["jwk"])
 
+    check_replay(_dpop, context)
+
     # Need something I can add as a reference when minting tokens
     request["dpop_jkt"] = as_unicode(_dpop.key.thumbprint("SHA-256"))
     return request
@@ -156,6 +187,8 @@ def userinfo_post_parse_request(request, client_id, context, auth_info, **kwargs
     if not _dpop.key:
         _dpop.key = key_from_jwk_dict(_dpop["jwk"])
 
+    check_replay(_dpop, context)
+
     ath = sha256(auth_info["token"].encode("utf8")).hexdigest()
 
     if _dpop["ath"] != ath:
@@ -195,7 +228,11 @@ def add_support(endpoint: dict, **kwargs):
     ] = _algs_supported
 
     _context = _token_endp.upstream_get("context")
-    _context.add_on["dpop"] = {"algs_supported": _algs_supported}
+    _context.add_on["dpop"] = {
+        "algs_supported": _algs_supported,
+        "proof_lifetime": kwargs.get("proof_lifetime", DPOP_PROOF_LIFETIME),
+        "proof_skew": kwargs.get("proof_skew", DPOP_PROOF_SKEW),
+    }
     _context.client_authn_methods["dpop"] = DPoPClientAuth
 
     _userinfo_endpoint = endpoint.get("userinfo")
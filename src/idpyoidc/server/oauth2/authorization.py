@@ -24,6 +24,7 @@ from idpyoidc.message.oauth2 import AuthorizationRequest
 from idpyoidc.message.oidc import AuthorizationResponse
 from idpyoidc.message.oidc import verified_claim_name
 from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.client_profile import client_profile
 from idpyoidc.server.cookie_handler import compute_session_state
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.endpoint_context import EndpointContext
@@ -128,57 +129,45 @@ def verify_uri(
     (_base, _query) = split_uri(_redirect_uri)
 
     # Get the clients registered redirect uris
-    client_info = context.cdb.get(_cid)
-    if client_info is None:
+    _profile = client_profile(context, _cid)
+    if _profile is None:
         raise KeyError("No such client")
 
-    if uri_type == "redirect_uri":
-        redirect_uris = client_info.get(f"{uri_type}s")
-    else:
-        redirect_uris = client_info.get(f"{uri_type}")
-
+    redirect_uris = _profile.uris.get(uri_type)
     if redirect_uris is None:
         raise RedirectURIError(f"No registered {uri_type} for {_cid}")
-    else:
-        match = False
-        for _item in redirect_uris:
-            if isinstance(_item, str):
-                regbase = _item
-                rquery = {}
-            else:
-                regbase, rquery = _item
-
-            # The URI MUST exactly match one of the Redirection URI
-            if _base == regbase:
-                # every registered query component must exist in the uri
-                if rquery:
-                    if not _query:
-                        raise ValueError("Missing query part")
-
-                    for key, vals in rquery.items():
-                        if key not in _query:
-                            raise ValueError('"{}" not in query part'.format(key))
-
-                        for val in vals:
-                            if val not in _query[key]:
-                                raise ValueError("{}={} value not in query part".format(key, val))
-
-                # and vice versa, every query component in the uri
-                # must be registered
-                if _query:
-                    if not rquery:
-                        raise ValueError("No registered query part")
-
-                    for key, vals in _query.items():
-                        if key not in rquery:
-                            raise ValueError('"{}" extra in query part'.format(key))
-                        for val in vals:
-                            if val not in rquery[key]:
-                                raise ValueError("Extra {}={} value in query part".format(key, val))
-                match = True
-                break
-        if not match:
-            raise RedirectURIError("Doesn't match any registered uris")
+
+    # The URI MUST exactly match one of the Redirection URI
+    try:
+        rquery = redirect_uris[_base]
+    except KeyError:
+        raise RedirectURIError("Doesn't match any registered uris")
+
+    # every registered query component must exist in the uri
+    if rquery:
+        if not _query:
+            raise ValueError("Missing query part")
+
+        for key, vals in rquery.items():
+            if key not in _query:
+                raise ValueError('"{}" not in query part'.format(key))
+
+            for val in vals:
+                if val not in _query[key]:
+                    raise ValueError("{}={} value not in query part".format(key, val))
+
+    # and vice versa, every query component in the uri
+    # must be registered
+    if _query:
+        if not rquery:
+            raise ValueError("No registered query part")
+
+        for key, vals in _query.items():
+            if key not in rquery:
+                raise ValueError('"{}" extra in query part'.format(key))
+            for val in vals:
+                if val not in rquery[key]:
+                    raise ValueError("Extra {}={} value in query part".format(key, val))
 
 
 def join_query(base, query):
@@ -388,6 +377,14 @@ class Authorization(Endpoint):
         # Is the asked for response_type among those that are permitted
         return set(request["response_type"]) in _registered
 
+    @staticmethod
+    def _set_expires_at(token, usage_rules):
+        _exp_in = usage_rules.get("expires_in")
+        if isinstance(_exp_in, str):
+            _exp_in = int(_exp_in)
+        if _exp_in:
+            token.expires_at = utc_time_sans_frac() + _exp_in
+
     def mint_token(self, token_class, grant, session_id, based_on=None, **kwargs):
         usage_rules = grant.usage_rules.get(token_class, {})
         token = grant.mint_token(
@@ -398,18 +395,37 @@ class Authorization(Endpoint):
             usage_rules=usage_rules,
             **kwargs,
         )
-
-        _exp_in = usage_rules.get("expires_in")
-        if isinstance(_exp_in, str):
-            _exp_in = int(_exp_in)
-        if _exp_in:
-            token.expires_at = utc_time_sans_frac() + _exp_in
+        self._set_expires_at(token, usage_rules)
 
         _mngr = self.upstream_get("context").session_manager
         _mngr.set(_mngr.unpack_session_key(session_id), grant)
 
         return token
 
+    def mint_tokens(self, token_classes: List[str], grant, session_id) -> list:
+        """
+        Mint tokens that do not depend on each other. They are signed in parallel if a
+        signing executor is configured.
+
+        :param token_classes: The classes of the tokens to mint
+        :param grant: Grant instance
+        :param session_id: Session ID
+        :return: The minted tokens, in the same order as token_classes
+        """
+        _specs = [
+            {"token_class": _class, "usage_rules": grant.usage_rules.get(_class, {})}
+            for _class in token_classes
+        ]
+        _tokens = grant.mint_tokens(session_id, self.upstream_get("context"), _specs)
+        for _spec, _token in zip(_specs, _tokens):
+            if _token is not None:
+                self._set_expires_at(_token, _spec["usage_rules"])
+
+        _mngr = self.upstream_get("context").session_manager
+        _mngr.set(_mngr.unpack_session_key(session_id), grant)
+
+        return _tokens
+
     def _do_request_uri(self, request, client_id, context, **kwargs):
         _request_uri = request.get("request_uri")
         if _request_uri:
@@ -869,30 +885,29 @@ class Authorization(Endpoint):
 
             grant = _sinfo["grant"]
 
-            if "code" in rtype:
-                _code = self.mint_token(
-                    token_class="authorization_code",
-                    grant=grant,
-                    session_id=_sinfo["branch_id"],
-                )
+            # The code and the access token don't depend on each other, mint them together
+            _token_classes = [
+                _class
+                for _type, _class in [("code", "authorization_code"), ("token", "access_token")]
+                if _type in rtype
+            ]
+            _minted = {}
+            if _token_classes:
+                _tokens = self.mint_tokens(_token_classes, grant, _sinfo["branch_id"])
+                _minted = dict(zip(_token_classes, _tokens))
+
+            _code = _minted.get("authorization_code")
+            if _code:
                 aresp["code"] = _code.value
                 handled_response_type.append("code")
-            else:
-                _code = None
 
-            if "token" in rtype:
-                _access_token = self.mint_token(
-                    token_class="access_token",
-                    grant=grant,
-                    session_id=_sinfo["branch_id"],
-                )
+            _access_token = _minted.get("access_token")
+            if _access_token:
                 aresp["access_token"] = _access_token.value
                 aresp["token_type"] = "Bearer"
                 if _access_token.expires_at:
                     aresp["expires_in"] = _access_token.expires_at - utc_time_sans_frac()
                 handled_response_type.append("token")
-            else:
-                _access_token = None
 
             if "id_token" in rtype:
                 kwargs = {}
@@ -0,0 +1,47 @@
+"""Publishes the jti values of revoked self-contained (JWT) access tokens."""
+import logging
+
+from idpyoidc.exception import ImproperlyConfigured
+from idpyoidc.message import oauth2
+from idpyoidc.server.endpoint import Endpoint
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRevocationList(Endpoint):
+    """
+    Resource servers that verify JWT access tokens on their own can not see tokens being
+    revoked. From this endpoint they can get the list of revoked tokens, either the
+    complete list or the changes since the version they have.
+    """
+
+    request_cls = oauth2.RevocationListRequest
+    response_cls = oauth2.Message
+    request_format = "urlencoded"
+    response_format = "json"
+    endpoint_name = "revocation_list_endpoint"
+    name = "revocation_list"
+
+    def __init__(
+        self, upstream_get, token_class: str = "access_token", bloom: bool = True, **kwargs
+    ):
+        """
+        :param token_class: The class of tokens the list is about
+        :param bloom: Whether a Bloom filter summary should be part of the list
+        """
+        Endpoint.__init__(self, upstream_get, **kwargs)
+        self.token_class = token_class
+        self.bloom = bloom
+
+    def process_request(self, request=None, **kwargs):
+        _context = self.upstream_get("context")
+        _handler = _context.session_manager.token_handler.handler.get(self.token_class)
+        _revocation_list = getattr(_handler, "revocation_list", None)
+        if _revocation_list is None:
+            raise ImproperlyConfigured(f"The {self.token_class} handler has no revocation list")
+
+        try:
+            _since = int(request.get("since", 0)) if request else 0
+        except ValueError:
+            return self.error_cls(error="invalid_request", error_description="Bad since value")
+        return {"response_args": _revocation_list.document(since=_since, bloom=self.bloom)}
@@ -41,6 +41,7 @@ class TokenEndpointHelper(object):
         scope: Optional[list] = None,
         token_args: Optional[dict] = None,
         token_type: Optional[str] = "",
+        shared: Optional[dict] = None,
     ) -> SessionToken:
         _context = self.endpoint.upstream_get("context")
         _mngr = _context.session_manager
@@ -69,6 +70,7 @@ class TokenEndpointHelper(object):
             usage_rules=usage_rules,
             scope=scope,
             token_type=token_type,
+            shared=shared,
             **_args,
         )
 
@@ -109,6 +109,8 @@ class AccessTokenHelper(TokenEndpointHelper):
             "scope": scope,
         }
 
+        # Shared by all the tokens minted here, so the user info is only fetched once
+        _shared = {"session_info": _session_info}
         if "access_token" in _supports_minting:
 
             resources = req.get("resource", None)
@@ -125,6 +127,7 @@ class AccessTokenHelper(TokenEndpointHelper):
                     client_id=_session_info["client_id"],
                     based_on=_based_on,
                     token_args=token_args,
+                    shared=_shared,
                 )
             except MintingNotAllowed as err:
                 logger.warning(err)
@@ -141,17 +144,18 @@ class AccessTokenHelper(TokenEndpointHelper):
                     session_id=_session_info["branch_id"],
                     client_id=_session_info["client_id"],
                     based_on=_based_on,
+                    shared=_shared,
                 )
             except MintingNotAllowed as err:
                 logger.warning(err)
             else:
                 _response["refresh_token"] = refresh_token.value
 
+        _based_on.register_usage()
+
         # since the grant content has changed. Make sure it's stored
         _mngr[_session_info["branch_id"]] = grant
 
-        _based_on.register_usage()
-
         return _response
 
     def _enforce_resource_indicators_policy(self, request, config):
@@ -47,6 +47,9 @@ class RefreshTokenHelper(TokenEndpointHelper):
         scope = _grant.find_scope(token)
         if "scope" in req:
             scope = req["scope"]
+
+        # Shared by all the tokens minted here, so the user info is only fetched once
+        _shared = {"session_info": _session_info}
         access_token = self._mint_token(
             token_class="access_token",
             grant=_grant,
@@ -55,6 +58,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
             based_on=token,
             scope=scope,
             token_type=token_type,
+            shared=_shared,
         )
 
         _resp = {
@@ -76,6 +80,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
                 client_id=_session_info["client_id"],
                 based_on=token,
                 scope=scope,
+                shared=_shared,
             )
             refresh_token.usage_rules = token.usage_rules.copy()
             _resp["refresh_token"] = refresh_token.value
@@ -94,6 +99,9 @@ class RefreshTokenHelper(TokenEndpointHelper):
         if revoke_refresh:
             token.revoke()
 
+        # since the grant content has changed. Make sure it's stored
+        _mngr[_session_info["branch_id"]] = _grant
+
         return _resp
 
     def post_parse_request(
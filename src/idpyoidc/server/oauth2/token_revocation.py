@@ -105,7 +105,8 @@ class TokenRevocation(Endpoint):
     def _revoke(self, request, session_info):
         _context = self.upstream_get("endpoint_context")
         _mngr = _context.session_manager
-        _token = _mngr.find_token(session_info["branch_id"], request["token"])
+        _grant = _mngr[session_info["branch_id"]]
+        _token = _grant.get_token(request["token"])
 
         _cls = _token.token_class
         if _cls not in self.policy:
@@ -124,11 +125,17 @@ class TokenRevocation(Endpoint):
             fn = function
 
         try:
-            return fn(_token, session_info=session_info, **kwargs)
+            _resp = fn(_token, session_info=session_info, **kwargs)
         except Exception as e:
             logger.error(f"Error while executing the {fn} policy function: {e}")
             return self.error_cls(error="server_error", error_description="Internal server error")
 
+        if _token.revoked:
+            _mngr.token_revoked([_token])
+        # since the grant content has changed. Make sure it's stored
+        _mngr[session_info["branch_id"]] = _grant
+        return _resp
+
 
 def validate_token_revocation_policy(token, session_info, **kwargs):
     _token = token
@@ -279,9 +279,14 @@ class Registration(Endpoint):
             if item in request:
                 t[item] = request[item]
 
-        # if it can't load keys because the URL is false it will
-        # just silently fail. Waiting for better times.
-        _keyjar.load_keys(client_id, jwks_uri=t["jwks_uri"], jwks=t["jwks"])
+        _refresher = getattr(_context, "client_key_refresher", None)
+        if t["jwks_uri"] and _refresher:
+            # The keys are fetched in the background
+            _refresher.add(_keyjar, client_id, t["jwks_uri"])
+        else:
+            # if it can't load keys because the URL is false it will
+            # just silently fail. Waiting for better times.
+            _keyjar.load_keys(client_id, jwks_uri=t["jwks_uri"], jwks=t["jwks"])
 
         n_keys = 0
         for kb in _keyjar.get(client_id, []):
@@ -475,6 +480,8 @@ class Registration(Endpoint):
         logger.debug("Stored updated client info in CDB under cid={}".format(client_id))
         logger.debug("ClientInfo: {}".format(_cinfo))
         _context.cdb[client_id] = _cinfo
+        _context.jwx_cache.invalidate(client_id)
+        _context.client_profiles.invalidate(client_id)
 
         # Not all databases can be sync'ed
         if hasattr(_context.cdb, "sync") and callable(_context.cdb.sync):
@@ -26,6 +26,7 @@ from idpyoidc.message.oidc.session import BACK_CHANNEL_LOGOUT_EVENT
 from idpyoidc.message.oidc.session import EndSessionRequest
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.oauth2.authorization import verify_uri
+from idpyoidc.server.signing_executor import get_signing_executor
 from idpyoidc.util import add_path
 from idpyoidc.util import rndstr
 
@@ -108,12 +109,14 @@ class Session(Endpoint):
         ctx, tag = split_ctx_and_tag(_msg)
         return as_unicode(encrypter.decrypt(as_bytes(ctx), iv=self.iv, tag=as_bytes(tag)))
 
-    def do_back_channel_logout(self, cinfo, sid):
+    def submit_back_channel_logout(self, cinfo, sid):
         """
+        Same as do_back_channel_logout but the logout token is signed by the signing
+        executor.
 
         :param cinfo: Client information
         :param sid: The session ID
-        :return: Tuple with logout URI and signed logout token
+        :return: Tuple with logout URI and a future of the signed logout token
         """
 
         _context = self.upstream_get("context")
@@ -143,10 +146,24 @@ class Session(Endpoint):
             sign_alg=alg,
         )
         _jws.with_jti = True
-        _logout_token = _jws.pack(payload=payload, recv=cinfo["client_id"])
+        _logout_token = get_signing_executor(_context).submit(
+            _jws, payload, recv=cinfo["client_id"]
+        )
 
         return back_channel_logout_uri, _logout_token
 
+    def do_back_channel_logout(self, cinfo, sid):
+        """
+
+        :param cinfo: Client information
+        :param sid: The session ID
+        :return: Tuple with logout URI and signed logout token
+        """
+        _spec = self.submit_back_channel_logout(cinfo, sid)
+        if _spec is None:
+            return None
+        return _spec[0], _spec[1].result()
+
     def clean_sessions(self, usids):
         # Revoke all sessions
         _context = self.upstream_get("context")
@@ -184,7 +201,10 @@ class Session(Endpoint):
                     idt = grant.last_issued_token_of_type("id_token")
                     if idt:
                         _rel_sid.append(idt.session_id)
-                        _spec = self.do_back_channel_logout(_cdb[_client_id], idt.session_id)
+                        # Logout tokens are signed in parallel if possible
+                        _spec = self.submit_back_channel_logout(
+                            _cdb[_client_id], idt.session_id
+                        )
                         if _spec:
                             bc_logouts[_client_id] = _spec
                         break
@@ -208,6 +228,9 @@ class Session(Endpoint):
 
         self.clean_sessions(_rel_sid)
 
+        for _client_id, (_uri, _logout_token) in bc_logouts.items():
+            bc_logouts[_client_id] = (_uri, _logout_token.result())
+
         res = {}
         if bc_logouts:
             res["blu"] = bc_logouts
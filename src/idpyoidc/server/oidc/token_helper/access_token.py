@@ -98,6 +98,8 @@ class AccessTokenHelper(TokenEndpointHelper):
             "scope": grant.scope,
         }
 
+        # Shared by all the tokens minted here, so the user info is only fetched once
+        _shared = {"session_info": _session_info}
         if "access_token" in _supports_minting:
             try:
                 token = self._mint_token(
@@ -107,6 +109,7 @@ class AccessTokenHelper(TokenEndpointHelper):
                     client_id=_session_info["client_id"],
                     based_on=_based_on,
                     token_type=token_type,
+                    shared=_shared,
                 )
             except MintingNotAllowed as err:
                 logger.warning(err)
@@ -123,15 +126,13 @@ class AccessTokenHelper(TokenEndpointHelper):
                     session_id=_session_info["branch_id"],
                     client_id=_session_info["client_id"],
                     based_on=_based_on,
+                    shared=_shared,
                 )
             except MintingNotAllowed as err:
                 logger.warning(err)
             else:
                 _response["refresh_token"] = refresh_token.value
 
-        # since the grant content has changed. Make sure it's stored
-        _mngr[_session_info["branch_id"]] = grant
-
         if "openid" in _authn_req["scope"] and "id_token" in _supports_minting:
             if "id_token" in _based_on.usage_rules.get("supports_minting"):
                 try:
@@ -141,6 +142,7 @@ class AccessTokenHelper(TokenEndpointHelper):
                         session_id=_session_info["branch_id"],
                         client_id=_session_info["client_id"],
                         based_on=_based_on,
+                        shared=_shared,
                     )
                 except (JWEException, NoSuitableSigningKeys) as err:
                     logger.warning(str(err))
@@ -154,6 +156,9 @@ class AccessTokenHelper(TokenEndpointHelper):
 
         _based_on.register_usage()
 
+        # since the grant content has changed. Make sure it's stored
+        _mngr[_session_info["branch_id"]] = grant
+
         return _response
 
     def post_parse_request(
@@ -52,6 +52,9 @@ class RefreshTokenHelper(TokenEndpointHelper):
         scope = _grant.find_scope(token.based_on)
         if "scope" in req:
             scope = req["scope"]
+
+        # Shared by all the tokens minted here, so the user info is only fetched once
+        _shared = {"session_info": _session_info}
         access_token = self._mint_token(
             token_class="access_token",
             grant=_grant,
@@ -60,6 +63,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
             based_on=token,
             scope=scope,
             token_type=token_type,
+            shared=_shared,
         )
 
         _resp = {
@@ -86,6 +90,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
                 client_id=_session_info["client_id"],
                 based_on=token,
                 scope=scope,
+                shared=_shared,
             )
             refresh_token.usage_rules = token.usage_rules.copy()
             _resp["refresh_token"] = refresh_token.value
@@ -99,6 +104,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
                     client_id=_session_info["client_id"],
                     based_on=token,
                     scope=scope,
+                    shared=_shared,
                 )
             except (JWEException, NoSuitableSigningKeys) as err:
                 logger.warning(str(err))
@@ -124,6 +130,9 @@ class RefreshTokenHelper(TokenEndpointHelper):
         if revoke_refresh:
             token.revoke()
 
+        # since the grant content has changed. Make sure it's stored
+        _mngr[_session_info["branch_id"]] = _grant
+
         return _resp
 
     def post_parse_request(
@@ -0,0 +1,347 @@
+"""
+Replay protection for one-time identifiers, like the jti of client assertions, request
+objects and DPoP proofs. An identifier is remembered until the JWT it came from has
+expired, after that the JWT is rejected anyway so there is no need to remember it.
+"""
+import sqlite3
+import threading
+from typing import Optional
+from typing import Union
+
+from idpyoidc.storage import DictType
+from idpyoidc.time_util import utc_time_sans_frac
+from idpyoidc.util import instantiate
+
+
+class ReplayCache(DictType):
+    """
+    An in memory replay cache. Identifiers are put in buckets by expiration time, every
+    bucket is emptied once when its time has passed. That makes removing expired
+    identifiers amortized O(1). Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        skew: Optional[int] = 60,
+        default_ttl: Optional[int] = 3600,
+        bucket_size: Optional[int] = 10,
+        entries: Optional[dict] = None,
+        **kwargs
+    ):
+        """
+        :param skew: Seconds an identifier is kept after the JWT expired, to allow for
+            clock skew.
+        :param default_ttl: How long an identifier is kept if the JWT has no expiration time
+        :param bucket_size: Length in seconds of the time span a bucket covers
+        :param entries: Identifiers and their expiration times, as from a dump
+        """
+        self.skew = skew
+        self.default_ttl = default_ttl
+        self.bucket_size = bucket_size
+        # identifier -> expiration time
+        self._expires = {}
+        # bucket number -> identifiers
+        self._buckets = {}
+        self._swept = utc_time_sans_frac() // bucket_size
+        self.added = 0
+        self.rejected = 0
+        self.evicted = 0
+        self._lock = threading.RLock()
+
+        _now = utc_time_sans_frac()
+        for _key, _exp in (entries or {}).items():
+            if _exp >= _now:
+                self._store(_key, _exp)
+
+    @property
+    def kwargs(self) -> dict:
+        # Used when the server context is dumped
+        with self._lock:
+            _entries = dict(self._expires)
+        return {
+            "skew": self.skew,
+            "default_ttl": self.default_ttl,
+            "bucket_size": self.bucket_size,
+            "entries": _entries,
+        }
+
+    def expiration(self, exp: int, now: int) -> int:
+        """
+        :param exp: The expiration time of the JWT, 0 if it has none
+        :param now: The present time
+        :return: Until when the identifier is to be remembered
+        """
+        if exp:
+            _exp = int(exp) + self.skew
+        else:
+            _exp = now + self.default_ttl
+        return max(_exp, now + self.skew)
+
+    def _store(self, key: str, exp: int):
+        self._expires[key] = exp
+        self._buckets.setdefault(exp // self.bucket_size, []).append(key)
+
+    def remove_expired(self, when: Optional[int] = 0) -> int:
+        """
+        Forget identifiers that have expired. Done automatically when identifiers are added.
+
+        :param when: The time against which to check the expiration. 0 means now.
+        :return: Number of removed identifiers
+        """
+        _current = (when or utc_time_sans_frac()) // self.bucket_size
+        with self._lock:
+            if _current <= self._swept:
+                return 0
+
+            if _current - self._swept > len(self._buckets):
+                _due = [_bucket for _bucket in self._buckets if _bucket < _current]
+            else:
+                _due = range(self._swept, _current)
+
+            _evicted = 0
+            for _bucket in _due:
+                for _key in self._buckets.pop(_bucket, []):
+                    _exp = self._expires.get(_key)
+                    # Unless it has been added again with another expiration time
+                    if _exp is not None and _exp // self.bucket_size == _bucket:
+                        del self._expires[_key]
+                        _evicted += 1
+
+            self._swept = _current
+            self.evicted += _evicted
+            return _evicted
+
+    def add(self, key: str, exp: Optional[int] = 0) -> bool:
+        """
+        Remember an identifier unless it is already remembered.
+
+        :param key: The identifier
+        :param exp: The expiration time of the JWT the identifier belongs to
+        :return: True if the identifier was added, False if it has been seen before
+        """
+        _now = utc_time_sans_frac()
+        # Checking and storing must be one step, or two threads could both add the identifier
+        with self._lock:
+            self.remove_expired(_now)
+            _exp = self._expires.get(key)
+            if _exp is not None and _exp >= _now:
+                self.rejected += 1
+                return False
+
+            self._store(key, self.expiration(exp, _now))
+            self.added += 1
+            return True
+
+    def __contains__(self, key: str) -> bool:
+        _exp = self._expires.get(key)
+        return _exp is not None and _exp >= utc_time_sans_frac()
+
+    def __getitem__(self, key: str) -> int:
+        if key not in self:
+            raise KeyError(key)
+        return self._expires[key]
+
+    def __setitem__(self, key: str, value):
+        # For code that uses the cache as a dictionary. The value is ignored.
+        _now = utc_time_sans_frac()
+        with self._lock:
+            self.remove_expired(_now)
+            self._store(key, self.expiration(0, _now))
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            del self._expires[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.remove_expired()
+            return len(self._expires)
+
+    def keys(self):
+        with self._lock:
+            self.remove_expired()
+            return list(self._expires.keys())
+
+    def metrics(self) -> dict:
+        """
+        :return: The number of identifiers remembered, and how many identifiers have been
+            added, rejected as replays and removed since the cache was created.
+        """
+        return {
+            "size": len(self),
+            "added": self.added,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, exp INTEGER)"
+CREATE_INDEX = "CREATE INDEX IF NOT EXISTS {table}_exp ON {table} (exp)"
+SELECT_EXP = "SELECT exp FROM {table} WHERE key = ? AND exp >= ?"
+SELECT_KEYS = "SELECT key FROM {table} WHERE exp >= ?"
+COUNT = "SELECT COUNT(*) FROM {table} WHERE exp >= ?"
+INSERT = "INSERT OR IGNORE INTO {table} (key, exp) VALUES (?, ?)"
+UPSERT = "INSERT OR REPLACE INTO {table} (key, exp) VALUES (?, ?)"
+DELETE = "DELETE FROM {table} WHERE key = ?"
+DELETE_KEY_EXPIRED = "DELETE FROM {table} WHERE key = ? AND exp < ?"
+DELETE_EXPIRED = "DELETE FROM {table} WHERE exp < ?"
+
+
+class SQLiteReplayCache(ReplayCache):
+    """
+    A replay cache in a SQLite database. Several processes, for instance the workers of a
+    server, can share one database file and with that the replay protection.
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str] = "replay.db",
+        table: Optional[str] = "jti",
+        skew: Optional[int] = 60,
+        default_ttl: Optional[int] = 3600,
+        sweep_every: Optional[int] = 100,
+        timeout: Optional[float] = 5.0,
+        **kwargs
+    ):
+        """
+        :param filename: The database file
+        :param table: The database table
+        :param skew: Seconds an identifier is kept after the JWT expired, to allow for
+            clock skew.
+        :param default_ttl: How long an identifier is kept if the JWT has no expiration time
+        :param sweep_every: Remove expired identifiers every this many added identifiers
+        :param timeout: How long to wait for a database lock
+        """
+        self.filename = filename
+        self.table = table
+        self.skew = skew
+        self.default_ttl = default_ttl
+        self.sweep_every = sweep_every
+        self.timeout = timeout
+        self.added = 0
+        self.rejected = 0
+        self.evicted = 0
+        self._lock = threading.RLock()
+
+        self._con = sqlite3.connect(filename, timeout=timeout, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        with self._con:
+            self._con.execute(CREATE_TABLE.format(table=table))
+            self._con.execute(CREATE_INDEX.format(table=table))
+
+        self._sql = {
+            "select_exp": SELECT_EXP.format(table=table),
+            "select_keys": SELECT_KEYS.format(table=table),
+            "count": COUNT.format(table=table),
+            "insert": INSERT.format(table=table),
+            "upsert": UPSERT.format(table=table),
+            "delete": DELETE.format(table=table),
+            "delete_key_expired": DELETE_KEY_EXPIRED.format(table=table),
+            "delete_expired": DELETE_EXPIRED.format(table=table),
+        }
+
+    @property
+    def kwargs(self) -> dict:
+        # The identifiers are in the database, only how to get to them is dumped
+        return {
+            "filename": self.filename,
+            "table": self.table,
+            "skew": self.skew,
+            "default_ttl": self.default_ttl,
+            "sweep_every": self.sweep_every,
+            "timeout": self.timeout,
+        }
+
+    def remove_expired(self, when: Optional[int] = 0) -> int:
+        with self._lock, self._con:
+            _cursor = self._con.execute(
+                self._sql["delete_expired"], (when or utc_time_sans_frac(),)
+            )
+        self.evicted += _cursor.rowcount
+        return _cursor.rowcount
+
+    def add(self, key: str, exp: Optional[int] = 0) -> bool:
+        _now = utc_time_sans_frac()
+        with self._lock:
+            # One transaction, so only one process can add the identifier
+            with self._con:
+                self._con.execute(self._sql["delete_key_expired"], (key, _now))
+                _cursor = self._con.execute(self._sql["insert"], (key, self.expiration(exp, _now)))
+            if _cursor.rowcount != 1:
+                self.rejected += 1
+                return False
+
+            self.added += 1
+            if self.sweep_every and self.added % self.sweep_every == 0:
+                self.remove_expired(_now)
+            return True
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            _row = self._con.execute(
+                self._sql["select_exp"], (key, utc_time_sans_frac())
+            ).fetchone()
+        return _row is not None
+
+    def __getitem__(self, key: str) -> int:
+        with self._lock:
+            _row = self._con.execute(
+                self._sql["select_exp"], (key, utc_time_sans_frac())
+            ).fetchone()
+        if _row is None:
+            raise KeyError(key)
+        return _row[0]
+
+    def __setitem__(self, key: str, value):
+        _now = utc_time_sans_frac()
+        with self._lock, self._con:
+            self._con.execute(self._sql["upsert"], (key, self.expiration(0, _now)))
+
+    def __delitem__(self, key: str):
+        with self._lock, self._con:
+            _cursor = self._con.execute(self._sql["delete"], (key,))
+        if _cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._con.execute(self._sql["count"], (utc_time_sans_frac(),)).fetchone()[0]
+
+    def keys(self):
+        with self._lock:
+            return [
+                _row[0]
+                for _row in self._con.execute(self._sql["select_keys"], (utc_time_sans_frac(),))
+            ]
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+def first_use(jti_db: Union[ReplayCache, dict], key: str, exp: Optional[int] = 0) -> bool:
+    """
+    Check that an identifier has not been used before and remember it.
+
+    :param jti_db: A replay cache, or a dictionary
+    :param key: The identifier
+    :param exp: The expiration time of the JWT the identifier belongs to
+    :return: True if this is the first time the identifier is used
+    """
+    if isinstance(jti_db, ReplayCache):
+        return jti_db.add(key, exp)
+
+    if key in jti_db:
+        return False
+    jti_db[key] = utc_time_sans_frac()
+    return True
+
+
+def init_replay_cache(conf: Optional[dict] = None) -> ReplayCache:
+    """
+    :param conf: Dictionary with the keys 'class' and 'kwargs'
+    :return: A ReplayCache instance, in memory if nothing else is configured.
+    """
+    if not conf:
+        return ReplayCache()
+    return instantiate(conf["class"], **conf.get("kwargs", {}))
@@ -1,3 +1,5 @@
+from idpyoidc.server.client_profile import client_profile
+
 # default set can be changed by configuration
 
 SCOPE2CLAIMS = {
@@ -63,9 +65,9 @@ class Scopes:
         """
         allowed_scopes = self.allowed_scopes
         if client_id:
-            client = self.upstream_get("context").cdb.get(client_id)
-            if client is not None:
-                allowed_scopes = client.get("allowed_scopes", allowed_scopes)
+            _profile = client_profile(self.upstream_get("context"), client_id)
+            if _profile is not None and _profile.allowed_scopes is not None:
+                allowed_scopes = _profile.allowed_scopes
         return allowed_scopes
 
     def get_scopes_mapping(self, client_id=None):
@@ -77,13 +79,17 @@ class Scopes:
         """
         scopes_to_claims = self._scopes_to_claims
         if client_id:
-            client = self.upstream_get("context").cdb.get(client_id)
-            if client is not None:
-                scopes_to_claims = client.get("scopes_to_claims", scopes_to_claims)
+            _profile = client_profile(self.upstream_get("context"), client_id)
+            if _profile is not None and _profile.scopes_to_claims is not None:
+                scopes_to_claims = _profile.scopes_to_claims
         return scopes_to_claims
 
     def filter_scopes(self, scopes, client_id=None):
-        allowed_scopes = self.get_allowed_scopes(client_id)
+        allowed_scopes = self.allowed_scopes
+        if client_id:
+            _profile = client_profile(self.upstream_get("context"), client_id)
+            if _profile is not None and _profile.allowed_scope_set is not None:
+                allowed_scopes = _profile.allowed_scope_set
         return [s for s in scopes if s in allowed_scopes]
 
     def scopes_to_claims(self, scopes, scopes_to_claims=None, client_id=None):
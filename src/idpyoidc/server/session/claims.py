@@ -4,6 +4,7 @@ from typing import Optional
 from typing import Union
 
 from idpyoidc.message.oidc import OpenIDSchema
+from idpyoidc.server.client_profile import client_profile
 from idpyoidc.server.exception import ImproperlyConfigured
 from idpyoidc.server.exception import ServiceError
 
@@ -68,8 +69,11 @@ class ClaimsInterface:
         claims_release_point: str,
         secondary_identifier: Optional[str] = "",
     ):
-        _context = self.upstream_get("context")
-        add_claims_by_scope = _context.cdb[client_id].get("add_claims", {}).get("by_scope", {})
+        _profile = client_profile(self.upstream_get("context"), client_id)
+        if _profile is None:
+            raise KeyError(client_id)
+
+        add_claims_by_scope = _profile.add_claims_by_scope
         if add_claims_by_scope:
             _claims_by_scope = add_claims_by_scope.get(claims_release_point)
             if _claims_by_scope is None and secondary_identifier:
@@ -80,11 +84,11 @@ class ClaimsInterface:
         else:
             _claims_by_scope = module.kwargs.get("add_claims_by_scope", {})
 
-        add_claims_always = _context.cdb[client_id].get("add_claims", {}).get("always", {})
+        add_claims_always = _profile.add_claims_always
         _always_add = add_claims_always.get(claims_release_point, [])
         if secondary_identifier:
-            _always_2 = add_claims_always.get(secondary_identifier, [])
-            _always_add.extend(_always_2)
+            # A new list, the registration is not to be modified
+            _always_add = _always_add + add_claims_always.get(secondary_identifier, [])
 
         return _claims_by_scope, _always_add
 
@@ -151,6 +155,7 @@ class ClaimsInterface:
         scopes: str,
         claims_release_point: str,
         secondary_identifier: Optional[str] = "",
+        session_info: Optional[dict] = None,
     ) -> dict:
         """
 
@@ -160,10 +165,12 @@ class ClaimsInterface:
         :param scopes: Scopes
         :param claims_release_point: Where to release the claims. One of
             "userinfo"/"id_token"/"introspection"/"access_token"
+        :param session_info: Session information, including the grant, if already known
         :return: Claims specification as a dictionary.
         """
-        _context = self.upstream_get("context")
-        session_info = _context.session_manager.get_session_info(session_id, grant=True)
+        if session_info is None:
+            _context = self.upstream_get("context")
+            session_info = _context.session_manager.get_session_info(session_id, grant=True)
         client_id = session_info["client_id"]
         grant = session_info["grant"]
 
@@ -200,19 +207,34 @@ class ClaimsInterface:
             auth_req = {}
         return self.get_claims_all_usage_from_request(auth_req, scopes)
 
-    def get_user_claims(self, user_id: str, claims_restriction: dict) -> dict:
+    def get_user_info(self, user_id: str) -> dict:
         """
+        Get all the claims the user info backend has about a user.
 
         :param user_id: User identifier
-        :param claims_restriction: Specifies the upper limit of which claims can be returned
-        :return:
+        :return: Dictionary with claims
         """
         meth = self.upstream_get("context").userinfo
         if not meth:
             raise ImproperlyConfigured("userinfo MUST be defined in the configuration")
+        return meth(user_id, client_id=None)
+
+    def get_user_claims(
+        self, user_id: str, claims_restriction: dict, user_info: Optional[dict] = None
+    ) -> dict:
+        """
+
+        :param user_id: User identifier
+        :param claims_restriction: Specifies the upper limit of which claims can be returned
+        :param user_info: All the claims about the user, if already known
+        :return:
+        """
+        if not self.upstream_get("context").userinfo:
+            raise ImproperlyConfigured("userinfo MUST be defined in the configuration")
         if claims_restriction:
             # Get all possible claims
-            user_info = meth(user_id, client_id=None)
+            if user_info is None:
+                user_info = self.get_user_info(user_id)
             # Filter out the claims that can be returned
             return {
                 k: user_info.get(k)
@@ -1,5 +1,6 @@
 import base64
 import logging
+import threading
 from typing import List
 from typing import Optional
 from typing import Union
@@ -7,6 +8,8 @@ from typing import Union
 import cryptography
 from cryptojwt import as_unicode
 
+from idpyoidc.cache import LRUCache
+from idpyoidc.encrypter import KeyedEncrypter
 from idpyoidc.encrypter import default_crypt_config
 from idpyoidc.encrypter import init_encrypter
 from idpyoidc.impexp import ImpExp
@@ -14,6 +17,7 @@ from idpyoidc.item import DLDict
 from idpyoidc.server.constant import DIVIDER
 from idpyoidc.server.util import lv_pack
 from idpyoidc.server.util import lv_unpack
+from idpyoidc.util import instantiate
 from idpyoidc.util import rndstr
 from .grant import Grant
 from .info import NodeInfo
@@ -21,12 +25,26 @@ from .info import NodeInfo
 logger = logging.getLogger(__name__)
 
 
+def init_storage(conf: Optional[dict] = None):
+    """
+    Instantiates the storage in which the nodes are kept. The storage must have the same
+    interface as :py:class:`idpyoidc.item.DLDict`. If no configuration is given, nodes are
+    kept in memory.
+
+    :param conf: Storage configuration, a dictionary with the keys 'class' and 'kwargs'.
+    :return: A storage instance
+    """
+    if not conf:
+        return DLDict()
+
+    return instantiate(conf["class"], **conf.get("kwargs", {}))
+
+
 class Database(ImpExp):
     parameter = {"db": DLDict, "crypt_config": {}}
 
     def __init__(self, crypt_config: Optional[dict] = None, **kwargs):
         ImpExp.__init__(self)
-        self.db = DLDict()
 
         for k, v in kwargs.items():
             setattr(self, k, v)
@@ -38,9 +56,18 @@ class Database(ImpExp):
         self.crypt = _crypt["encrypter"]
         self.crypt_config = _crypt["conf"]
 
-        session_params = kwargs.get("session_params", {})
+        session_params = kwargs.get("session_params") or {}
         self.node_type = session_params.get("node_type")
         self.node_info_class = session_params.get("node_info_class")
+        self.db = init_storage(session_params.get("storage"))
+        # Held while nodes are added or removed, shared with the expiry sweeper
+        self.lock = threading.RLock()
+
+        # Decrypted branch IDs
+        _cache_conf = session_params.get("branch_id_cache") or {}
+        self.branch_id_cache = LRUCache(
+            max_size=_cache_conf.get("max_size", 1024), ttl=_cache_conf.get("ttl", 600)
+        )
 
     @staticmethod
     def branch_key(*args):
@@ -64,6 +91,10 @@ class Database(ImpExp):
         Given an encrypted key, decrypt it and then unpack the key to return an ordered list
         of names.
         """
+        _path = self.branch_id_cache.get(key)
+        if _path is not None:
+            return list(_path)
+
         try:
             plain = self.crypt.decrypt(base64.b64decode(key))
         except cryptography.fernet.InvalidToken as err:
@@ -73,7 +104,15 @@ class Database(ImpExp):
             logger.error(f"Other decrypt error ({err}), key={key}")
             raise ValueError(err)
         # order: rnd, type, sid
-        return self.unpack_branch_key(lv_unpack(as_unicode(plain))[1])
+        _path = self.unpack_branch_key(lv_unpack(as_unicode(plain))[1])
+        self.branch_id_cache.set(key, tuple(_path))
+        return _path
+
+    def _forget_branch_ids(self, path: List[str]):
+        """Remove cached branch IDs that points to a node at or below path."""
+        _path = tuple(path)
+        _len = len(_path)
+        self.branch_id_cache.delete_if(lambda p: p[:_len] == _path)
 
     def set(self, path: List[str], value: Union[NodeInfo, Grant]):
         """
@@ -83,10 +122,14 @@ class Database(ImpExp):
         :param path: a list of identifiers. root -> .. -> leaf
         :param value: Class instance to be stored
         """
+        with self.lock:
+            self._set(path, value)
 
+    def _set(self, path: List[str], value: Union[NodeInfo, Grant]):
         _len = len(path)
 
         _superior = None
+        _superior_key = ""
         for i in range(_len):
             _key = self.branch_key(*path[0 : i + 1])
             # _key = path[i]
@@ -103,16 +146,24 @@ class Database(ImpExp):
                     else:
                         _cls = NodeInfo
                     _info = _cls(path[i])
+                _store = True
+            elif i == _len - 1:
+                _info = value  # overwrite old value
+                _store = True
             else:
-                if i == _len - 1:
-                    _info = value  # overwrite old value
+                _store = False
 
             if _superior:
                 if _key not in getattr(_superior, "subordinate", {}):
                     _superior.add_subordinate(_key)
+                    # The superior has changed
+                    self.db[_superior_key] = _superior
 
-            self.db[_key] = _info
+            # Only write nodes that are new or changed
+            if _store:
+                self.db[_key] = _info
             _superior = _info
+            _superior_key = _key
 
     def get(self, path: List[str]) -> Union[NodeInfo, Grant]:
         """Given a path return the node that matches the path."""
@@ -126,12 +177,22 @@ class Database(ImpExp):
         @param path:
         @return:
         """
+        with self.lock:
+            self._delete_sub_tree(key)
+        self._forget_branch_ids(self.unpack_branch_key(key))
+
+    def _delete_sub_tree(self, key: str):
         _node = self.db[key]
         if hasattr(_node, "subordinate"):
             for _sub in _node.subordinate:
-                self.delete_sub_tree(_sub)
+                self._delete_sub_tree(_sub)
 
         self.db.__delitem__(key)
+        self._node_removed(key)
+
+    def _node_removed(self, key: str):
+        """Called when a node has been removed from the database."""
+        pass
 
     def delete(self, path: List[str]):
         """
@@ -142,11 +203,18 @@ class Database(ImpExp):
         @param path:
         @return:
         """
+        with self.lock:
+            self._delete(path)
+
+    def _delete(self, path: List[str]):
         if path[0] not in self.db:
             return
 
+        self._forget_branch_ids(path)
+
         if len(path) == 1:
             self.db.__delitem__(path[0])
+            self._node_removed(path[0])
             return
 
         # start at leaf and work our way upwards
@@ -164,13 +232,16 @@ class Database(ImpExp):
                         _node.subordinate.remove(_sub)
                         if _node.subordinate == []:
                             self.db.__delitem__(_key)
+                            self._node_removed(_key)
                         else:
+                            self.db[_key] = _node
                             return
                 else:
                     if isinstance(_node, NodeInfo) and _node.subordinate:
                         for _s in _node.subordinate:
-                            self.delete_sub_tree(_s)
+                            self._delete_sub_tree(_s)
                     self.db.__delitem__(_key)
+                    self._node_removed(_key)
             _sub = _key
 
     def update(self, path: List[str], new_info: dict):
@@ -180,8 +251,61 @@ class Database(ImpExp):
         self.set(path, _info)
 
     def flush(self):
-        self.db = DLDict()
+        with self.lock:
+            self.db.clear()
+        self.branch_id_cache.clear()
+
+    def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        if isinstance(self.crypt, KeyedEncrypter):
+            # Keys may have been added or removed since the encrypter was configured
+            self.crypt_config = {"class": self.crypt_config["class"], "kwargs": self.crypt.kwargs}
+        return ImpExp.dump(self, exclude_attributes=exclude_attributes)
+
+    def load(self, item: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None):
+        _storage = self.db
+        ImpExp.load(self, item, init_args=init_args, load_args=load_args)
+        if not isinstance(_storage, DLDict):
+            # Move the loaded nodes into the configured storage
+            for key, val in self.db.items():
+                _storage[key] = val
+            if hasattr(_storage, "commit"):
+                _storage.commit()
+            self.db = _storage
+        # What was loaded is the base for the next delta
+        self.checkpoint()
+        return self
+
+    def checkpoint(self):
+        """
+        Mark the present state as the base for the next delta. Should be called after a
+        full dump.
+        """
+        self.db.checkpoint()
+
+    def dump_delta(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        """
+        Dump the nodes that has been changed or removed since the last checkpoint.
+        Sets a new checkpoint.
+
+        :param exclude_attributes: Attributes that should not be dumped
+        :return: A dictionary with the keys *set* and *delete*
+        """
+        return self.db.dump_delta(exclude_attributes=exclude_attributes)
+
+    def apply_delta(
+        self, delta: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None
+    ):
+        """
+        Apply changes produced by dump_delta to a database that has the same base.
+
+        :param delta: Output from dump_delta
+        """
+        self.db.apply_delta(delta, init_args=init_args, load_args=load_args)
+        for key in delta.get("delete", []):
+            self._forget_branch_ids(self.unpack_branch_key(key))
+        return self
 
     def local_load_adjustments(self, **kwargs):
         _crypt = init_encrypter(self.crypt_config)
         self.crypt = _crypt["encrypter"]
+        self.branch_id_cache.clear()
@@ -1,8 +1,10 @@
 import logging
+from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 from uuid import uuid1
 
 from idpyoidc.impexp import ImpExp
@@ -11,6 +13,7 @@ from idpyoidc.message.oauth2 import AuthorizationRequest
 from idpyoidc.server.authn_event import AuthnEvent
 from idpyoidc.server.session.token import TOKEN_MAP
 from idpyoidc.server.token import Token as TokenHandler
+from idpyoidc.time_util import utc_time_sans_frac
 from idpyoidc.util import importer
 from . import MintingNotAllowed
 from .claims import claims_match
@@ -77,11 +80,55 @@ def token_map_load(items: dict, **kwargs):
     return {k: importer(v) for k, v in items.items()}
 
 
+def shared_value(shared: Optional[dict], key: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Get a value that is shared between tokens minted together. The value is only
+    computed the first time it's asked for.
+
+    :param shared: Where the shared values are kept. If None nothing is shared and
+        None is returned.
+    :param key: The name of the value
+    :param func: Function that computes the value
+    :return: The value
+    """
+    if shared is None:
+        return None
+
+    try:
+        return shared[key]
+    except KeyError:
+        _val = shared[key] = func(*args, **kwargs)
+        return _val
+
+
 def remember_token(token):
     logger.info(str(token))
 
 
 class Grant(Item):
+    __slots__ = (
+        "authentication_event",
+        "authorization_details",
+        "authorization_request",
+        "claims",
+        "extra",
+        "id",
+        "issued_token",
+        "on_revoke",
+        "remember_token",
+        "remove_inactive_token",
+        "resources",
+        "scope",
+        "sub",
+        "token_map",
+        # token index
+        "_token_by_value",
+        "_token_by_based_on",
+        "_latest_token",
+        "_indexed_list",
+        "_indexed_len",
+        "_compact_at",
+    )
     parameter = Item.parameter.copy()
     parameter.update(
         {
@@ -122,6 +169,7 @@ class Grant(Item):
         extra: Optional[Dict[str, str]] = None,
         remember_token: Optional[Callable] = None,
         remove_inactive_token: Optional[bool] = False,
+        on_revoke: Optional[Callable] = None,
     ):
         Item.__init__(
             self,
@@ -143,12 +191,61 @@ class Grant(Item):
         self.extra = extra or {}
         self.remember_token = remember_token
         self.remove_inactive_token = remove_inactive_token
+        # Called with the list of tokens that has been revoked
+        self.on_revoke = on_revoke
 
         if token_map is None:
             self.token_map = TOKEN_MAP
         else:
             self.token_map = token_map
 
+        self._reset_token_index()
+        # Compact on mint when there are more tokens than this. Not part of the index,
+        # so rebuilding the index does not reset it.
+        self._compact_at = 0
+
+    def _reset_token_index(self):
+        # Lookup indexes over issued_token. They are derived data and never dumped.
+        self._token_by_value = {}
+        self._token_by_based_on = {}
+        self._latest_token = {}
+        self._indexed_list = None
+        self._indexed_len = 0
+
+    def _index_token(self, token: SessionToken):
+        if token.value not in self._token_by_value:
+            self._token_by_value[token.value] = token
+        if token.based_on:
+            self._token_by_based_on.setdefault(token.based_on, []).append(token)
+        _latest = self._latest_token.get(token.token_class)
+        if _latest is None or token.issued_at > _latest.issued_at:
+            self._latest_token[token.token_class] = token
+
+    def _token_index(self):
+        """
+        Make sure the indexes reflect issued_token. The list may have been replaced
+        (load, flush) or appended to directly, in which case the indexes are rebuilt.
+        """
+        if self._indexed_list is not self.issued_token or self._indexed_len != len(
+            self.issued_token
+        ):
+            self._reset_token_index()
+            for token in self.issued_token:
+                self._index_token(token)
+            self._indexed_list = self.issued_token
+            self._indexed_len = len(self.issued_token)
+
+    def add_issued_token(self, token: SessionToken):
+        """
+        Add a token to the set of issued tokens and index it.
+
+        :param token: A SessionToken instance
+        """
+        self._token_index()
+        self.issued_token.append(token)
+        self._index_token(token)
+        self._indexed_len += 1
+
     def get_message(self) -> object:
         return GrantMessage(
             scope=self.scope,
@@ -190,6 +287,7 @@ class Grant(Item):
         scope: Optional[dict] = None,
         extra_payload: Optional[dict] = None,
         secondary_identifier: str = "",
+        shared: Optional[dict] = None,
     ) -> dict:
         """
 
@@ -200,6 +298,7 @@ class Grant(Item):
         :param extra_payload:
         :param secondary_identifier: Used if the claims returned are also based on rules for
             another release_point
+        :param shared: Information that is shared between tokens minted together
         :type item: SessionToken
         :return: dictionary containing information to place in a token value
         """
@@ -239,11 +338,24 @@ class Grant(Item):
                 scopes=payload["scope"],
                 claims_release_point=claims_release_point,
                 secondary_identifier=secondary_identifier,
+                session_info=shared_value(
+                    shared,
+                    "session_info",
+                    context.session_manager.get_session_info,
+                    session_id,
+                    grant=True,
+                ),
             )
 
         if _claims_restriction and context.session_manager.node_type[0] == "user":
             user_id, _, _ = context.session_manager.decrypt_branch_id(session_id)
-            user_info = context.claims_interface.get_user_claims(user_id, _claims_restriction)
+            user_info = context.claims_interface.get_user_claims(
+                user_id,
+                _claims_restriction,
+                user_info=shared_value(
+                    shared, "user_info", context.claims_interface.get_user_info, user_id
+                ),
+            )
             payload.update(user_info)
 
         # Should I add the acr value
@@ -254,7 +366,7 @@ class Grant(Item):
 
         return payload
 
-    def mint_token(
+    def _new_token(
         self,
         session_id: str,
         context: object,
@@ -267,19 +379,15 @@ class Grant(Item):
         expires_in: Optional[int] = 0,
         not_before: Optional[int] = 0,
         claims: Optional[List[str]] = None,
+        shared: Optional[dict] = None,
         **kwargs,
-    ) -> Optional[SessionToken]:
+    ) -> Optional[Tuple[SessionToken, TokenHandler, dict]]:
         """
+        Everything that goes before minting the token value. The arguments are the same
+        as for :py:meth:`mint_token`.
 
-        :param session_id:
-        :param context:
-        :param token_type:
-        :param token_handler:
-        :param based_on:
-        :param usage_rules:
-        :param scope:
-        :param kwargs:
-        :return:
+        :return: Tuple of the token without a value, the token handler and the arguments
+            to the token handler. None if the grant is not active.
         """
         if self.is_active() is False:
             return None
@@ -369,56 +477,215 @@ class Grant(Item):
                 scope=scope,
                 extra_payload=handler_args,
                 secondary_identifier=_secondary_identifier,
+                shared=shared,
             )
 
             logger.debug(f"token_payload: {token_payload}")
-
-            item.value = token_handler(
-                session_id=session_id, usage_rules=usage_rules, **token_payload
-            )
-
         else:
             raise ValueError("Can not mint that kind of token")
 
-        self.issued_token.append(item)
+        _call_args = dict(session_id=session_id, usage_rules=usage_rules, **token_payload)
+        return item, token_handler, _call_args
+
+    def _issue(self, item: SessionToken, context: object) -> SessionToken:
+        self.add_issued_token(item)
         self.used += 1
+
+        _compaction = getattr(context.session_manager, "token_compaction", None)
+        if _compaction and _compaction.get("on_mint"):
+            # Amortized, only compact when the number of tokens has doubled since the
+            # last time.
+            if len(self.issued_token) > self._compact_at:
+                _keep = _compaction.get("keep", 0)
+                self.compact_tokens(keep=_keep)
+                self._compact_at = max(2 * len(self.issued_token), _keep, 1)
+
         return item
 
+    def mint_token(
+        self,
+        session_id: str,
+        context: object,
+        token_class: str,
+        token_handler: TokenHandler = None,
+        based_on: Optional[SessionToken] = None,
+        usage_rules: Optional[dict] = None,
+        scope: Optional[list] = None,
+        token_type: Optional[str] = "",
+        expires_in: Optional[int] = 0,
+        not_before: Optional[int] = 0,
+        claims: Optional[List[str]] = None,
+        shared: Optional[dict] = None,
+        **kwargs,
+    ) -> Optional[SessionToken]:
+        """
+
+        :param session_id:
+        :param context:
+        :param token_type:
+        :param token_handler:
+        :param based_on:
+        :param usage_rules:
+        :param scope:
+        :param shared: Information that is shared between tokens minted together,
+            see :py:meth:`mint_tokens`
+        :param kwargs:
+        :return:
+        """
+        _new = self._new_token(
+            session_id,
+            context,
+            token_class,
+            token_handler=token_handler,
+            based_on=based_on,
+            usage_rules=usage_rules,
+            scope=scope,
+            token_type=token_type,
+            expires_in=expires_in,
+            not_before=not_before,
+            claims=claims,
+            shared=shared,
+            **kwargs,
+        )
+        if _new is None:
+            return None
+
+        item, token_handler, _call_args = _new
+        item.value = token_handler(**_call_args)
+        return self._issue(item, context)
+
+    def mint_tokens(
+        self, session_id: str, context: object, tokens: List[dict], **kwargs
+    ) -> List[Optional[SessionToken]]:
+        """
+        Mint a number of tokens in one go. Like an access token, a refresh token and an
+        ID token in exchange for an authorization code.
+        The session information and the claims the user info backend has about the user
+        are only fetched once and then used for all the tokens. All the tokens are handed
+        to the token handlers' submit methods before waiting for any of them, so JWTs are
+        signed in parallel if a signing executor is configured. That also means that no
+        token can be based on, or carry a hash of, another token minted in the same call.
+
+        :param session_id: Session ID
+        :param context: EndPoint Context
+        :param tokens: One dictionary per token with the arguments to :py:meth:`mint_token`,
+            must at least contain token_class.
+        :param kwargs: Arguments that are the same for all tokens
+        :return: List of minted tokens, in the same order as the token specifications
+        """
+        _shared = {}
+        _pending = []
+        for _spec in tokens:
+            _args = kwargs.copy()
+            _args.update(_spec)
+            _new = self._new_token(session_id, context, shared=_shared, **_args)
+            if _new is None:
+                _pending.append(None)
+                continue
+            item, token_handler, _call_args = _new
+            _pending.append((item, token_handler.submit(**_call_args)))
+
+        res = []
+        for _minted in _pending:
+            if _minted is None:
+                res.append(None)
+                continue
+            item, _future = _minted
+            item.value = _future.result()
+            res.append(self._issue(item, context))
+        return res
+
     def get_token(self, value: str) -> Optional[SessionToken]:
-        for t in self.issued_token:
-            if t.value == value:
-                return t
-        return None
+        self._token_index()
+        return self._token_by_value.get(value)
+
+    def _tokens_based_on(self, value: str, recursive: bool) -> List[SessionToken]:
+        res = []
+        _todo = [value]
+        while _todo:
+            for t in self._token_by_based_on.get(_todo.pop(), []):
+                res.append(t)
+                if recursive:
+                    _todo.append(t.value)
+        return res
+
+    def revoke(self):
+        Item.revoke(self)
+        # The tokens can not be used anymore either
+        if self.on_revoke and self.issued_token:
+            self.on_revoke(self.issued_token)
 
     def revoke_token(
         self, value: Optional[str] = "", based_on: Optional[str] = "", recursive: bool = True
     ):
-        remain = []
-        for t in self.issued_token:
-            if not value and not based_on:
-                t.revoked = True
-            elif value and based_on:
-                if value == t.value and based_on == t.based_on:
-                    t.revoked = True
-            elif value and t.value == value:
-                t.revoked = True
-                if recursive:
-                    self.revoke_token(based_on=t.value)
-            elif based_on and t.based_on == based_on:
-                t.revoked = True
+        self._token_index()
+        if not value and not based_on:
+            _revoke = self.issued_token
+        elif value and based_on:
+            _revoke = [t for t in self._token_by_based_on.get(based_on, []) if t.value == value]
+        elif value:
+            _token = self._token_by_value.get(value)
+            if _token is None:
+                _revoke = []
+            else:
+                _revoke = [_token]
                 if recursive:
-                    self.revoke_token(based_on=t.value)
+                    _revoke.extend(self._tokens_based_on(_token.value, recursive))
+        else:
+            _revoke = self._tokens_based_on(based_on, recursive)
 
-            if t.revoked:
-                if self.remove_inactive_token:
+        for t in _revoke:
+            t.revoked = True
+        if self.on_revoke and _revoke:
+            self.on_revoke(_revoke)
+
+        if self.remove_inactive_token:
+            remain = []
+            for t in self.issued_token:
+                if t.revoked:
                     if self.remember_token:
                         self.remember_token(t)
                 else:
                     remain.append(t)
-            else:
-                remain.append(t)
+            self.issued_token = remain
+
+    def compact_tokens(self, keep: Optional[int] = 0, now: Optional[int] = 0) -> int:
+        """
+        Remove tokens that can never be used again, that is tokens that are revoked,
+        expired or has reached their max usage. Tokens that active tokens are based on
+        are kept as are the *keep* latest issued inactive tokens.
 
-        self.issued_token = remain
+        :param keep: Number of inactive tokens to keep
+        :param now: The time against which expiration is checked. 0 means now.
+        :return: The number of tokens that was removed
+        """
+        self._token_index()
+        if not now:
+            now = utc_time_sans_frac()
+
+        _needed = set()
+        _inactive = []
+        for t in self.issued_token:
+            if t.revoked or t.max_usage_reached() or (t.expires_at and now > t.expires_at):
+                _inactive.append(t)
+            else:
+                _base = self._token_by_value.get(t.based_on) if t.based_on else None
+                while _base is not None and id(_base) not in _needed:
+                    _needed.add(id(_base))
+                    _base = self._token_by_value.get(_base.based_on) if _base.based_on else None
+
+        _removable = [t for t in _inactive if id(t) not in _needed]
+        if keep:
+            _removable = _removable[:-keep]
+        if not _removable:
+            return 0
+
+        _remove = {id(t) for t in _removable}
+        if self.remember_token:
+            for t in _removable:
+                self.remember_token(t)
+        self.issued_token = [t for t in self.issued_token if id(t) not in _remove]
+        return len(_removable)
 
     def get_spec(self, token: SessionToken) -> Optional[dict]:
         if self.is_active() is False or token.is_active is False:
@@ -436,14 +703,8 @@ class Grant(Item):
         return res
 
     def last_issued_token_of_type(self, token_class):
-        res = None
-        for t in self.issued_token:
-            if t.token_class == token_class:
-                if res is None:
-                    res = t
-                elif t.issued_at > res.issued_at:
-                    res = t
-        return res
+        self._token_index()
+        return self._latest_token.get(token_class)
 
 
 DEFAULT_USAGE = {
@@ -539,6 +800,7 @@ class ExchangeGrant(Grant):
         scope: Optional[dict] = None,
         extra_payload: Optional[dict] = None,
         secondary_identifier: str = "",
+        shared: Optional[dict] = None,
     ) -> dict:
         """
         :param session_id: Session ID
@@ -548,6 +810,7 @@ class ExchangeGrant(Grant):
         :param extra_payload:
         :param secondary_identifier: Used if the claims returned are also based on rules for
             another release_point
+        :param shared: Information that is shared between tokens minted together
         :param item: A SessionToken instance
         :type item: SessionToken
         :return: dictionary containing information to place in a token value
@@ -589,10 +852,23 @@ class ExchangeGrant(Grant):
                 scopes=scope,
                 claims_release_point=claims_release_point,
                 secondary_identifier=secondary_identifier,
+                session_info=shared_value(
+                    shared,
+                    "session_info",
+                    endpoint_context.session_manager.get_session_info,
+                    session_id,
+                    grant=True,
+                ),
             )
 
         user_id, _, _ = endpoint_context.session_manager.decrypt_session_id(session_id)
-        user_info = endpoint_context.claims_interface.get_user_claims(user_id, _claims_restriction)
+        user_info = endpoint_context.claims_interface.get_user_claims(
+            user_id,
+            _claims_restriction,
+            user_info=shared_value(
+                shared, "user_info", endpoint_context.claims_interface.get_user_info, user_id
+            ),
+        )
         payload.update(user_info)
 
         # Should I add the acr value
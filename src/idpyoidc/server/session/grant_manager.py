@@ -10,6 +10,7 @@ from typing import Union
 
 from idpyoidc.encrypter import default_crypt_config
 from idpyoidc.encrypter import get_crypt_config
+from idpyoidc.item import DLDict
 from idpyoidc.message.oauth2 import TokenExchangeRequest
 from idpyoidc.server.session.info import ClientSessionInfo
 from idpyoidc.server.token import handler
@@ -17,6 +18,9 @@ from .database import Database
 from .grant import ExchangeGrant
 from .grant import Grant
 from .info import NodeInfo
+from .sweeper import ExpirySweeper
+from .token import COMPACT_TOKEN_MAP
+from .token import SessionToken
 from ..exception import InvalidBranchID
 from ..token.handler import TokenHandler
 
@@ -49,6 +53,47 @@ class GrantManager(Database):
         self.token_handler = handler
         self.remember_token = remember_token
         self.remove_inactive_token = remove_inactive_token
+        self.token_compaction = session_params.get("token_compaction") or {}
+        self.compact_tokens = session_params.get("compact_tokens", False)
+
+        # Secondary indexes, client_id -> client node keys and user_id -> grant keys
+        self._client_index = {}
+        self._user_index = {}
+
+        _sweeper_conf = session_params.get("expiry_sweeper")
+        if _sweeper_conf:
+            self.expiry_sweeper = ExpirySweeper(self, **_sweeper_conf)
+            self.expiry_sweeper.populate()
+        else:
+            self.expiry_sweeper = None
+
+    def token_revoked(self, tokens: List[SessionToken]):
+        """
+        Tell the token handlers that keeps a revocation list about revoked tokens.
+
+        :param tokens: List of SessionToken instances
+        """
+        _handlers = getattr(self.token_handler, "handler", None)
+        if not _handlers:
+            return
+        for _token in tokens:
+            _revocation_list = getattr(_handlers.get(_token.token_class), "revocation_list", None)
+            if _revocation_list is not None and _token.value:
+                _revocation_list.add_token(_token.value)
+
+    def _attach(self, node):
+        """
+        Grants that were loaded, or read from a storage, have lost their on_revoke callback.
+
+        :param node: A node read from the database
+        :return: The node
+        """
+        if isinstance(node, Grant) and node.on_revoke is None:
+            node.on_revoke = self.token_revoked
+        return node
+
+    def get(self, path: List[str]) -> Union[NodeInfo, Grant]:
+        return self._attach(super().get(path))
 
     def get_salt(self):
         """returns the original salt assigned in init"""
@@ -67,6 +112,78 @@ class GrantManager(Database):
     def __setitem__(self, branch_id: str, value):
         return self.set(self.decrypt_branch_id(branch_id), value)
 
+    def _level(self, node_type: str) -> Optional[int]:
+        if self.node_type and node_type in self.node_type:
+            return self.node_type.index(node_type)
+        return None
+
+    def _index_key(self, key: str):
+        _path = self.unpack_branch_key(key)
+        _client_level = self._level("client")
+        if _client_level is not None and len(_path) > _client_level:
+            _client_key = self.branch_key(*_path[0 : _client_level + 1])
+            self._client_index.setdefault(_path[_client_level], {})[_client_key] = None
+
+        _user_level = self._level("user")
+        if _user_level is not None and len(_path) == len(self.node_type):
+            self._user_index.setdefault(_path[_user_level], {})[key] = None
+
+    def _unindex_key(self, key: str):
+        _path = self.unpack_branch_key(key)
+        _level = len(_path) - 1
+        if _level == self._level("client"):
+            _index = self._client_index
+        elif self._level("user") is not None and len(_path) == len(self.node_type):
+            _index = self._user_index
+            _level = self._level("user")
+        else:
+            return
+
+        _keys = _index.get(_path[_level])
+        if _keys is not None:
+            _keys.pop(key, None)
+            if not _keys:
+                del _index[_path[_level]]
+
+    def _keys_for(self, node_type: str, name: str) -> List[str]:
+        """
+        The keys of the client nodes belonging to a client or of the grants belonging to a
+        user. The indexes only know about nodes added by this process, so if the storage
+        can be shared with other processes the storage is scanned instead.
+
+        :param node_type: "client" or "user"
+        :param name: Client or user identifier
+        :return: List of branch keys
+        """
+        if isinstance(self.db, DLDict):
+            _index = self._client_index if node_type == "client" else self._user_index
+            return list(_index.get(name, {}))
+
+        _level = self._level(node_type)
+        if _level is None:
+            return []
+        _len = _level + 1 if node_type == "client" else len(self.node_type)
+        res = []
+        for key in self.db.keys():
+            _path = self.unpack_branch_key(key)
+            if len(_path) == _len and _path[_level] == name:
+                res.append(key)
+        return res
+
+    def _rebuild_indexes(self):
+        self._client_index = {}
+        self._user_index = {}
+        for key in list(self.db.keys()):
+            self._index_key(key)
+
+    def _node_removed(self, key: str):
+        self._unindex_key(key)
+
+    def set(self, path: List[str], value: Union[NodeInfo, Grant]):
+        with self.lock:
+            super().set(path, value)
+            self._index_key(self.branch_key(*path))
+
     def _setup_branch(self, path):
         for i in range(len(path)):
             _id = path[0 : i + 1]
@@ -100,23 +217,28 @@ class GrantManager(Database):
         :return: A branch ID
         :param scope:
         """
-
-        self._setup_branch(path)
-
         grant_args = {k: v for k, v in kwargs.items() if k in Grant.parameter}
         if "usage_rules" not in grant_args and token_usage_rules:
             grant_args["usage_rules"] = token_usage_rules
+        if "token_map" not in grant_args and self.compact_tokens:
+            grant_args["token_map"] = COMPACT_TOKEN_MAP
 
         grant = Grant(
             remember_token=self.remember_token,
             remove_inactive_token=self.remove_inactive_token,
+            on_revoke=self.token_revoked,
             scope=scope,
             **grant_args,
         )
 
         _id = path[:]
         _id.append(grant.id)
-        self.set(_id, grant)
+        with self.lock:
+            self._setup_branch(path)
+            self.set(_id, grant)
+        if self.expiry_sweeper:
+            # Expiration time is normally not known yet, so take a look at the next sweep.
+            self.expiry_sweeper.schedule(self.branch_key(*_id))
 
         return self.encrypted_branch_id(*_id)
 
@@ -137,9 +259,6 @@ class GrantManager(Database):
         :param token_usage_rules:
         :return:
         """
-
-        self._setup_branch(path)
-
         grant = ExchangeGrant(
             original_branch_id=original_branch_id,
             exchange_request=exchange_request,
@@ -149,10 +268,18 @@ class GrantManager(Database):
         if grant_args:
             for key, val in grant_args.items():
                 setattr(grant, key, val)
+        grant.on_revoke = self.token_revoked
+        if "token_map" not in grant_args and self.compact_tokens:
+            grant.token_map = COMPACT_TOKEN_MAP
 
         _id = path[:]
         _id.append(grant.id)
-        self.set(_id, grant)
+        with self.lock:
+            self._setup_branch(path)
+            self.set(_id, grant)
+        if self.expiry_sweeper:
+            # Expiration time is normally not known yet, so take a look at the next sweep.
+            self.expiry_sweeper.schedule(self.branch_key(*_id))
 
         return self.encrypted_branch_id(*_id)
 
@@ -205,18 +332,21 @@ class GrantManager(Database):
         :return:
         """
         session_info = self.get(path)
-        return [self.db[gid] for gid in session_info.subordinate if gid in self.db]
+        return [self._attach(self.db[gid]) for gid in session_info.subordinate if gid in self.db]
 
     def get_grant_argument(self, branch_id: str, arg: str):
         grant = self[branch_id]
         return getattr(grant, arg)
 
-    def _revoke_tree(self, node):
-        node.revoke()
+    def _revoke_tree(self, node, key: Optional[str] = ""):
+        self._attach(node).revoke()
+        if key:
+            # Make sure the change is stored
+            self.db[key] = node
         if isinstance(node, NodeInfo):
             for _sub in node.subordinate:
                 _sub_node = self.db[_sub]
-                self._revoke_tree(_sub_node)
+                self._revoke_tree(_sub_node, _sub)
 
     def revoke_sub_tree(self, branch_id: str, level: Optional[int] = None):
         """
@@ -226,13 +356,12 @@ class GrantManager(Database):
         :param level: the node number
         """
         _path = self.decrypt_branch_id(branch_id)
-        if level is None:
-            _node = self.get(_path)
-        else:
+        if level is not None:
             if level > len(_path):
                 raise ValueError("Looking for level beyond what is available")
-            _node = self.get(_path[0 : level + 1])
-        self._revoke_tree(_node)
+            _path = _path[0 : level + 1]
+        with self.lock:
+            self._revoke_tree(self.get(_path), self.branch_key(*_path))
 
     def _grants(self, path):
         _res = []
@@ -278,8 +407,118 @@ class GrantManager(Database):
         _path = self.decrypt_branch_id(branch_id)
         self.delete(_path)
 
+    def compact_grants(self, keep: Optional[int] = None) -> int:
+        """
+        Remove tokens that can never be used again from all grants. Meant to be run
+        on a schedule.
+
+        :param keep: Number of inactive tokens to keep per grant. If not given the value
+            from the token_compaction configuration is used.
+        :return: The number of tokens that was removed
+        """
+        if keep is None:
+            keep = self.token_compaction.get("keep", 0)
+
+        _removed = 0
+        for _key, _item in list(self.db.items()):
+            if isinstance(_item, Grant):
+                _count = _item.compact_tokens(keep=keep)
+                if _count:
+                    _removed += _count
+                    with self.lock:
+                        if _key in self.db:  # Not removed while we were at it
+                            # Make sure the change is stored
+                            self.db[_key] = _item
+        return _removed
+
+    def sweep(self, now: Optional[int] = 0, max_work: Optional[int] = None) -> int:
+        """
+        Remove expired or revoked grants that are due for a check. See
+        :py:meth:`idpyoidc.server.session.sweeper.ExpirySweeper.sweep`.
+
+        :return: Number of grants looked at
+        """
+        if not self.expiry_sweeper:
+            return 0
+        return self.expiry_sweeper.sweep(now=now, max_work=max_work)
+
+    def revoke_all_for_client(self, client_id: str) -> int:
+        """
+        Revoke all grants issued to a client, regardless of which user they belong to.
+
+        :param client_id: Client identifier
+        :return: The number of revoked grants
+        """
+        _revoked = 0
+        with self.lock:
+            for _key in self._keys_for("client", client_id):
+                _node = self.db.get(_key)
+                if _node is None:  # Removed behind our back
+                    self._unindex_key(_key)
+                    continue
+                _revoked += len(_node.subordinate)
+                self._revoke_tree(_node, _key)
+        return _revoked
+
+    def sessions_for_user(self, user_id: str) -> List[dict]:
+        """
+        Find all the active grants a user has.
+
+        :param user_id: User identifier
+        :return: A list of dictionaries with the keys *branch_id*, *client_id*, *grant* and
+            *id_token* (the last issued ID Token, if any)
+        """
+        _client_level = self._level("client")
+        res = []
+        for _key in self._keys_for("user", user_id):
+            _grant = self._attach(self.db.get(_key))
+            if _grant is None:  # Removed behind our back
+                self._unindex_key(_key)
+                continue
+            if not _grant.is_active():
+                continue
+
+            _path = self.unpack_branch_key(_key)
+            _info = {"branch_id": self.encrypted_branch_id(*_path), "grant": _grant}
+            if _client_level is not None:
+                _client = self.db.get(self.branch_key(*_path[0 : _client_level + 1]))
+                if _client is None or _client.is_revoked():
+                    continue
+                _info["client_id"] = _path[_client_level]
+            _info["id_token"] = _grant.last_issued_token_of_type("id_token")
+            res.append(_info)
+        return res
+
     def flush(self):
-        super().flush()
+        with self.lock:
+            super().flush()
+            self._client_index = {}
+            self._user_index = {}
+        if self.expiry_sweeper:
+            self.expiry_sweeper.populate()
+
+    def load(self, item: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None):
+        with self.lock:
+            super().load(item, init_args=init_args, load_args=load_args)
+            self._rebuild_indexes()
+        if self.expiry_sweeper:
+            self.expiry_sweeper.populate()
+        return self
+
+    def apply_delta(
+        self, delta: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None
+    ):
+        with self.lock:
+            super().apply_delta(delta, init_args=init_args, load_args=load_args)
+            for key in delta.get("delete", []):
+                self._unindex_key(key)
+            for key in delta.get("set", {}):
+                self._index_key(key)
+        if self.expiry_sweeper:
+            for key, (_cls, _item) in delta.get("set", {}).items():
+                if key in self.db and isinstance(self.db[key], Grant):
+                    self.expiry_sweeper.schedule(key)
+        return self
 
     # def get_branch_id_by_token(self, token_value: str) -> str:
     #     _token_info = self.token_handler.info(token_value)
@@ -1,10 +1,61 @@
+from typing import Iterable
 from typing import List
 from typing import Optional
 
 from idpyoidc.impexp import ImpExp
 
 
+class SubordinateSet(object):
+    """
+    An insertion ordered set of keys. Membership tests, adding and removing are O(1).
+    Compares equal to a list with the same keys in the same order.
+    """
+
+    __slots__ = ("_keys",)
+
+    def __init__(self, keys: Optional[Iterable[str]] = None):
+        self._keys = dict.fromkeys(keys or [])
+
+    def add(self, key: str):
+        self._keys[key] = None
+
+    # To be compatible with the list that was used before
+    append = add
+
+    def remove(self, key: str):
+        try:
+            del self._keys[key]
+        except KeyError:
+            raise ValueError(f"{key} not in subordinates")
+
+    def discard(self, key: str):
+        self._keys.pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, index):
+        return list(self._keys)[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SubordinateSet):
+            other = list(other._keys)
+        if isinstance(other, (list, tuple)):
+            return list(self._keys) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self._keys))
+
+
 class NodeInfo(ImpExp):
+    __slots__ = ("id", "subordinate", "revoked", "type", "extra_args")
     parameter = {"subordinate": [], "revoked": bool, "type": "", "extra_args": {}, "id": ""}
 
     def __init__(
@@ -17,14 +68,13 @@ class NodeInfo(ImpExp):
     ):
         ImpExp.__init__(self)
         self.id = id
-        self.subordinate = subordinate or []
+        self.subordinate = SubordinateSet(subordinate)
         self.revoked = revoked
         self.type = type
         self.extra_args = {}
 
     def add_subordinate(self, value: str) -> "NodeInfo":
-        if value not in self.subordinate:
-            self.subordinate.append(value)
+        self.subordinate.add(value)
         return self
 
     def remove_subordinate(self, value: str) -> "NodeInfo":
@@ -41,8 +91,20 @@ class NodeInfo(ImpExp):
     def keys(self):
         return self.parameter.keys()
 
+    def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        _dump = ImpExp.dump(self, exclude_attributes=exclude_attributes)
+        if "subordinate" in _dump:
+            _dump["subordinate"] = list(self.subordinate)
+        return _dump
+
+    def local_load_adjustments(self, **kwargs):
+        if not isinstance(self.subordinate, SubordinateSet):
+            self.subordinate = SubordinateSet(self.subordinate)
+
 
 class UserSessionInfo(NodeInfo):
+    __slots__ = ()
+
     def __init__(self, id: Optional[str] = "", **kwargs):
         NodeInfo.__init__(self, id, **kwargs)
         self.type = "UserSessionInfo"
@@ -50,6 +112,8 @@ class UserSessionInfo(NodeInfo):
 
 
 class ClientSessionInfo(NodeInfo):
+    __slots__ = ()
+
     def __init__(self, id: Optional[str] = "", **kwargs):
         NodeInfo.__init__(self, id, **kwargs)
         self.type = "ClientSessionInfo"
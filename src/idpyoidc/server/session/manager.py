@@ -145,11 +145,7 @@ class SessionManager(GrantManager):
         :return:
         """
         grant = self.get(self.decrypt_branch_id(session_id))
-        for token in grant.issued_token:
-            if token.value == token_value:
-                return token
-
-        return None  # pragma: no cover
+        return grant.get_token(token_value)
 
     def make_path(self, **kwargs):
         _path = []
@@ -361,14 +357,17 @@ class SessionManager(GrantManager):
         :param recursive: Revoke all tokens that was minted using this token or
             tokens minted by this token. Recursively.
         """
-        token = self.find_token(session_id, token_value)
+        grant = self[session_id]
+        token = grant.get_token(token_value)
         if token is None:  # pragma: no cover
             raise UnknownToken()
 
         token.revoked = True
+        self.token_revoked([token])
         if recursive:  # TODO: not covered yet!
-            grant = self[session_id]
             grant.revoke_token(value=token.value)
+        # Make sure the change is stored
+        self[session_id] = grant
 
     def get_authentication_events(
         self,
@@ -421,7 +420,8 @@ class SessionManager(GrantManager):
 
         :param session_id: A session identifier
         """
-        self._revoke_tree(self.get_grant(session_id))
+        _path = self.decrypt_branch_id(session_id)
+        self._revoke_tree(self.get_grant(session_id), self.branch_key(*_path))
 
     # def grants(
     #         self,
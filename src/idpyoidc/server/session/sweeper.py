@@ -0,0 +1,174 @@
+"""
+Removes expired and revoked grants, and the user/client nodes that are left without grants,
+from the session database. Also removes tokens that can not be used anymore from the grants
+that remain.
+
+Sweeps are run on the request path, in bounded steps, holding the lock the session database
+holds while its tree is changed.
+"""
+import heapq
+import logging
+import threading
+from typing import Optional
+
+from idpyoidc.time_util import utc_time_sans_frac
+from .grant import Grant
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper(object):
+    def __init__(
+        self,
+        database,
+        max_work: Optional[int] = 100,
+        every: Optional[int] = 0,
+        interval: Optional[int] = 0,
+        recheck: Optional[int] = 3600,
+        keep: Optional[int] = 0,
+    ):
+        """
+        Grants are kept in a heap ordered on the time they should be looked at next.
+
+        :param database: A :py:class:`idpyoidc.server.session.database.Database` instance
+        :param max_work: Max number of grants that are looked at in one sweep.
+        :param every: If not 0, sweep inline every *every* request.
+        :param interval: If not 0, sweep inline on the first request after *interval* seconds
+            has passed since the last sweep.
+        :param recheck: Number of seconds before a grant that does not expire is looked at again.
+        :param keep: Number of inactive tokens to keep when compacting a grant.
+        """
+        self.database = database
+        self.max_work = max_work
+        self.every = every
+        self.interval = interval
+        self.recheck = recheck
+        self.keep = keep
+
+        self._heap = []
+        # branch key -> when it is scheduled to be looked at
+        self._scheduled = {}
+        # Shared with the database so a sweep does not interleave with changes to the tree
+        self._lock = getattr(database, "lock", None) or threading.RLock()
+        self._requests = 0
+        self._last_sweep = utc_time_sans_frac()
+        self.stats = {
+            "sweeps": 0,
+            "visited": 0,
+            "grants_removed": 0,
+            "nodes_removed": 0,
+            "tokens_removed": 0,
+        }
+
+    def schedule(self, key: str, when: Optional[int] = 0):
+        """
+        Schedule a grant to be looked at.
+
+        :param key: The branch key of the grant
+        :param when: When it should be looked at. 0 means as soon as possible.
+        """
+        with self._lock:
+            self._scheduled[key] = when
+            heapq.heappush(self._heap, (when, key))
+
+    def populate(self):
+        """Schedule all the grants in the database."""
+        with self._lock:
+            self._heap = []
+            self._scheduled = {}
+            for key, item in list(self.database.db.items()):
+                if isinstance(item, Grant):
+                    self.schedule(key, item.expires_at)
+
+    def pending(self) -> int:
+        """Number of grants that are scheduled to be looked at."""
+        return len(self._scheduled)
+
+    def tick(self):
+        """
+        To be called once per request. Sweeps every *every* request or when *interval*
+        seconds has passed since the last sweep.
+        """
+        if self.every:
+            self._requests += 1
+            if self._requests >= self.every:
+                self._requests = 0
+                self.sweep()
+                return
+
+        if self.interval:
+            _now = utc_time_sans_frac()
+            if _now - self._last_sweep >= self.interval:
+                self.sweep(now=_now)
+
+    def _is_dead(self, path, grant, now):
+        if grant.revoked:
+            return True
+        if grant.expires_at and now > grant.expires_at:
+            return True
+        # Is any node above the grant revoked
+        for i in range(1, len(path)):
+            _node = self.database.db.get(self.database.branch_key(*path[0:i]))
+            if _node is not None and getattr(_node, "revoked", False):
+                return True
+        return False
+
+    def _visit(self, key: str, now: int):
+        _grant = self.database.db.get(key)
+        if not isinstance(_grant, Grant):
+            return
+
+        self.stats["visited"] += 1
+        _path = self.database.unpack_branch_key(key)
+        if self._is_dead(_path, _grant, now):
+            self.database.delete(_path)
+            self.stats["grants_removed"] += 1
+            # Nodes above the grant that was removed since they had no other subordinates
+            for i in range(1, len(_path)):
+                if self.database.branch_key(*_path[0:i]) not in self.database.db:
+                    self.stats["nodes_removed"] += 1
+            return
+
+        _removed = _grant.compact_tokens(keep=self.keep, now=now)
+        if _removed:
+            self.stats["tokens_removed"] += _removed
+            # Make sure the change is stored
+            self.database.db[key] = _grant
+
+        _next = now + self.recheck
+        if _grant.expires_at:
+            _next = min(_next, _grant.expires_at + 1)
+        self.schedule(key, _next)
+
+    def sweep(self, now: Optional[int] = 0, max_work: Optional[int] = None) -> int:
+        """
+        Look at grants that are due. At most *max_work* grants are looked at.
+
+        :param now: The time to compare expiration times with. 0 means now.
+        :param max_work: Max number of grants to look at. Default is the configured value.
+        :return: Number of grants looked at
+        """
+        if not now:
+            now = utc_time_sans_frac()
+        if max_work is None:
+            max_work = self.max_work
+
+        _done = 0
+        with self._lock:
+            self._last_sweep = now
+            self.stats["sweeps"] += 1
+            _removed = self.stats["grants_removed"]
+            while self._heap and _done < max_work:
+                _when, _key = self._heap[0]
+                if _when > now:
+                    break
+                heapq.heappop(self._heap)
+                if self._scheduled.get(_key) != _when:  # stale entry
+                    continue
+                del self._scheduled[_key]
+                self._visit(_key, now)
+                _done += 1
+
+            if self.stats["grants_removed"] != _removed:
+                logger.info(f"Expiry sweep: {self.stats}")
+        return _done
@@ -1,4 +1,5 @@
 import json
+import sys
 from typing import Optional
 from uuid import uuid1
 
@@ -10,7 +11,72 @@ class MintingNotAllowed(Exception):
     pass
 
 
+class ReadOnlyDict(dict):
+    """A dictionary that can not be changed. Used for values shared between instances."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Shared value, can not be changed")
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+
+class ReadOnlyList(list):
+    """A list that can not be changed. Used for values shared between instances."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Shared value, can not be changed")
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __iadd__ = _read_only
+    __imul__ = _read_only
+    append = _read_only
+    clear = _read_only
+    extend = _read_only
+    insert = _read_only
+    pop = _read_only
+    remove = _read_only
+    reverse = _read_only
+    sort = _read_only
+
+
+EMPTY_DICT = ReadOnlyDict()
+EMPTY_LIST = ReadOnlyList()
+
+# Max number of distinct values kept in the intern table
+MAX_INTERNED = 10000
+_INTERNED_LISTS = {}
+
+
+def intern_list(value: Optional[list]) -> list:
+    """
+    Return a shared read only list with the same content. Meant for things like scopes
+    and resources where the same few combinations are used over and over again.
+    """
+    if not value:
+        return EMPTY_LIST
+
+    try:
+        _key = tuple(value)
+        _shared = _INTERNED_LISTS.get(_key)
+    except TypeError:  # Not hashable
+        return value
+
+    if _shared is None:
+        _shared = ReadOnlyList(sys.intern(v) if isinstance(v, str) else v for v in _key)
+        if len(_INTERNED_LISTS) < MAX_INTERNED:
+            _INTERNED_LISTS[_key] = _shared
+    return _shared
+
+
 class Item(ImpExp):
+    __slots__ = ("expires_at", "issued_at", "not_before", "revoked", "usage_rules", "used")
     parameter = {
         "expires_at": 0,
         "issued_at": 0,
@@ -76,6 +142,7 @@ class Item(ImpExp):
 
 
 class SessionToken(Item):
+    __slots__ = ("based_on", "claims", "id", "name", "resources", "scope", "token_class", "value")
     parameter = Item.parameter.copy()
     parameter.update(
         {
@@ -159,6 +226,7 @@ class SessionToken(Item):
 
 
 class AccessToken(SessionToken):
+    __slots__ = ("token_type",)
     parameter = SessionToken.parameter.copy()
     parameter.update({"token_type": ""})
 
@@ -202,6 +270,8 @@ class AccessToken(SessionToken):
 
 
 class AuthorizationCode(SessionToken):
+    __slots__ = ()
+
     def set_defaults(self):
         if "supports_minting" not in self.usage_rules:
             self.usage_rules["supports_minting"] = [
@@ -214,12 +284,15 @@ class AuthorizationCode(SessionToken):
 
 
 class RefreshToken(SessionToken):
+    __slots__ = ()
+
     def set_defaults(self):
         if "supports_minting" not in self.usage_rules:
             self.usage_rules["supports_minting"] = ["access_token", "refresh_token"]
 
 
 class IDToken(SessionToken):
+    __slots__ = ("session_id",)
     parameter = SessionToken.parameter.copy()
     parameter.update({"session_id": ""})
 
@@ -263,6 +336,45 @@ class IDToken(SessionToken):
         self.session_id = session_id
 
 
+class Compact(object):
+    """
+    Mixin for token classes. Empty claims and values that are the same in many tokens
+    (scope, resources) are replaced with shared read only instances. Usage rules are
+    not shared since they are changed in place.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compact()
+
+    def compact(self):
+        self.scope = intern_list(self.scope)
+        self.resources = intern_list(self.resources)
+        if not self.claims:
+            self.claims = EMPTY_DICT
+
+    def local_load_adjustments(self, **kwargs):
+        self.compact()
+
+
+class CompactAuthorizationCode(Compact, AuthorizationCode):
+    __slots__ = ()
+
+
+class CompactAccessToken(Compact, AccessToken):
+    __slots__ = ()
+
+
+class CompactRefreshToken(Compact, RefreshToken):
+    __slots__ = ()
+
+
+class CompactIDToken(Compact, IDToken):
+    __slots__ = ()
+
+
 SHORT_TYPE_NAME = {"authorization_code": "A", "access_token": "T", "refresh_token": "R"}
 
 TOKEN_MAP = {
@@ -272,6 +384,13 @@ TOKEN_MAP = {
     "id_token": IDToken,
 }
 
+COMPACT_TOKEN_MAP = {
+    "authorization_code": CompactAuthorizationCode,
+    "access_token": CompactAccessToken,
+    "refresh_token": CompactRefreshToken,
+    "id_token": CompactIDToken,
+}
+
 TOKEN_TYPES_MAPPING = {
     "urn:ietf:params:oauth:token-type:access_token": "access_token",
     "urn:ietf:params:oauth:token-type:refresh_token": "refresh_token",
@@ -0,0 +1,184 @@
+"""
+Signing of JSON Web Tokens away from the thread that handles the request.
+
+RSA and EC signatures are made by the cryptography package which releases the GIL while
+signing, so a pool of threads will use more than one core. A pool of processes can be
+used when that is not enough.
+"""
+import json
+import os
+import uuid
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from cryptojwt import JWT
+from cryptojwt.jwk import JWK
+from cryptojwt.jwk.jwk import key_from_jwk_dict
+from cryptojwt.jws.jws import JWS
+
+from idpyoidc.util import instantiate
+
+# Keys imported by a worker process, by thumbprint
+_worker_keys = {}
+
+
+def sign_compact(msg: str, alg: str, key_id: str, key: dict) -> str:
+    """
+    Sign a message. Runs in a worker process so everything must be possible to pickle.
+
+    :param msg: The JSON encoded payload
+    :param alg: Signing algorithm
+    :param key_id: Something that uniquely identifies the key, its thumbprint
+    :param key: The signing key as a JWK dictionary, including the private parts
+    :return: A signed JWT
+    """
+    _key = _worker_keys.get(key_id)
+    if _key is None:
+        _key = _worker_keys[key_id] = key_from_jwk_dict(key)
+    return JWS(msg, alg=alg).sign_compact([_key])
+
+
+def completed(func, *args, **kwargs) -> Future:
+    """
+    Run a function in the calling thread.
+
+    :return: A future with the result of the function call
+    """
+    _future = Future()
+    try:
+        _future.set_result(func(*args, **kwargs))
+    except Exception as err:
+        _future.set_exception(err)
+    return _future
+
+
+class SigningExecutor(object):
+    """Signs in the calling thread. The returned futures are already done."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, jwt: JWT, payload: dict, **kwargs) -> Future:
+        """
+        Pack a JWT.
+
+        :param jwt: A cryptojwt.JWT instance
+        :param payload: The payload of the JWT
+        :param kwargs: Extra keyword arguments to JWT.pack
+        :return: A future of the signed and/or encrypted JWT
+        """
+        return completed(jwt.pack, payload, **kwargs)
+
+    def shutdown(self, wait: Optional[bool] = True):
+        pass
+
+
+class ThreadSigningExecutor(SigningExecutor):
+    """Signs in a pool of threads."""
+
+    def __init__(self, max_workers: Optional[int] = None, **kwargs):
+        """
+        :param max_workers: Number of threads. Default is the number of cores.
+        """
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1, thread_name_prefix="signer"
+        )
+
+    def submit(self, jwt: JWT, payload: dict, **kwargs) -> Future:
+        return self.pool.submit(jwt.pack, payload, **kwargs)
+
+    def shutdown(self, wait: Optional[bool] = True):
+        self.pool.shutdown(wait=wait)
+
+
+class ProcessSigningExecutor(SigningExecutor):
+    """
+    Signs in a pool of processes. The claims are put together and the key is picked
+    in the calling process, only the signing is done by a worker process.
+    Encryption, if any, is done in the calling process when the signature is ready.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, **kwargs):
+        """
+        :param max_workers: Number of processes. Default is the number of cores.
+        """
+        self.pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+        # Exported keys by key instance id, the instance is kept so the id is not reused
+        self._exported = {}
+
+    def export_key(self, key: JWK) -> tuple:
+        """
+        :param key: A signing key
+        :return: Tuple of key thumbprint and the key as a JWK dictionary
+        """
+        _exported = self._exported.get(id(key))
+        if _exported is None or _exported[0] is not key:
+            _thumbprint = key.thumbprint("SHA-256").decode()
+            _exported = (key, _thumbprint, key.serialize(private=True))
+            self._exported[id(key)] = _exported
+        return _exported[1:]
+
+    def submit(
+        self,
+        jwt: JWT,
+        payload: dict,
+        kid: Optional[str] = "",
+        issuer_id: Optional[str] = "",
+        recv: Optional[str] = "",
+        aud: Optional[list] = None,
+        **kwargs,
+    ) -> Future:
+        if not jwt.sign or jwt.alg == "none":
+            return completed(
+                jwt.pack, payload, kid=kid, issuer_id=issuer_id, recv=recv, aud=aud, **kwargs
+            )
+
+        # The same as JWT.pack up until the signing
+        _args = dict(payload)
+        _args.update(jwt.pack_init(recv, aud))
+        _encrypt = kwargs.get("encrypt", jwt.encrypt)
+        if jwt.with_jti:
+            _args["jti"] = kwargs.get("jti", uuid.uuid4().hex)
+
+        _key = jwt.pack_key(issuer_id or jwt.iss, kid)
+        _signed = self.pool.submit(sign_compact, json.dumps(_args), jwt.alg, *self.export_key(_key))
+        if not _encrypt:
+            return _signed
+
+        _future = Future()
+
+        def _encrypt_signed(signed: Future):
+            try:
+                _future.set_result(jwt._encrypt(signed.result(), recv, zip=jwt.zip))
+            except Exception as err:
+                _future.set_exception(err)
+
+        _signed.add_done_callback(_encrypt_signed)
+        return _future
+
+    def shutdown(self, wait: Optional[bool] = True):
+        self.pool.shutdown(wait=wait)
+
+
+DEFAULT_EXECUTOR = SigningExecutor()
+
+
+def init_signing_executor(conf: Optional[dict] = None) -> SigningExecutor:
+    """
+    :param conf: Dictionary with the keys 'class' and 'kwargs'
+    :return: A SigningExecutor instance
+    """
+    if not conf:
+        return DEFAULT_EXECUTOR
+    return instantiate(conf["class"], **conf.get("kwargs", {}))
+
+
+def get_signing_executor(context) -> SigningExecutor:
+    """
+    :param context: Server context
+    :return: The signing executor of the server, signing in the calling thread if none is
+        configured.
+    """
+    return getattr(context, "signing_executor", None) or DEFAULT_EXECUTOR
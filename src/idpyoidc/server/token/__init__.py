@@ -1,10 +1,12 @@
 import base64
 import logging
+from concurrent.futures import Future
 from typing import Optional
 
 from cryptojwt import as_unicode
 
 from idpyoidc.encrypter import init_encrypter
+from idpyoidc.server.signing_executor import completed
 from idpyoidc.server.util import lv_pack
 from idpyoidc.server.util import lv_unpack
 from idpyoidc.time_util import utc_time_sans_frac
@@ -24,6 +26,11 @@ ALT_TOKEN_NAME = {
     "id_token": "I",
 }
 
+TOKEN_CLASS_FROM_TAG = {v: k for k, v in ALT_TOKEN_NAME.items()}
+
+# Separates the token class tag from the rest of a DefaultToken
+TAG_SEPARATOR = "."
+
 
 def is_expired(exp, when=0):
     if exp < 0:
@@ -54,6 +61,17 @@ class Token(object):
         """
         raise NotImplementedError()
 
+    def submit(self, session_id: Optional[str] = "", **kwargs) -> Future:
+        """
+        Return a future of a token. Token classes that sign their tokens hand the signing
+        over to the signing executor, all others mint the token right away.
+
+        :param session_id: Session ID
+        :param kwargs: The same keyword arguments as when calling the instance
+        :return: A concurrent.futures.Future
+        """
+        return completed(self, session_id, **kwargs)
+
     def info(self, token):
         """
         Return dictionary with token information.
@@ -115,11 +133,19 @@ class DefaultToken(Token):
         while rnd == tmp:  # Don't use the same random value again
             rnd = rndstr(32)  # Ultimate length multiple of 16
 
-        return base64.b64encode(
+        _token = base64.b64encode(
             self.crypt.encrypt(lv_pack(rnd, token_class, session_id, exp).encode())
         ).decode("utf-8")
 
+        if self.alt_token_name:
+            # Makes it possible to find the right handler without having to decrypt
+            return f"{self.alt_token_name}{TAG_SEPARATOR}{_token}"
+        else:
+            return _token
+
     def split_token(self, token):
+        if token[1:2] == TAG_SEPARATOR:
+            token = token[2:]
         try:
             plain = self.crypt.decrypt(base64.b64decode(token))
         except Exception as err:
@@ -0,0 +1,253 @@
+import hashlib
+import hmac
+import os
+from typing import Optional
+
+from cryptojwt.key_jar import init_key_jar
+from cryptojwt.utils import b64e
+
+from idpyoidc.server.util import lv_pack
+from idpyoidc.server.util import lv_unpack
+from idpyoidc.time_util import utc_time_sans_frac
+from idpyoidc.util import instantiate
+from . import TAG_SEPARATOR
+from . import Token
+from . import is_expired
+from .exception import UnknownToken
+from .exception import WrongTokenClass
+
+# Length of the random handle and of the truncated MAC in bytes
+HANDLE_SIZE = 16
+MAC_SIZE = 16
+# Length of the base64url encoded handle and MAC, without padding
+HANDLE_LENGTH = 22
+MAC_LENGTH = 22
+
+
+def _b64(value: bytes) -> str:
+    return b64e(value).decode("ascii")
+
+
+class HandleToken(Token):
+    """
+    A short opaque token. The token carries a random handle and a MAC over the handle,
+    what the handle refers to (session ID, token class, expiration time) is kept by the
+    server. A token is verified by one HMAC computation and one lookup.
+
+    A token looks like <tag>.<kid><handle><mac>. The ID of the MAC key is part of the token
+    so that keys can be rotated. New tokens are protected by the first active key, tokens
+    protected by any of the other keys are still accepted.
+    """
+
+    def __init__(
+        self,
+        token_class: Optional[str] = "",
+        token_type: Optional[str] = "Bearer",
+        keys: Optional[dict] = None,
+        storage: Optional[dict] = None,
+        bucket_size: Optional[int] = 60,
+        **kwargs
+    ):
+        """
+        :param token_class: Token class
+        :param token_type: Token type
+        :param keys: Key jar specification (key_defs, private_path, read_only). Symmetric
+            keys are used as MAC keys. If not given a random key is used.
+        :param storage: Where the handles are kept, a dictionary with the keys 'class' and
+            'kwargs'. The storage must behave like a dictionary. Default is in memory.
+        :param bucket_size: Handles are put in buckets by expiration time, this is the length
+            in seconds of the time span a bucket covers. Every bucket is emptied once when its
+            time has passed. 0 means handles are only removed by remove_expired.
+        """
+        Token.__init__(self, token_class, **kwargs)
+        self.token_type = token_type
+        self.mac_keys = {}
+        self.kid = ""
+        if keys:
+            _keyjar = init_key_jar(**keys)
+            for _key in _keyjar.get_issuer_keys(""):
+                if _key.kty != "oct":
+                    continue
+                self.mac_keys[_key.kid] = _key.key
+                if not self.kid and not _key.inactive_since:
+                    self.kid = _key.kid
+            if not self.mac_keys:
+                raise ValueError("No symmetric keys to use for MAC")
+        else:
+            self.mac_keys[""] = os.urandom(32)
+
+        if storage:
+            self.db = instantiate(storage["class"], **storage.get("kwargs", {}))
+        else:
+            self.db = {}
+
+        self.bucket_size = bucket_size
+        # bucket number -> handles to tokens minted here that expire within that bucket
+        self._buckets = {}
+        self._swept = utc_time_sans_frac() // bucket_size if bucket_size else 0
+
+    def _mac(self, kid: str, handle: str) -> str:
+        _mac = hmac.new(
+            self.mac_keys[kid], f"{self.alt_token_name}{kid}{handle}".encode(), hashlib.sha256
+        )
+        return _b64(_mac.digest()[:MAC_SIZE])
+
+    def __call__(
+        self,
+        session_id: Optional[str] = "",
+        token_class: Optional[str] = "",
+        usage_rules: Optional[dict] = None,
+        **payload
+    ) -> str:
+        """
+        Return a token.
+
+        :param session_id: Session ID
+        :param token_class: Token class
+        :param usage_rules: Usage rules, expires_in overrides the default lifetime
+        :param payload: Token information, not used
+        :return: A token
+        """
+        if usage_rules and "expires_in" in usage_rules:
+            lifetime = int(usage_rules["expires_in"])
+        else:
+            lifetime = self.lifetime
+
+        _now = utc_time_sans_frac()
+        if lifetime >= 0:
+            exp = str(_now + lifetime)
+        else:
+            exp = "-1"  # Live for ever
+
+        _handle = _b64(os.urandom(HANDLE_SIZE))
+        while _handle in self.db:  # Don't use the same handle again
+            _handle = _b64(os.urandom(HANDLE_SIZE))
+
+        self.db[_handle] = lv_pack(self.token_class, session_id, exp)
+
+        if self.bucket_size:
+            if lifetime >= 0:
+                self._buckets.setdefault((_now + lifetime) // self.bucket_size, []).append(_handle)
+            self._sweep(_now)
+
+        _value = f"{self.kid}{_handle}{self._mac(self.kid, _handle)}"
+        if self.alt_token_name:
+            # Makes it possible to find the right handler without having to do a lookup
+            return f"{self.alt_token_name}{TAG_SEPARATOR}{_value}"
+        else:
+            return _value
+
+    def split_token(self, token: str) -> tuple:
+        """
+        Verify the MAC and split the token into key ID and handle.
+
+        :param token: A token
+        :return: Tuple of key ID and handle
+        """
+        if token[1:2] == TAG_SEPARATOR:
+            if token[0] != self.alt_token_name:
+                raise WrongTokenClass(token[0])
+            token = token[2:]
+
+        if len(token) < HANDLE_LENGTH + MAC_LENGTH:
+            raise UnknownToken("Too short")
+
+        _kid = token[: -(HANDLE_LENGTH + MAC_LENGTH)]
+        _handle = token[-(HANDLE_LENGTH + MAC_LENGTH) : -MAC_LENGTH]
+        if _kid not in self.mac_keys:
+            raise UnknownToken("Unknown key")
+        if not hmac.compare_digest(self._mac(_kid, _handle), token[-MAC_LENGTH:]):
+            raise UnknownToken("Wrong MAC")
+        return _kid, _handle
+
+    def info(self, token: str) -> dict:
+        """
+        Return token information.
+
+        :param token: A token
+        :return: dictionary with info about the token
+        """
+        _kid, _handle = self.split_token(token)
+        try:
+            _token_class, _sid, _exp = lv_unpack(self.db[_handle])
+        except KeyError:
+            raise UnknownToken("Unknown handle")
+
+        if _token_class not in [self.token_class, self.alt_token_name]:
+            raise WrongTokenClass(_token_class)
+
+        return {
+            "_id": _handle,
+            "token_class": self.token_class,
+            "sid": _sid,
+            "exp": _exp,
+            "handler": self,
+        }
+
+    def is_expired(self, token: str, when: int = 0):
+        _exp = self.info(token)["exp"]
+        if _exp == "-1":
+            return False
+        else:
+            exp = int(_exp)
+        return is_expired(exp, when)
+
+    def _sweep(self, when: int) -> int:
+        """
+        Remove the handles in the buckets whose time has passed. Each handle is looked at
+        once, so this is amortized O(1) per minted token.
+
+        :param when: The time against which to check the expiration
+        :return: Number of removed handles
+        """
+        _current = when // self.bucket_size
+        if _current <= self._swept:
+            return 0
+
+        if _current - self._swept > len(self._buckets):
+            _due = [_bucket for _bucket in list(self._buckets) if _bucket < _current]
+        else:
+            _due = range(self._swept, _current)
+        self._swept = _current
+
+        _removed = 0
+        for _bucket in _due:
+            for _handle in self._buckets.pop(_bucket, []):
+                try:
+                    del self.db[_handle]
+                except KeyError:  # Removed already
+                    continue
+                _removed += 1
+        return _removed
+
+    def remove_expired(self, when: int = 0) -> int:
+        """
+        Remove the handles of tokens that have expired. Looks at every handle in the
+        storage, including handles minted by other processes sharing the storage, so it is
+        meant to be run on a schedule. Handles minted by this instance are removed when
+        new tokens are minted.
+
+        :param when: The time against which to check the expiration. 0 means now.
+        :return: Number of removed handles
+        """
+        _expired = []
+        for _handle in list(self.db.keys()):
+            _exp = lv_unpack(self.db[_handle])[2]
+            if _exp != "-1" and is_expired(int(_exp), when):
+                _expired.append(_handle)
+
+        for _handle in _expired:
+            del self.db[_handle]
+        return len(_expired)
+
+    def remove(self, token: str):
+        """
+        Forget a token. After this it can not be used anymore.
+
+        :param token: A token
+        """
+        _kid, _handle = self.split_token(token)
+        try:
+            del self.db[_handle]
+        except KeyError:
+            pass
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import logging
 import os
 import warnings
@@ -6,13 +8,18 @@ from typing import Optional
 from cryptojwt.exception import Invalid
 from cryptojwt.key_jar import init_key_jar
 from cryptojwt.utils import as_unicode
+from cryptojwt.utils import b64d
 
+from idpyoidc.cache import LRUCache
 from idpyoidc.impexp import ImpExp
 from idpyoidc.item import DLDict
 from idpyoidc.util import importer
+from . import TAG_SEPARATOR
+from . import TOKEN_CLASS_FROM_TAG
 from . import DefaultToken
 from . import Token
 from . import UnknownToken
+from . import is_expired
 from .exception import TokenException
 
 __author__ = "Roland Hedberg"
@@ -20,6 +27,37 @@ __author__ = "Roland Hedberg"
 logger = logging.getLogger(__name__)
 
 
+def token_class_hint(token: str) -> Optional[str]:
+    """
+    Make a guess, without doing any cryptographic operations, as to which token class
+    a token belongs to. The guess is only used to pick a handler, it is the handler that
+    verifies the token.
+
+    :param token: A token
+    :return: A token class or None if no guess could be made
+    """
+    if token[1:2] == TAG_SEPARATOR:  # DefaultToken
+        return TOKEN_CLASS_FROM_TAG.get(token[0])
+
+    _part = token.split(".")
+    if len(_part) != 3:  # Not a signed JSON Web Token
+        return None
+
+    try:
+        _payload = json.loads(b64d(_part[1].encode()))
+    except Exception:
+        return None
+
+    if not isinstance(_payload, dict):
+        return None
+
+    _class = _payload.get("ttype") or _payload.get("token_class")
+    if _class is None:
+        # Only ID Tokens are minted without a token class
+        return "id_token"
+    return TOKEN_CLASS_FROM_TAG.get(_class, _class)
+
+
 class TokenHandler(ImpExp):
     parameter = {"handler": DLDict, "handler_order": [""]}
 
@@ -29,6 +67,7 @@ class TokenHandler(ImpExp):
         authorization_code: Optional[Token] = None,
         refresh_token: Optional[Token] = None,
         id_token: Optional[Token] = None,
+        info_cache: Optional[dict] = None,
     ):
         ImpExp.__init__(self)
         self.handler = {"authorization_code": authorization_code, "access_token": access_token}
@@ -43,6 +82,16 @@ class TokenHandler(ImpExp):
             self.handler["id_token"] = id_token
             self.handler_order.append("id_token")
 
+        # direct: handler found from the token, misdispatch: the guess was wrong,
+        # fallback: no guess could be made so all handlers had to be tried.
+        self.dispatch_stats = {"direct": 0, "misdispatch": 0, "fallback": 0}
+
+        # Verified information about signed tokens, kept until the tokens expire.
+        if info_cache:
+            self.info_cache = LRUCache(max_size=info_cache.get("max_size", 1024))
+        else:
+            self.info_cache = None
+
     def __getitem__(self, typ):
         return self.handler[typ]
 
@@ -50,6 +99,9 @@ class TokenHandler(ImpExp):
         return item in self.handler
 
     def info(self, item, order=None):
+        if self.info_cache is not None and order is None and item.count(".") == 2:
+            return self._cached_info(item)
+
         _handler, item_info = self.get_handler(item, order)
 
         if _handler is None:
@@ -58,22 +110,64 @@ class TokenHandler(ImpExp):
         else:
             return item_info
 
+    def _cached_info(self, token):
+        """
+        Information about a signed token. The signature is only verified the first time,
+        after that the information is picked from the cache until the token expires.
+        Whether the token has been revoked is not known here, that is recorded in the grant.
+
+        :param token: A signed JSON Web Token
+        :return: Dictionary with information about the token
+        """
+        _key = hashlib.sha256(token.encode()).digest()
+        item_info = self.info_cache.get(_key)
+        if item_info is not None:
+            if not is_expired(item_info["exp"]):
+                return dict(item_info)
+            self.info_cache.delete(_key)
+
+        _handler, item_info = self.get_handler(token)
+        if _handler is None:
+            logger.info("Unknown token format")
+            raise UnknownToken(token)
+
+        _exp = item_info.get("exp")
+        if isinstance(_exp, int) and _exp > 0:
+            self.info_cache.set(_key, dict(item_info), expires_at=_exp)
+        return item_info
+
     def sid(self, token, order=None):
         return self.info(token, order)["sid"]
 
     def token_class(self, token, order=None):
         return self.info(token, order)["token_class"]
 
+    def _try_handler(self, typ, token):
+        try:
+            return self.handler[typ].info(token)
+        except (KeyError, TokenException, Invalid, AttributeError):
+            return None
+
     def get_handler(self, token, order=None):
         if order is None:
             order = self.handler_order
 
+        _hint = token_class_hint(token)
+        if _hint in order and self.handler.get(_hint):
+            res = self._try_handler(_hint, token)
+            if res is not None:
+                self.dispatch_stats["direct"] += 1
+                return self.handler[_hint], res
+
+            logger.debug(f"Token class hint {_hint} was wrong")
+            self.dispatch_stats["misdispatch"] += 1
+            order = [typ for typ in order if typ != _hint]
+        else:
+            self.dispatch_stats["fallback"] += 1
+
         for typ in order:
-            try:
-                res = self.handler[typ].info(token)
-            except (KeyError, TokenException, Invalid, AttributeError):
-                pass
-            else:
+            res = self._try_handler(typ, token)
+            if res is not None:
                 return self.handler[typ], res
 
         return None, None
@@ -156,6 +250,7 @@ def factory(
     :param token:
     :param refresh:
     :param jwks_file:
+    :param kwargs: Other arguments, like the configuration of the information cache
     :return: TokenHandler instance
     """
 
@@ -199,4 +294,7 @@ def factory(
     if id_token is not None:
         args["id_token"] = init_token_handler(upstream_get, id_token, token_class="")
 
+    if kwargs.get("info_cache"):
+        args["info_cache"] = kwargs["info_cache"]
+
     return TokenHandler(**args)
@@ -1,6 +1,8 @@
 import logging
+from concurrent.futures import Future
 from typing import Callable
 from typing import Optional
+from typing import Tuple
 
 from cryptojwt.jws.exception import JWSException
 from cryptojwt.jws.jws import factory
@@ -10,6 +12,7 @@ from cryptojwt.jwt import JWT
 from idpyoidc.server.construct import construct_provider_info
 from idpyoidc.server.exception import ToOld
 from idpyoidc.server.session.claims import claims_match
+from idpyoidc.server.signing_executor import get_signing_executor
 
 from . import Token
 from . import UnknownToken
@@ -107,6 +110,93 @@ def get_sign_and_encrypt_algorithms(context, client_info, payload_type, sign=Fal
     return args
 
 
+class AlgorithmCache(object):
+    """
+    The signing and encryption algorithms resolved by get_sign_and_encrypt_algorithms, per
+    client and payload type. An entry is used as long as the client's own algorithm
+    parameters are the same and the server's provider info and defaults are the same objects
+    as when the entry was made. Changes made in place must be followed by a call to
+    invalidate.
+    """
+
+    def __init__(self):
+        # (client_id, payload_type, sign, encrypt) -> (client values, server info, algorithms)
+        self.db = {}
+        # payload_type -> names of the client parameters
+        self._param_names = {}
+
+    def _client_values(self, client_info: dict, payload_type: str) -> tuple:
+        _names = self._param_names.get(payload_type)
+        if _names is None:
+            _names = self._param_names[payload_type] = (
+                f"{payload_type}_signed_response_alg",
+                f"{payload_type}_encrypted_response_alg",
+                f"{payload_type}_encrypted_response_enc",
+            )
+        return tuple(client_info.get(_name) for _name in _names)
+
+    def get(
+        self,
+        context,
+        client_id: str,
+        client_info: dict,
+        payload_type: str,
+        sign: Optional[bool] = False,
+        encrypt: Optional[bool] = False,
+    ) -> dict:
+        """
+        :param context: Server context
+        :param client_id: Client ID
+        :param client_info: The client's registration information
+        :param payload_type: Which kind of JWT, for instance 'id_token'
+        :param sign: Whether the JWT is to be signed
+        :param encrypt: Whether the JWT is to be encrypted
+        :return: The same as get_sign_and_encrypt_algorithms returns
+        """
+        _key = (client_id, payload_type, sign, encrypt)
+        _client = self._client_values(client_info, payload_type)
+        _entry = self.db.get(_key)
+        if (
+            _entry
+            and _entry[0] == _client
+            and _entry[1][0] is context.provider_info
+            and _entry[1][1] is context.jwx_def
+        ):
+            return dict(_entry[2])
+
+        _args = get_sign_and_encrypt_algorithms(
+            context, client_info, payload_type, sign=sign, encrypt=encrypt
+        )
+        self.db[_key] = (_client, (context.provider_info, context.jwx_def), _args)
+        return dict(_args)
+
+    def invalidate(self, client_id: Optional[str] = None):
+        """
+        Forget resolved algorithms.
+
+        :param client_id: Only forget the algorithms for this client. If not given
+            everything is forgotten.
+        """
+        if client_id is None:
+            self.db = {}
+        else:
+            self.db = {_key: _val for _key, _val in self.db.items() if _key[0] != client_id}
+
+
+def resolve_algorithms(context, client_id, payload_type, sign=False, encrypt=False) -> dict:
+    """
+    Like get_sign_and_encrypt_algorithms but uses the context's algorithm cache if there is
+    one.
+    """
+    client_info = context.cdb[client_id]
+    _cache = getattr(context, "jwx_cache", None)
+    if _cache is None:
+        return get_sign_and_encrypt_algorithms(
+            context, client_info, payload_type, sign=sign, encrypt=encrypt
+        )
+    return _cache.get(context, client_id, client_info, payload_type, sign=sign, encrypt=encrypt)
+
+
 class IDToken(Token):
     _supports = {
         "encrypt_id_token_supported": None,
@@ -209,7 +299,7 @@ class IDToken(Token):
 
         return _args
 
-    def sign_encrypt(
+    def _signer_and_payload(
         self,
         session_id,
         client_id,
@@ -220,27 +310,17 @@ class IDToken(Token):
         lifetime=None,
         extra_claims=None,
         user_info=None,
-    ) -> str:
+    ) -> Tuple[JWT, dict]:
         """
-        Signed and or encrypt a IDToken
+        Construct the payload of an IDToken and the JWT instance that will sign and
+        maybe encrypt it. The arguments are the same as for sign_encrypt.
 
-        :param lifetime: How long the ID Token should be valid
-        :param session_id: Session information
-        :param client_id: Client ID
-        :param code: Access grant
-        :param access_token: Access Token
-        :param sign: If the JWT should be signed
-        :param encrypt: If the JWT should be encrypted
-        :param extra_claims: Extra claims to be added to the ID Token
-        :return: IDToken as a signed and/or encrypted JWT
+        :return: Tuple of JWT instance and payload
         """
 
         _context = self.upstream_get("context")
 
-        client_info = _context.cdb[client_id]
-        alg_dict = get_sign_and_encrypt_algorithms(
-            _context, client_info, "id_token", sign=sign, encrypt=encrypt
-        )
+        alg_dict = resolve_algorithms(_context, client_id, "id_token", sign=sign, encrypt=encrypt)
 
         _payload = self.payload(
             session_id=session_id,
@@ -261,18 +341,54 @@ class IDToken(Token):
             **alg_dict,
         )
 
+        return _jwt, _payload
+
+    def sign_encrypt(
+        self,
+        session_id,
+        client_id,
+        code=None,
+        access_token=None,
+        sign=True,
+        encrypt=False,
+        lifetime=None,
+        extra_claims=None,
+        user_info=None,
+    ) -> str:
+        """
+        Signed and or encrypt a IDToken
+
+        :param lifetime: How long the ID Token should be valid
+        :param session_id: Session information
+        :param client_id: Client ID
+        :param code: Access grant
+        :param access_token: Access Token
+        :param sign: If the JWT should be signed
+        :param encrypt: If the JWT should be encrypted
+        :param extra_claims: Extra claims to be added to the ID Token
+        :return: IDToken as a signed and/or encrypted JWT
+        """
+        _jwt, _payload = self._signer_and_payload(
+            session_id,
+            client_id,
+            code=code,
+            access_token=access_token,
+            sign=sign,
+            encrypt=encrypt,
+            lifetime=lifetime,
+            extra_claims=extra_claims,
+            user_info=user_info,
+        )
         return _jwt.pack(_payload, recv=client_id)
 
-    def __call__(
+    def _call_args(
         self,
         session_id: Optional[str] = "",
-        ttype: Optional[str] = "",
         encrypt=False,
         code=None,
         access_token=None,
-        usage_rules: Optional[dict] = None,
         **kwargs,
-    ) -> str:
+    ) -> dict:
         _context = self.upstream_get("context")
 
         user_id, client_id, grant_id = _context.session_manager.decrypt_session_id(session_id)
@@ -286,21 +402,52 @@ class IDToken(Token):
         else:
             xargs = {}
 
-        lifetime = self.lifetime
+        return {
+            "session_id": session_id,
+            "client_id": client_id,
+            "sign": True,
+            "lifetime": self.lifetime,
+            "extra_claims": xargs,
+            "encrypt": encrypt,
+            "code": code,
+            "access_token": access_token,
+            "user_info": kwargs,
+        }
 
-        id_token = self.sign_encrypt(
-            session_id,
-            client_id,
-            sign=True,
-            lifetime=lifetime,
-            extra_claims=xargs,
-            encrypt=encrypt,
-            code=code,
-            access_token=access_token,
-            user_info=kwargs,
+    def __call__(
+        self,
+        session_id: Optional[str] = "",
+        ttype: Optional[str] = "",
+        encrypt=False,
+        code=None,
+        access_token=None,
+        usage_rules: Optional[dict] = None,
+        **kwargs,
+    ) -> str:
+        return self.sign_encrypt(
+            **self._call_args(session_id, encrypt, code, access_token, **kwargs)
         )
 
-        return id_token
+    def submit(
+        self,
+        session_id: Optional[str] = "",
+        ttype: Optional[str] = "",
+        encrypt=False,
+        code=None,
+        access_token=None,
+        usage_rules: Optional[dict] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Return a future of an ID Token. The token is signed by the signing executor.
+
+        :return: A concurrent.futures.Future
+        """
+        _args = self._call_args(session_id, encrypt, code, access_token, **kwargs)
+        _jwt, _payload = self._signer_and_payload(**_args)
+        return get_signing_executor(self.upstream_get("context")).submit(
+            _jwt, _payload, recv=_args["client_id"]
+        )
 
     def info(self, token):
         """
@@ -319,8 +466,7 @@ class IDToken(Token):
 
         _payload = _jwt.jwt.payload()
         client_id = _payload["aud"][0]
-        client_info = _context.cdb[client_id]
-        alg_dict = get_sign_and_encrypt_algorithms(_context, client_info, "id_token", sign=True)
+        alg_dict = resolve_algorithms(_context, client_id, "id_token", sign=True)
 
         verifier = JWT(
             key_jar=self.upstream_get("attribute", "keyjar"), allowed_sign_algs=alg_dict["sign_alg"]
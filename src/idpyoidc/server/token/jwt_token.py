@@ -1,20 +1,206 @@
+from concurrent.futures import Future
 from typing import Callable
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
 from cryptojwt import JWT
 from cryptojwt.jws.exception import JWSException
+from cryptojwt.key_jar import KeyJar
 from cryptojwt.utils import importer
 
 from idpyoidc.server.exception import ToOld
+from idpyoidc.server.signing_executor import get_signing_executor
 from . import Token
 from . import is_expired
 from .exception import UnknownToken
 from .exception import WrongTokenClass
+from .revocation_list import RevocationList
 from ..constant import DEFAULT_TOKEN_LIFETIME
 from ...message import Message
+from ...message import list_serializer
+from ...message import sp_sep_list_serializer
 from ...message.oauth2 import JWTAccessToken
 
+# Returned by a value converter when the value should not be in the payload at all
+_DROP = object()
+# Returned by a value converter when the Message class has to do the job
+_FALLBACK = object()
+
+
+def _string(val):
+    if type(val) is str:
+        return val or _DROP
+    return _FALLBACK
+
+
+def _int(val):
+    if type(val) is int:
+        return val
+    return _FALLBACK
+
+
+def _string_list(val):
+    if type(val) is str:
+        return [val] if val else _DROP
+    if type(val) is list:
+        if not val or val == [""]:
+            return _DROP
+        for _item in val:
+            if type(_item) is not str:
+                return _FALLBACK
+        return val
+    return _FALLBACK
+
+
+def _sp_sep_string_list(val):
+    if type(val) is str:
+        return val or _DROP
+    _val = _string_list(val)
+    if type(_val) is list:
+        return " ".join(_val)
+    return _val
+
+
+def _other(val):
+    # Claims the profile doesn't know about are copied as they are
+    if isinstance(val, str):
+        return val or _DROP
+    elif isinstance(val, list):
+        if val == [""]:
+            return _DROP
+        if val and isinstance(val[0], Message):
+            return _FALLBACK
+    elif isinstance(val, Message):
+        return _FALLBACK
+    return val
+
+
+def _converter(spec: tuple) -> Optional[Callable]:
+    _typ = spec[0]
+    _ser = spec[2]
+    if _typ is str and _ser is None:
+        return _string
+    elif _typ is int and _ser is None:
+        return _int
+    elif _typ == [str] and _ser is list_serializer:
+        return _string_list
+    elif _typ == [str] and _ser is sp_sep_list_serializer:
+        return _sp_sep_string_list
+    return None
+
+
+class CompiledProfile(object):
+    """
+    Does what profile(**payload).to_dict() does without building a Message.
+
+    The payloads minted by a token handler have the same set of claims over and over again.
+    For each set of claim names the value conversions are worked out once. After that
+    the values that already have the right type are copied as they are. If a value is of
+    some other type the Message class is used for that payload.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        if profile.c_default or "*" in profile.c_param:
+            self.converters = None
+        else:
+            self.converters = {_key: _converter(_spec) for _key, _spec in profile.c_param.items()}
+        # tuple of claim names -> list of (claim name, converter), None if not possible
+        self.templates = {}
+
+    def _compile(self, keys: tuple) -> Optional[list]:
+        _template = []
+        for _key in keys:
+            _spec_key = _key if _key in self.profile.c_param else _key.split("#")[0]
+            if _spec_key in self.profile.c_param:
+                _conv = self.converters[_spec_key]
+                if _conv is None:
+                    return None
+            else:
+                _conv = _other
+            _template.append((_key, _conv))
+        return _template
+
+    def __call__(self, payload: dict) -> dict:
+        if self.converters is None:
+            return self.profile(**payload).to_dict()
+
+        _keys = tuple(payload)
+        try:
+            _template = self.templates[_keys]
+        except KeyError:
+            _template = self.templates[_keys] = self._compile(_keys)
+
+        if _template is None:
+            return self.profile(**payload).to_dict()
+
+        _res = {}
+        for _key, _conv in _template:
+            _val = _conv(payload[_key])
+            if _val is _DROP:
+                continue
+            if _val is _FALLBACK:
+                return self.profile(**payload).to_dict()
+            _res[_key] = _val
+        return _res
+
+
+class CachedKeyJWT(JWT):
+    """
+    A JWT that keeps the keys it has looked up in the key jar. Signing keys are cached per
+    issuer, verification keys per key ID for tokens issued by *iss*.
+    """
+
+    def __init__(self, **kwargs):
+        JWT.__init__(self, **kwargs)
+        self.sign_keys = {}
+        self.verify_keys = {}
+
+    def pack_key(self, issuer_id="", kid=""):
+        if kid:
+            return JWT.pack_key(self, issuer_id, kid)
+
+        _key = self.sign_keys.get(issuer_id)
+        if _key is None:
+            _key = self.sign_keys[issuer_id] = JWT.pack_key(self, issuer_id)
+        return _key
+
+    def _verify(self, rj, token):
+        _payload = rj.jwt.payload()
+        if not self.iss or _payload.get("iss") != self.iss:
+            return JWT._verify(self, rj, token)
+
+        _cache_key = (rj.jwt.headers.get("alg"), rj.jwt.headers.get("kid", ""))
+        _keys = self.verify_keys.get(_cache_key)
+        if _keys is None:
+            _keys = self.key_jar.get_jwt_verify_keys(rj.jwt)
+            if not _keys:  # Don't remember failures
+                return rj.verify_compact(token, _keys)
+            self.verify_keys[_cache_key] = _keys
+        return rj.verify_compact(token, _keys)
+
+
+def key_state(keyjar: KeyJar, issuer_ids: list) -> tuple:
+    """
+    Something that changes when the keys belonging to any of the issuers are changed.
+
+    :param keyjar: A KeyJar instance
+    :param issuer_ids: List of issuer IDs
+    :return: A tuple
+    """
+    # References to the instances, not ids, since an id may be reused once an instance is gone.
+    _state = [keyjar]
+    for _issuer_id in issuer_ids:
+        _issuer = keyjar._get_issuer(_issuer_id)
+        if _issuer is None:
+            continue
+        for _bundle in _issuer.get_bundles():
+            # No update, remote bundles are refreshed when the keys are actually used.
+            for _key in _bundle.keys(update=False):
+                _state.append((_key, _key.inactive_since))
+    return tuple(_state)
+
 
 class JWTToken(Token):
     def __init__(
@@ -29,6 +215,7 @@ class JWTToken(Token):
         token_type: str = "Bearer",
         profile: Optional[Union[Message, str]] = JWTAccessToken,
         with_jti: Optional[bool] = False,
+        revocation_list: Optional[dict] = None,
         **kwargs
     ):
         Token.__init__(self, token_class, **kwargs)
@@ -48,16 +235,71 @@ class JWTToken(Token):
             self.profile = importer(profile)
         else:
             self.profile = profile
+        # compiled profiles per profile class
+        self._compiled = {}
         self.with_jti = with_jti
 
         if self.with_jti is False and profile == JWTAccessToken:
             self.with_jti = True
 
+        # jti values of revoked tokens, published to resource servers
+        if revocation_list is not None:
+            self.revocation_list = RevocationList(**revocation_list)
+        else:
+            self.revocation_list = None
+
+        # Signers per lifetime and jti usage and one verifier. Thrown away when the keys change.
+        self._signer = {}
+        self._verifier = None
+        self._key_state = None
+
+    def _check_keys(self):
+        _keyjar = self.upstream_get("attribute", "keyjar")
+        _state = key_state(_keyjar, ["", self.issuer])
+        if _state != self._key_state:
+            self._signer = {}
+            self._verifier = None
+            self._key_state = _state
+        return _keyjar
+
+    def get_signer(self, lifetime: int, with_jti: Optional[bool] = False) -> JWT:
+        """
+        Return a signer that issues tokens with a specific lifetime.
+
+        :param lifetime: The lifetime of tokens in seconds
+        :param with_jti: Whether the tokens should have a jti claim
+        :return: A JWT instance
+        """
+        _keyjar = self._check_keys()
+        _signer = self._signer.get((lifetime, with_jti))
+        if _signer is None:
+            _signer = CachedKeyJWT(
+                key_jar=_keyjar, iss=self.issuer, lifetime=lifetime, sign_alg=self.alg
+            )
+            _signer.with_jti = with_jti
+            self._signer[(lifetime, with_jti)] = _signer
+        return _signer
+
+    def get_verifier(self) -> JWT:
+        """Return a verifier for tokens issued by this token handler."""
+        _keyjar = self._check_keys()
+        if self._verifier is None:
+            self._verifier = CachedKeyJWT(
+                key_jar=_keyjar, iss=self.issuer, allowed_sign_algs=[self.alg]
+            )
+        return self._verifier
+
+    def compiled_profile(self, profile) -> CompiledProfile:
+        _compiled = self._compiled.get(profile)
+        if _compiled is None:
+            _compiled = self._compiled[profile] = CompiledProfile(profile)
+        return _compiled
+
     def load_custom_claims(self, payload: dict = None):
         # inherit me and do your things here
         return payload
 
-    def __call__(
+    def _signer_and_payload(
         self,
         session_id: Optional[str] = "",
         token_class: Optional[str] = "",
@@ -65,15 +307,7 @@ class JWTToken(Token):
         profile: Optional[Message] = None,
         with_jti: Optional[bool] = None,
         **payload
-    ) -> str:
-        """
-        Return a token.
-
-        :param session_id: Session id
-        :param token_class: Token class
-        :param payload: A dictionary with information that is part of the payload of the JWT.
-        :return: Signed JSON Web Token
-        """
+    ) -> Tuple[JWT, dict]:
         if not token_class:
             if self.token_class:
                 token_class = self.token_class
@@ -88,33 +322,54 @@ class JWTToken(Token):
             lifetime = usage_rules.get("expires_in")
         else:
             lifetime = self.lifetime
-        signer = JWT(
-            key_jar=self.upstream_get("attribute", "keyjar"),
-            iss=self.issuer,
-            lifetime=lifetime,
-            sign_alg=self.alg,
-        )
         if isinstance(payload, Message):  # don't mess with it.
             pass
         else:
+            profile = profile or self.profile
             if profile:
-                payload = profile(**payload).to_dict()
-            elif self.profile:
-                payload = self.profile(**payload).to_dict()
+                payload = self.compiled_profile(profile)(payload)
 
-        if with_jti:
-            signer.with_jti = True
-        elif with_jti is None:
-            signer.with_jti = self.with_jti
+        if with_jti is None:
+            with_jti = self.with_jti
 
-        return signer.pack(payload)
+        return self.get_signer(lifetime, bool(with_jti)), payload
 
-    def get_payload(self, token):
-        verifier = JWT(
-            key_jar=self.upstream_get("attribute", "keyjar"), allowed_sign_algs=[self.alg]
+    def __call__(
+        self,
+        session_id: Optional[str] = "",
+        token_class: Optional[str] = "",
+        usage_rules: Optional[dict] = None,
+        profile: Optional[Message] = None,
+        with_jti: Optional[bool] = None,
+        **payload
+    ) -> str:
+        """
+        Return a token.
+
+        :param session_id: Session id
+        :param token_class: Token class
+        :param payload: A dictionary with information that is part of the payload of the JWT.
+        :return: Signed JSON Web Token
+        """
+        _signer, _payload = self._signer_and_payload(
+            session_id, token_class, usage_rules, profile, with_jti, **payload
         )
+        return _signer.pack(_payload)
+
+    def submit(self, session_id: Optional[str] = "", **kwargs) -> Future:
+        """
+        Return a future of a token. The token is signed by the signing executor.
+
+        :param session_id: Session id
+        :param kwargs: The same keyword arguments as when calling the instance
+        :return: A concurrent.futures.Future
+        """
+        _signer, _payload = self._signer_and_payload(session_id, **kwargs)
+        return get_signing_executor(self.upstream_get("context")).submit(_signer, _payload)
+
+    def get_payload(self, token):
         try:
-            _payload = verifier.unpack(token)
+            _payload = self.get_verifier().unpack(token)
         except JWSException:
             raise UnknownToken()
 
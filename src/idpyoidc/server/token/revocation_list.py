@@ -0,0 +1,249 @@
+import bisect
+import hashlib
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+from cryptojwt.jws.jws import factory
+from cryptojwt.utils import b64d
+from cryptojwt.utils import b64e
+
+from idpyoidc.time_util import utc_time_sans_frac
+from idpyoidc.util import rndstr
+
+
+class BloomFilter(object):
+    """
+    A Bloom filter over strings. Never gives false negatives, false positives happen with a
+    probability that depends on the size of the filter, the number of hash functions and
+    the number of members.
+    """
+
+    def __init__(self, size: Optional[int] = 8192, hashes: Optional[int] = 5, bits: bytes = b""):
+        """
+        :param size: Number of bits in the filter
+        :param hashes: Number of hash functions
+        :param bits: The filter bits, for instance from a published filter
+        """
+        self.size = size
+        self.hashes = hashes
+        if bits:
+            if len(bits) != (size + 7) // 8:
+                raise ValueError("Wrong number of bits")
+            self.bits = bytearray(bits)
+        else:
+            self.bits = bytearray((size + 7) // 8)
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing, two 64 bits values from one SHA-256 digest
+        _digest = hashlib.sha256(item.encode()).digest()
+        _h1 = int.from_bytes(_digest[:8], "big")
+        _h2 = int.from_bytes(_digest[8:16], "big") | 1
+        return [(_h1 + i * _h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for _pos in self._positions(item):
+            self.bits[_pos >> 3] |= 1 << (_pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        for _pos in self._positions(item):
+            if not self.bits[_pos >> 3] & (1 << (_pos & 7)):
+                return False
+        return True
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "hashes": self.hashes, "bits": b64e(bytes(self.bits)).decode()}
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "BloomFilter":
+        return cls(size=spec["size"], hashes=spec["hashes"], bits=b64d(spec["bits"].encode()))
+
+
+def token_jti(token: str) -> tuple:
+    """
+    Get the jti and the expiration time from a JWT without verifying it.
+
+    :param token: A signed JWT
+    :return: Tuple of jti and expiration time. jti is None if the token is not a JWT or
+        doesn't have a jti.
+    """
+    _jws = factory(token)
+    if not _jws:
+        return None, 0
+    _payload = _jws.jwt.payload()
+    return _payload.get("jti"), _payload.get("exp", 0)
+
+
+class RevocationList(object):
+    """
+    The jti values of revoked tokens that has not expired yet. Every change is given a
+    version number so that a resource server only has to fetch the changes since the
+    version it already has. A token that has expired is sooner or later removed from the
+    list, a resource server will reject it anyway.
+
+    Version numbers are only meaningful within one list. Every list has a random ID so a
+    resource server can tell when the server has started over with a new list.
+    """
+
+    def __init__(
+        self,
+        bloom_size: Optional[int] = 8192,
+        bloom_hashes: Optional[int] = 5,
+        sweep_every: Optional[int] = 100,
+        **kwargs
+    ):
+        """
+        :param bloom_size: Number of bits in the Bloom filter summary
+        :param bloom_hashes: Number of hash functions used by the Bloom filter
+        :param sweep_every: Remove expired entries every this many additions.
+        """
+        self.bloom_size = bloom_size
+        self.bloom_hashes = bloom_hashes
+        self.sweep_every = sweep_every
+        self.id = rndstr(16)
+        self.version = 0
+        # jti -> expiration time
+        self.revoked = {}
+        # (version, jti) in version order, for delta documents
+        self._log = []
+        self._bloom = None
+        self._added = 0
+
+    def add(self, jti: str, exp: int):
+        """
+        Add a revoked token.
+
+        :param jti: The jti of the token
+        :param exp: When the token expires
+        """
+        if jti in self.revoked:
+            return
+        self.version += 1
+        self.revoked[jti] = exp
+        self._log.append((self.version, jti))
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+        self._added += 1
+        if self.sweep_every and self._added % self.sweep_every == 0:
+            self.remove_expired()
+
+    def add_token(self, token: str) -> bool:
+        """
+        Add a revoked token.
+
+        :param token: A JWT
+        :return: True if the token was added, False if it had no jti
+        """
+        _jti, _exp = token_jti(token)
+        if not _jti:
+            return False
+        self.add(_jti, _exp)
+        return True
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self.revoked
+
+    def __len__(self):
+        return len(self.revoked)
+
+    def remove_expired(self, when: Optional[int] = 0) -> int:
+        """
+        Remove tokens that has expired.
+
+        :param when: The time against which to check the expiration. 0 means now.
+        :return: Number of removed entries
+        """
+        _now = when or utc_time_sans_frac()
+        _expired = [_jti for _jti, _exp in self.revoked.items() if _exp and _exp < _now]
+        if not _expired:
+            return 0
+
+        for _jti in _expired:
+            del self.revoked[_jti]
+        self._log = [(_ver, _jti) for _ver, _jti in self._log if _jti in self.revoked]
+        self._bloom = None
+        return len(_expired)
+
+    def bloom_filter(self) -> BloomFilter:
+        """Return a Bloom filter with all the listed jti values."""
+        if self._bloom is None:
+            self._bloom = BloomFilter(self.bloom_size, self.bloom_hashes)
+            for _jti in self.revoked:
+                self._bloom.add(_jti)
+        return self._bloom
+
+    def document(self, since: Optional[int] = 0, bloom: Optional[bool] = True) -> dict:
+        """
+        The published revocation list.
+
+        :param since: Only list the changes made after this version
+        :param bloom: Include a Bloom filter summary of the whole list
+        :return: A dictionary
+        """
+        if since > self.version:  # Not from this list, start over
+            since = 0
+        _start = bisect.bisect_left(self._log, (since + 1,))
+        _doc = {
+            "id": self.id,
+            "version": self.version,
+            "since": since,
+            "revoked": {_jti: self.revoked[_jti] for _, _jti in self._log[_start:]},
+        }
+        if bloom:
+            _doc["bloom"] = self.bloom_filter().to_dict()
+        return _doc
+
+
+class RevocationListVerifier(object):
+    """
+    Used by a resource server to keep a copy of a revocation list, updated from the published
+    documents, and to check tokens against it.
+    """
+
+    def __init__(self):
+        self.id = ""
+        self.version = 0
+        self.revoked = {}
+
+    @property
+    def since(self) -> int:
+        """The version to ask for changes since."""
+        return self.version
+
+    def update(self, document: dict):
+        """
+        Apply a revocation list document.
+
+        :param document: A complete list (since is 0) or the changes since the version
+            this verifier has. If a ValueError is raised the complete list must be fetched.
+        """
+        if document.get("since", 0) == 0:
+            self.revoked = {}
+            self.id = document.get("id", "")
+        elif document["since"] != self.version or document.get("id", "") != self.id:
+            raise ValueError("Document does not follow the version I have")
+
+        self.revoked.update(document["revoked"])
+        self.version = document["version"]
+        self.remove_expired()
+
+    def remove_expired(self, when: Optional[int] = 0):
+        _now = when or utc_time_sans_frac()
+        self.revoked = {
+            _jti: _exp for _jti, _exp in self.revoked.items() if not _exp or _exp >= _now
+        }
+
+    def is_revoked(self, token: Union[str, Dict]) -> bool:
+        """
+        :param token: A JWT, its verified payload or a jti
+        :return: True if the token is revoked
+        """
+        if isinstance(token, dict):
+            _jti = token.get("jti")
+        elif token.count(".") >= 2:
+            _jti = token_jti(token)[0]
+        else:
+            _jti = token
+        return _jti in self.revoked
@@ -0,0 +1,339 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import List
+from typing import Optional
+from uuid import uuid4
+
+from cryptojwt.utils import importer
+from cryptojwt.utils import qualified_name
+
+from idpyoidc.exception import WriteConflict
+from idpyoidc.impexp import ImpExp
+
+logger = logging.getLogger(__name__)
+
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, version TEXT)"
+SELECT_VERSION = "SELECT version FROM {table} WHERE key = ?"
+SELECT_ITEM = "SELECT value, version FROM {table} WHERE key = ?"
+SELECT_KEYS = "SELECT key FROM {table}"
+COUNT = "SELECT COUNT(*) FROM {table}"
+UPSERT = "INSERT OR REPLACE INTO {table} (key, value, version) VALUES (?, ?, ?)"
+INSERT = "INSERT OR IGNORE INTO {table} (key, value, version) VALUES (?, ?, ?)"
+UPDATE = "UPDATE {table} SET value = ?, version = ? WHERE key = ? AND version = ?"
+DELETE = "DELETE FROM {table} WHERE key = ?"
+DELETE_ALL = "DELETE FROM {table}"
+
+# The version a write is based on when it should overwrite whatever is stored
+ANY_VERSION = object()
+
+
+class SQLiteDLDict(object):
+    """
+    A persistent replacement for :py:class:`idpyoidc.item.DLDict` that stores one record per key
+    in a SQLite database. Values must be :py:class:`idpyoidc.impexp.ImpExp` instances, they are
+    stored in the same format as DLDict uses when dumping.
+
+    Instances that has been read are kept in memory together with a version tag. Every read
+    checks the version tag in the database so changes made by other processes are picked up.
+    Writes can be batched, in which case they are written in one transaction when *batch_size*
+    writes has been collected or when :py:meth:`commit` is called.
+
+    A write only succeeds if the record has not been changed by someone else since it was read,
+    a new record only if no one else has created it. Otherwise
+    :py:class:`idpyoidc.exception.WriteConflict` is raised, the value that was to be written is
+    dropped and the next read gets the stored value.
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str] = "session.db",
+        table: Optional[str] = "branch",
+        batch_size: Optional[int] = 1,
+        timeout: Optional[float] = 5.0,
+        init_args: Optional[dict] = None,
+        **kwargs
+    ):
+        self.filename = filename
+        self.table = table
+        self.batch_size = max(batch_size, 1)
+        self.init_args = init_args or {}
+        self._lock = threading.RLock()
+        # key -> (version, instance)
+        self._local = {}
+        # key -> (version, instance) replaced by a newer version when read
+        self._stale = {}
+        # key -> (serialized value, version, version it is based on) or None if the key is to
+        # be deleted
+        self._pending = {}
+        # Keys that has been set or deleted since the last checkpoint
+        self._changed = set()
+        self._deleted = set()
+
+        self._con = sqlite3.connect(filename, timeout=timeout, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(CREATE_TABLE.format(table=table))
+        self._con.commit()
+
+        self._sql = {
+            "select_version": SELECT_VERSION.format(table=table),
+            "select_item": SELECT_ITEM.format(table=table),
+            "select_keys": SELECT_KEYS.format(table=table),
+            "count": COUNT.format(table=table),
+            "upsert": UPSERT.format(table=table),
+            "insert": INSERT.format(table=table),
+            "update": UPDATE.format(table=table),
+            "delete": DELETE.format(table=table),
+            "delete_all": DELETE_ALL.format(table=table),
+        }
+
+    @staticmethod
+    def serialize(value: ImpExp) -> str:
+        return json.dumps([qualified_name(value.__class__), value.dump()])
+
+    def deserialize(self, info: str) -> ImpExp:
+        _class_name, _item = json.loads(info)
+        _cls = importer(_class_name)
+        if self.init_args and issubclass(_cls, ImpExp):
+            _args = {k: v for k, v in self.init_args.items() if k in _cls.init_args}
+        else:
+            _args = {}
+        return _cls(**_args).load(_item)
+
+    def __getitem__(self, key: str):
+        with self._lock:
+            if key in self._pending:
+                if self._pending[key] is None:
+                    raise KeyError(key)
+                return self._local[key][1]
+
+            _local = self._local.get(key)
+            if _local:
+                _row = self._con.execute(self._sql["select_version"], (key,)).fetchone()
+                if _row is None:
+                    # Removed by someone else
+                    self._stale[key] = self._local.pop(key)
+                    raise KeyError(key)
+                if _row[0] == _local[0]:
+                    return _local[1]
+
+            _row = self._con.execute(self._sql["select_item"], (key,)).fetchone()
+            if _row is None:
+                raise KeyError(key)
+
+            if _local:
+                # Writing the old instance back would undo what someone else has done
+                self._stale[key] = _local
+            _value = self.deserialize(_row[0])
+            self._local[key] = (_row[1], _value)
+            return _value
+
+    def _base_version(self, key: str, value: ImpExp) -> Optional[str]:
+        _stale = self._stale.pop(key, None)
+        if _stale and _stale[1] is value:
+            return _stale[0]
+        _local = self._local.get(key)
+        if _local:
+            return _local[0]
+        return None
+
+    def __setitem__(self, key: str, value: ImpExp):
+        with self._lock:
+            self._put(key, value, self._base_version(key, value))
+
+    def _put(self, key: str, value: ImpExp, base):
+        """
+        :param key: The key
+        :param value: The value
+        :param base: The version the value is based on, None for a new record or ANY_VERSION
+        """
+        with self._lock:
+            if key in self._pending:
+                # What is in the database is still the same. If it is to be removed, this
+                # replaces the removal.
+                _pending = self._pending[key]
+                base = ANY_VERSION if _pending is None else _pending[2]
+            _version = uuid4().hex
+            self._pending[key] = (self.serialize(value), _version, base)
+            self._local[key] = (_version, value)
+            self._changed.add(key)
+            self._deleted.discard(key)
+            if len(self._pending) >= self.batch_size:
+                self.commit()
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._pending[key] = None
+            self._local.pop(key, None)
+            self._stale.pop(key, None)
+            self._deleted.add(key)
+            self._changed.discard(key)
+            if len(self._pending) >= self.batch_size:
+                self.commit()
+
+    def commit(self):
+        """
+        Write all pending changes to the database in one transaction. If any of the records
+        has been changed by someone else nothing is written.
+
+        :raises WriteConflict: If a record has been changed by someone else since it was read.
+            The writes to those records are dropped, the others are still pending.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+
+            _conflicts = []
+            try:
+                with self._con:
+                    for key, val in self._pending.items():
+                        if val is None:
+                            self._con.execute(self._sql["delete"], (key,))
+                            continue
+
+                        _value, _version, _base = val
+                        if _base is ANY_VERSION:
+                            self._con.execute(self._sql["upsert"], (key, _value, _version))
+                            continue
+
+                        if _base is None:
+                            _cursor = self._con.execute(
+                                self._sql["insert"], (key, _value, _version)
+                            )
+                        else:
+                            _cursor = self._con.execute(
+                                self._sql["update"], (_value, _version, key, _base)
+                            )
+                        if _cursor.rowcount != 1:
+                            _conflicts.append(key)
+
+                    if _conflicts:
+                        # Roll back
+                        raise WriteConflict(f"Changed by someone else: {_conflicts}")
+            except WriteConflict:
+                for key in _conflicts:
+                    del self._pending[key]
+                    self._local.pop(key, None)
+                raise
+            self._pending = {}
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key] is not None
+            _row = self._con.execute(self._sql["select_version"], (key,)).fetchone()
+            return _row is not None
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            self.commit()
+            return [row[0] for row in self._con.execute(self._sql["select_keys"])]
+
+    def items(self):
+        for key in self.keys():
+            _value = self.get(key)
+            if _value is not None:
+                yield key, _value
+
+    def values(self):
+        for key, value in self.items():
+            yield value
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.commit()
+            return self._con.execute(self._sql["count"]).fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._deleted.update(self.keys())
+            self._changed = set()
+            self._pending = {}
+            self._local = {}
+            self._stale = {}
+            with self._con:
+                self._con.execute(self._sql["delete_all"])
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self._con.close()
+
+    def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        """Same format as DLDict.dump"""
+        return {
+            k: [qualified_name(v.__class__), v.dump(exclude_attributes=exclude_attributes)]
+            for k, v in self.items()
+        }
+
+    def load(
+        self, spec: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None
+    ) -> "SQLiteDLDict":
+        """Loads information in the format produced by DLDict.dump"""
+        if load_args:
+            _kwargs = {"load_args": load_args}
+        else:
+            _kwargs = {}
+
+        if init_args:
+            _kwargs["init_args"] = init_args
+
+        for key, (_item_cls, _item) in spec.items():
+            _cls = importer(_item_cls)
+
+            if issubclass(_cls, ImpExp) and init_args:
+                _args = {k: v for k, v in init_args.items() if k in _cls.init_args}
+            else:
+                _args = {}
+
+            # Replaces what is stored
+            self._put(key, _cls(**_args).load(_item, **_kwargs), ANY_VERSION)
+
+        self.commit()
+        return self
+
+    def checkpoint(self):
+        """Forget about all changes made so far."""
+        with self._lock:
+            self._changed = set()
+            self._deleted = set()
+
+    def dump_delta(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        """Same format as DLDict.dump_delta"""
+        with self._lock:
+            _set = {}
+            for k in self._changed:
+                _value = self.get(k)
+                if _value is not None:
+                    _set[k] = [
+                        qualified_name(_value.__class__),
+                        _value.dump(exclude_attributes=exclude_attributes),
+                    ]
+            res = {"set": _set, "delete": list(self._deleted)}
+            self.checkpoint()
+        return res
+
+    def apply_delta(
+        self, delta: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None
+    ) -> "SQLiteDLDict":
+        """Applies changes produced by dump_delta."""
+        with self._lock:
+            _changed = set(self._changed)
+            _deleted = set(self._deleted)
+            self.load(delta.get("set", {}), init_args=init_args, load_args=load_args)
+            for key in delta.get("delete", []):
+                if key in self:
+                    del self[key]
+            self.commit()
+            self._changed = _changed
+            self._deleted = _deleted
+        return self
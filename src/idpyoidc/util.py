@@ -147,6 +147,9 @@ def qualified_name(cls):
     :return: fully qualified class name
     """
 
+    if isinstance(cls, type):
+        return cls.__module__ + "." + cls.__name__
+
     try:
         return cls.__module__ + "." + cls.name
     except AttributeError:
@@ -0,0 +1,53 @@
+from idpyoidc import cache as cache_module
+from idpyoidc.cache import LRUCache
+from idpyoidc.time_util import utc_time_sans_frac
+
+
+def test_get_set():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_least_recently_used_evicted():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert "a" in cache
+    assert "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl(monkeypatch):
+    now = utc_time_sans_frac()
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, expires_at=now + 100)
+    monkeypatch.setattr(cache_module, "utc_time_sans_frac", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_disabled():
+    cache = LRUCache(max_size=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_delete_if():
+    cache = LRUCache()
+    cache.set("a", ("diana", "client_1"))
+    cache.set("b", ("diana", "client_2"))
+    cache.set("c", ("bob", "client_1"))
+    assert cache.delete_if(lambda v: v[0] == "diana") == 2
+    assert len(cache) == 1
+    cache.delete("c")
+    assert len(cache) == 0
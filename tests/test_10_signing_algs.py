@@ -0,0 +1,55 @@
+from functools import cmp_to_key
+
+import pytest
+
+from idpyoidc import claims
+from idpyoidc import metadata
+from idpyoidc.node import check_key_defs
+from idpyoidc.node import create_keyjar
+from idpyoidc.node import make_keyjar
+from idpyoidc.server.construct import construct_provider_info
+
+@pytest.mark.parametrize("module", [claims, metadata])
+def test_sort_signing_algs(module):
+    _algs = ["HS256", "EdDSA", "ES256", "PS256", "RS256", "none"]
+    assert sorted(_algs, key=cmp_to_key(module.alg_cmp)) == [
+        "RS256",
+        "ES256",
+        "PS256",
+        "EdDSA",
+        "HS256",
+        "none",
+    ]
+
+
+def test_check_key_defs():
+    check_key_defs(
+        [
+            {"type": "RSA", "key": "", "use": ["sig"]},
+            {"type": "EC", "crv": "P-256", "use": ["sig"]},
+            {"type": "OKP", "crv": "Ed25519", "use": ["sig"]},
+            {"type": "oct", "bytes": 24, "use": ["enc"]},
+        ]
+    )
+    with pytest.raises(ValueError):
+        check_key_defs([{"type": "XYZ", "use": ["sig"]}])
+
+
+def test_create_keyjar_okp():
+    _key_conf = {"key_defs": [{"type": "OKP", "crv": "Ed25519", "use": ["sig"]}]}
+    _keyjar = create_keyjar(key_conf=_key_conf)
+    assert len(_keyjar.get_signing_key("OKP")) == 1
+    assert "EdDSA" in claims.get_signing_algs()
+
+
+def test_make_keyjar_default_okp():
+    _keyjar = make_keyjar(config={}, issuer_id="https://example.com")
+    assert len(_keyjar.get_signing_key("OKP", issuer_id="https://example.com")) == 1
+
+
+def test_construct_provider_info_eddsa():
+    _info = construct_provider_info({"id_token_signing_alg_values_supported": None})
+    _algs = _info["id_token_signing_alg_values_supported"]
+    assert "EdDSA" in _algs
+    assert "none" not in _algs
+    assert _algs.index("PS256") < _algs.index("EdDSA")
@@ -31,3 +31,26 @@ def test_dl_dict():
 
     kb1_copy = _dict_copy["a"]
     assert len(kb1_copy.keys()) == 2
+
+
+def test_dl_dict_delta():
+    _dict = DLDict()
+    _dict["a"] = build_key_bundle(key_conf=KEYSPEC)
+    _dict["b"] = build_key_bundle(key_conf=KEYSPEC)
+    _copy = DLDict().load(_dict.dump())
+    _dict.checkpoint()
+
+    _dict["c"] = build_key_bundle(key_conf=KEYSPEC_2)
+    del _dict["a"]
+
+    delta = _dict.dump_delta()
+    assert set(delta["set"].keys()) == {"c"}
+    assert delta["delete"] == ["a"]
+    # A new checkpoint has been set
+    assert _dict.dump_delta() == {"set": {}, "delete": []}
+
+    _copy.apply_delta(delta)
+    assert set(_copy.keys()) == {"b", "c"}
+    assert len(_copy["c"].keys()) == 3
+    # Applying a delta is not a change
+    assert _copy.dump_delta() == {"set": {}, "delete": []}
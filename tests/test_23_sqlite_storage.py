@@ -0,0 +1,225 @@
+import os
+
+import pytest
+
+from idpyoidc.exception import WriteConflict
+from idpyoidc.server.session.database import Database
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.info import ClientSessionInfo
+from idpyoidc.server.session.info import NodeInfo
+from idpyoidc.server.session.info import UserSessionInfo
+from idpyoidc.server.session.token import AccessToken
+from idpyoidc.storage.sqlite import SQLiteDLDict
+from tests import CRYPT_CONFIG
+
+
+class TestSQLiteDLDict(object):
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.filename = os.path.join(tmp_path, "session.db")
+
+    def test_set_get(self):
+        store = SQLiteDLDict(filename=self.filename)
+        store["diana"] = NodeInfo("diana", subordinate=["diana;;client_1"])
+        assert "diana" in store
+        assert "bob" not in store
+        assert len(store) == 1
+        assert store.keys() == ["diana"]
+
+        _node = store["diana"]
+        assert _node.id == "diana"
+        assert _node.subordinate == ["diana;;client_1"]
+
+        del store["diana"]
+        assert "diana" not in store
+        with pytest.raises(KeyError):
+            _ = store["diana"]
+        assert store.get("diana") is None
+
+    def test_shared(self):
+        store_1 = SQLiteDLDict(filename=self.filename)
+        store_2 = SQLiteDLDict(filename=self.filename)
+
+        store_1["diana"] = NodeInfo("diana")
+        assert store_2["diana"].id == "diana"
+
+        # A change made by one is seen by the other
+        store_1["diana"] = NodeInfo("diana", subordinate=["diana;;client_1"])
+        assert store_2["diana"].subordinate == ["diana;;client_1"]
+
+        del store_2["diana"]
+        assert "diana" not in store_1
+        with pytest.raises(KeyError):
+            _ = store_1["diana"]
+
+    def test_batch(self):
+        store_1 = SQLiteDLDict(filename=self.filename, batch_size=3)
+        store_2 = SQLiteDLDict(filename=self.filename)
+
+        store_1["diana"] = NodeInfo("diana")
+        store_1["bob"] = NodeInfo("bob")
+        # Visible locally but not yet written
+        assert store_1["diana"].id == "diana"
+        assert "diana" not in store_2
+
+        store_1["diana"] = NodeInfo("diana", subordinate=["diana;;client_1"])
+        store_1["eve"] = NodeInfo("eve")
+        assert set(store_2.keys()) == {"diana", "bob", "eve"}
+        assert store_2["diana"].subordinate == ["diana;;client_1"]
+
+        del store_1["bob"]
+        assert "bob" not in store_1
+        assert "bob" in store_2
+        store_1.commit()
+        assert "bob" not in store_2
+
+    def test_write_conflict(self):
+        store_1 = SQLiteDLDict(filename=self.filename)
+        store_2 = SQLiteDLDict(filename=self.filename)
+        store_1["diana"] = NodeInfo("diana")
+
+        _node_1 = store_1["diana"]
+        _node_2 = store_2["diana"]
+        _node_1.add_subordinate("diana;;client_1")
+        store_1["diana"] = _node_1
+        _node_2.add_subordinate("diana;;client_2")
+        with pytest.raises(WriteConflict):
+            store_2["diana"] = _node_2
+
+        # Nothing was lost, the second writer can read and try again
+        _node_2 = store_2["diana"]
+        assert _node_2.subordinate == ["diana;;client_1"]
+        _node_2.add_subordinate("diana;;client_2")
+        store_2["diana"] = _node_2
+        assert store_1["diana"].subordinate == ["diana;;client_1", "diana;;client_2"]
+
+    def test_write_conflict_after_read(self):
+        store_1 = SQLiteDLDict(filename=self.filename)
+        store_2 = SQLiteDLDict(filename=self.filename)
+        store_1["diana"] = NodeInfo("diana")
+
+        _node = store_2["diana"]
+        store_1["diana"] = NodeInfo("diana", subordinate=["diana;;client_1"])
+        # The newer version is read, writing the older one would undo the change
+        assert store_2["diana"] is not _node
+        with pytest.raises(WriteConflict):
+            store_2["diana"] = _node
+
+        # The same goes for a record someone else has removed
+        _node = store_2["diana"]
+        del store_1["diana"]
+        assert "diana" not in store_2
+        with pytest.raises(WriteConflict):
+            store_2["diana"] = _node
+        assert "diana" not in store_1
+
+    def test_write_conflict_new_key(self):
+        store_1 = SQLiteDLDict(filename=self.filename)
+        store_2 = SQLiteDLDict(filename=self.filename, batch_size=3)
+        assert store_2.get("diana") is None
+
+        store_1["diana"] = NodeInfo("diana", subordinate=["diana;;client_1"])
+        store_2["diana"] = NodeInfo("diana", subordinate=["diana;;client_2"])
+        store_2["bob"] = NodeInfo("bob")
+        with pytest.raises(WriteConflict) as err:
+            store_2.commit()
+        assert "diana" in str(err.value)
+        assert store_2["diana"].subordinate == ["diana;;client_1"]
+        # The write that did not conflict is still pending
+        store_2.commit()
+        assert store_1["bob"].id == "bob"
+
+    def test_dump_load(self):
+        store = SQLiteDLDict(filename=self.filename)
+        store["diana"] = UserSessionInfo("diana")
+        store["diana;;client_1"] = ClientSessionInfo("client_1")
+        _dump = store.dump()
+
+        store_2 = SQLiteDLDict(filename=os.path.join(os.path.dirname(self.filename), "2.db"))
+        store_2.load(_dump)
+        assert set(store_2.keys()) == {"diana", "diana;;client_1"}
+        assert isinstance(store_2["diana;;client_1"], ClientSessionInfo)
+
+
+class TestDatabase(object):
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.session_params = {
+            "node_type": ["user", "client", "grant"],
+            "node_info_class": {
+                "user": UserSessionInfo,
+                "client": ClientSessionInfo,
+                "grant": Grant,
+            },
+            "storage": {
+                "class": "idpyoidc.storage.sqlite.SQLiteDLDict",
+                "kwargs": {"filename": os.path.join(tmp_path, "session.db")},
+            },
+        }
+
+    def _db(self):
+        return Database(crypt_config=CRYPT_CONFIG, session_params=self.session_params)
+
+    def test_shared_grant(self):
+        db_1 = self._db()
+        db_2 = self._db()
+        assert isinstance(db_1.db, SQLiteDLDict)
+
+        grant = Grant()
+        grant.add_issued_token(AccessToken("access_token", value="1234567890"))
+        db_1.set(["diana", "client_1", "G1"], grant)
+
+        _grant = db_2.get(["diana", "client_1", "G1"])
+        assert _grant.get_token("1234567890").token_class == "access_token"
+        assert db_2.get(["diana"]).subordinate == ["diana;;client_1"]
+
+        db_1.set(["diana", "client_2", "G2"], Grant())
+        assert db_2.get(["diana"]).subordinate == ["diana;;client_1", "diana;;client_2"]
+
+        db_2.delete(["diana", "client_1", "G1"])
+        with pytest.raises(KeyError):
+            db_1.get(["diana", "client_1"])
+        assert db_1.get(["diana"]).subordinate == ["diana;;client_2"]
+
+    def test_shared_grant_conflict(self):
+        db_1 = self._db()
+        db_2 = self._db()
+        db_1.set(["diana", "client_1", "G1"], Grant())
+
+        # Both workers mint a token from the same grant
+        _grant_1 = db_1.get(["diana", "client_1", "G1"])
+        _grant_2 = db_2.get(["diana", "client_1", "G1"])
+        _grant_1.add_issued_token(AccessToken("access_token", value="1111111111"))
+        _grant_2.add_issued_token(AccessToken("access_token", value="2222222222"))
+        db_1.set(["diana", "client_1", "G1"], _grant_1)
+        with pytest.raises(WriteConflict):
+            db_2.set(["diana", "client_1", "G1"], _grant_2)
+
+        _grant = self._db().get(["diana", "client_1", "G1"])
+        assert _grant.get_token("1111111111") is not None
+        assert _grant.get_token("2222222222") is None
+
+    def test_dump_load_flush(self):
+        db = self._db()
+        db.set(["diana", "client_1", "G1"], Grant())
+        _dump = db.dump()
+
+        db.flush()
+        assert len(db.db) == 0
+
+        db.load(_dump)
+        assert isinstance(db.db, SQLiteDLDict)
+        assert isinstance(db.get(["diana", "client_1", "G1"]), Grant)
+        assert isinstance(self._db().get(["diana", "client_1"]), ClientSessionInfo)
+
+    def test_delta(self):
+        db = self._db()
+        db.set(["diana", "client_1", "G1"], Grant())
+        db.checkpoint()
+
+        db.set(["diana", "client_2", "G2"], Grant())
+        db.delete(["diana", "client_1", "G1"])
+        delta = db.dump_delta()
+        assert set(delta["set"].keys()) == {"diana", "diana;;client_2", "diana;;client_2;;G2"}
+        assert set(delta["delete"]) == {"diana;;client_1", "diana;;client_1;;G1"}
+        assert db.dump_delta() == {"set": {}, "delete": []}
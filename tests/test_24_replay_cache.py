@@ -0,0 +1,114 @@
+import os
+import threading
+
+import pytest
+
+from idpyoidc.server.replay_cache import ReplayCache
+from idpyoidc.server.replay_cache import SQLiteReplayCache
+from idpyoidc.server.replay_cache import first_use
+from idpyoidc.server.replay_cache import init_replay_cache
+from idpyoidc.time_util import utc_time_sans_frac
+
+
+def test_replay_cache():
+    _now = utc_time_sans_frac()
+    cache = ReplayCache(skew=10)
+    assert cache.add("client_1:abc", _now + 60)
+    assert cache.add("client_1:abc", _now + 60) is False
+    assert "client_1:abc" in cache
+    assert cache["client_1:abc"] == _now + 70
+    assert cache.metrics() == {"size": 1, "added": 1, "rejected": 1, "evicted": 0}
+
+
+def test_replay_cache_expire():
+    _now = utc_time_sans_frac()
+    cache = ReplayCache(skew=10, bucket_size=10)
+    for i in range(100):
+        cache.add(f"jti_{i}", _now + i)
+
+    # Nothing is removed before the skew allowance has passed
+    assert cache.remove_expired(_now + 10) == 0
+    assert len(cache._expires) == 100
+    # Every bucket is emptied once
+    _removed = cache.remove_expired(_now + 60)
+    assert 0 < _removed < 100
+    assert cache.remove_expired(_now + 60) == 0
+    assert cache.remove_expired(_now + 200) == 100 - _removed
+    assert cache._buckets == {}
+    assert cache.metrics()["evicted"] == 100
+
+
+def test_replay_cache_dump_load():
+    _now = utc_time_sans_frac()
+    cache = ReplayCache()
+    cache.add("client_1:abc", _now + 60)
+    _cache = ReplayCache(**cache.kwargs)
+    assert _cache.add("client_1:abc", _now + 60) is False
+
+
+def test_replay_cache_threads():
+    _now = utc_time_sans_frac()
+    cache = ReplayCache()
+    _barrier = threading.Barrier(8)
+    _results = []
+
+    def _add():
+        _barrier.wait()
+        for i in range(200):
+            _results.append(cache.add(f"jti_{i}", _now + 60))
+
+    _threads = [threading.Thread(target=_add) for _ in range(8)]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+
+    # Every identifier is accepted once
+    assert _results.count(True) == 200
+    assert cache.metrics() == {"size": 200, "added": 200, "rejected": 1400, "evicted": 0}
+
+
+def test_first_use_dict():
+    _db = {}
+    assert first_use(_db, "client_1:abc")
+    assert first_use(_db, "client_1:abc") is False
+
+
+def test_init_replay_cache(tmp_path):
+    assert isinstance(init_replay_cache(), ReplayCache)
+    _cache = init_replay_cache(
+        {
+            "class": "idpyoidc.server.replay_cache.SQLiteReplayCache",
+            "kwargs": {"filename": os.path.join(tmp_path, "replay.db")},
+        }
+    )
+    assert isinstance(_cache, SQLiteReplayCache)
+
+
+class TestSQLiteReplayCache(object):
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.filename = os.path.join(tmp_path, "replay.db")
+
+    def test_shared(self):
+        _now = utc_time_sans_frac()
+        cache_1 = SQLiteReplayCache(filename=self.filename)
+        cache_2 = SQLiteReplayCache(filename=self.filename)
+
+        assert cache_1.add("client_1:abc", _now + 60)
+        # Seen by the other worker
+        assert cache_2.add("client_1:abc", _now + 60) is False
+        assert "client_1:abc" in cache_2
+        assert len(cache_2) == 1
+        assert cache_2.metrics() == {"size": 1, "added": 0, "rejected": 1, "evicted": 0}
+
+        del cache_2["client_1:abc"]
+        assert "client_1:abc" not in cache_1
+
+    def test_expire(self):
+        _now = utc_time_sans_frac()
+        cache = SQLiteReplayCache(filename=self.filename, skew=0)
+        cache.add("client_1:abc", _now + 60)
+        cache.add("client_1:def", _now + 600)
+        assert cache.remove_expired(_now + 100) == 1
+        assert cache.keys() == ["client_1:def"]
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+from cryptojwt import KeyJar
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.server.client_keys import ClientKeyRefresher
+from idpyoidc.server.client_keys import cache_max_age
+from idpyoidc.server.client_keys import init_client_key_refresher
+
+KEYDEFS = [{"type": "RSA", "key": "", "use": ["sig"]}]
+CLIENT_ID = "client_1"
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        _server = self.server
+        _server.requests += 1
+        _server.release.wait(5)
+        _body = json.dumps(_server.jwks).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", _server.cache_control)
+        self.send_header("Content-Length", str(len(_body)))
+        self.end_headers()
+        self.wfile.write(_body)
+
+    def log_message(self, *args):
+        pass
+
+
+def public_jwks():
+    return build_keyjar(KEYDEFS).export_jwks()
+
+
+@pytest.fixture
+def jwks_server():
+    _server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSHandler)
+    _server.jwks = public_jwks()
+    _server.cache_control = "public, max-age=120"
+    _server.requests = 0
+    _server.release = threading.Event()
+    _server.release.set()
+    _thread = threading.Thread(target=_server.serve_forever, daemon=True)
+    _thread.start()
+    _server.url = f"http://127.0.0.1:{_server.server_address[1]}/jwks.json"
+    yield _server
+    _server.release.set()
+    _server.shutdown()
+    _server.server_close()
+
+
+@pytest.fixture
+def refresher():
+    _refresher = ClientKeyRefresher(max_workers=2, interval=3600, retry_after=60)
+    yield _refresher
+    _refresher.shutdown()
+
+
+def kids(keyjar):
+    # The keys in use
+    return {_key.kid for _key in keyjar.get_issuer_keys(CLIENT_ID) if not _key.inactive_since}
+
+
+def test_cache_max_age():
+    assert cache_max_age(None) is None
+    assert cache_max_age({"Content-Type": "application/json"}) is None
+    assert cache_max_age({"Cache-Control": "public, max-age=600"}) == 600
+    assert cache_max_age({"cache-control": 'max-age="60"'}) == 60
+    assert cache_max_age({"Cache-Control": "no-store"}) == 0
+    assert cache_max_age({"Cache-Control": "max-age=soon"}) is None
+
+
+def test_init_client_key_refresher():
+    assert init_client_key_refresher() is None
+    _refresher = init_client_key_refresher(
+        {"class": "idpyoidc.server.client_keys.ClientKeyRefresher", "kwargs": {"max_workers": 1}}
+    )
+    assert isinstance(_refresher, ClientKeyRefresher)
+    _refresher.shutdown()
+
+
+def test_prefetch(jwks_server, refresher):
+    keyjar = KeyJar()
+    refresher.prefetch({CLIENT_ID: {"jwks_uri": jwks_server.url}, "client_2": {}}, keyjar)
+    assert list(refresher.bundles.keys()) == [CLIENT_ID]
+
+    _bundle = refresher.bundles[CLIENT_ID]
+    assert refresher.schedule(_bundle).result(timeout=5)
+    assert jwks_server.requests == 1
+    assert kids(keyjar) == {_key["kid"] for _key in jwks_server.jwks["keys"]}
+
+    # The Cache-Control header decides when the keys expire
+    assert 100 < _bundle.time_out - time.time() <= 120
+    # Adding the same jwks_uri again changes nothing
+    assert refresher.add(keyjar, CLIENT_ID, jwks_server.url) is _bundle
+    assert len(keyjar.get_issuer_keys(CLIENT_ID)) == 1
+
+
+def test_cache_time_bounds(jwks_server, refresher):
+    jwks_server.cache_control = "no-cache"
+    keyjar = KeyJar()
+    _bundle = refresher.add(keyjar, CLIENT_ID, jwks_server.url, prefetch=False)
+    assert refresher.fetch(_bundle)
+    assert 50 < _bundle.time_out - time.time() <= refresher.min_cache_time
+
+
+def test_stale_keys_are_used_while_refreshing(jwks_server, refresher):
+    keyjar = KeyJar()
+    _bundle = refresher.add(keyjar, CLIENT_ID, jwks_server.url)
+    refresher.schedule(_bundle).result(timeout=5)
+    _old = kids(keyjar)
+
+    # The client rotates its keys and its web server is slow
+    jwks_server.jwks = public_jwks()
+    jwks_server.release.clear()
+    _bundle.time_out = 0
+    assert refresher.due() == [_bundle]
+
+    _start = time.time()
+    assert kids(keyjar) == _old
+    assert time.time() - _start < 1
+    _future = refresher.schedule(_bundle)
+    assert not _future.done()
+
+    jwks_server.release.set()
+    assert _future.result(timeout=5)
+    assert jwks_server.requests == 2
+    _new = {_key["kid"] for _key in jwks_server.jwks["keys"]}
+    assert kids(keyjar) == _new
+    # The replaced keys are kept, but not used
+    assert len(keyjar.get_issuer_keys(CLIENT_ID)) == 2
+
+
+def test_new_jwks_uri(jwks_server, refresher):
+    keyjar = KeyJar()
+    refresher.schedule(refresher.add(keyjar, CLIENT_ID, jwks_server.url)).result(timeout=5)
+    _bundle = refresher.add(keyjar, CLIENT_ID, f"{jwks_server.url}?v=2")
+    refresher.schedule(_bundle).result(timeout=5)
+    assert len(keyjar.return_issuer(CLIENT_ID).get_bundles()) == 1
+    assert refresher.bundles[CLIENT_ID] is _bundle
+
+
+def test_unreachable_jwks_uri(refresher):
+    keyjar = KeyJar(httpc_params={"timeout": 1})
+    _bundle = refresher.add(keyjar, CLIENT_ID, "http://127.0.0.1:1/jwks.json", prefetch=False)
+
+    # Fetched in the calling thread since there are no keys
+    assert keyjar.get_issuer_keys(CLIENT_ID) == []
+    # It is not tried again until retry_after has passed
+    assert _bundle.time_out > time.time() + 50
+    _start = time.time()
+    assert keyjar.get_issuer_keys(CLIENT_ID) == []
+    assert time.time() - _start < 0.1
@@ -1,5 +1,11 @@
+import pytest
+
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.token import COMPACT_TOKEN_MAP
 from idpyoidc.server.session.token import AccessToken
 from idpyoidc.server.session.token import AuthorizationCode
+from idpyoidc.server.session.token import CompactAccessToken
+from idpyoidc.server.session.token import CompactAuthorizationCode
 from idpyoidc.server.session.token import IDToken
 from idpyoidc.time_util import utc_time_sans_frac
 
@@ -104,3 +110,59 @@ def test_is_active_expired():
     token = AccessToken(usage_rules={"max_usage": 2})
     token.expires_at = utc_time_sans_frac() - 60
     assert token.is_active() is False
+
+
+def test_slots():
+    token = AccessToken(value="ABCD")
+    assert not hasattr(token, "__dict__")
+    with pytest.raises(AttributeError):
+        token.foo = "bar"
+
+
+def test_compact_token():
+    token_1 = CompactAccessToken(value="ABCD", scope=["openid", "email"])
+    token_2 = CompactAccessToken(value="EFGH", scope=["openid", "email"])
+    assert not hasattr(token_1, "__dict__")
+    assert isinstance(token_1, AccessToken)
+    assert token_1.scope == ["openid", "email"]
+    # Same scope, same instance
+    assert token_1.scope is token_2.scope
+    assert token_1.claims is token_2.claims
+    assert token_1.resources == []
+    with pytest.raises(TypeError):
+        token_1.scope.append("address")
+    with pytest.raises(TypeError):
+        token_1.claims["foo"] = "bar"
+
+
+def test_compact_code_usage_rules():
+    code_1 = CompactAuthorizationCode(value="ABCD")
+    code_2 = CompactAuthorizationCode(value="EFGH")
+    assert code_1.usage_rules["max_usage"] == 1
+    # Not shared, can be changed
+    assert code_1.usage_rules is not code_2.usage_rules
+    code_1.usage_rules["supports_minting"] = ["access_token"]
+    assert code_2.usage_rules["supports_minting"] == ["access_token", "refresh_token", "id_token"]
+
+    code_1.register_usage()
+    assert code_1.max_usage_reached()
+    assert code_2.is_active()
+
+
+def test_dump_load_compact():
+    test_dump_load(
+        cls=CompactAuthorizationCode,
+        kwargs=dict(
+            value="ABCD",
+            scope=["openid", "foo", "bar"],
+            resources=["https://api.example.com"],
+        ),
+    )
+
+    grant = Grant(token_map=COMPACT_TOKEN_MAP)
+    grant.add_issued_token(CompactAccessToken(value="ABCD", scope=["openid"]))
+    _grant = Grant().load(grant.dump())
+    _token = _grant.get_token("ABCD")
+    assert isinstance(_token, CompactAccessToken)
+    assert _token.scope is grant.issued_token[0].scope
+    assert _grant.token_map == COMPACT_TOKEN_MAP
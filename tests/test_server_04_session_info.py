@@ -1,3 +1,5 @@
+import pytest
+
 from idpyoidc.message.oauth2 import AuthorizationRequest
 from idpyoidc.server.session.info import ClientSessionInfo
 from idpyoidc.server.session.info import NodeInfo
@@ -60,3 +62,26 @@ def test_client_session_info():
 
     _csi2 = ClientSessionInfo().load(_jstr)
     assert _csi2.id == "clientID"
+
+
+def test_subordinate_order_and_dump():
+    si = NodeInfo(subordinate=["c", "a"])
+    si.add_subordinate("b")
+    si.add_subordinate("a")
+    assert si.subordinate == ["c", "a", "b"]
+    assert len(si.subordinate) == 3
+    assert "b" in si.subordinate
+
+    _dump = si.dump()
+    assert _dump["subordinate"] == ["c", "a", "b"]
+    assert isinstance(_dump["subordinate"], list)
+
+    si.remove_subordinate("a")
+    assert si.subordinate == ["c", "b"]
+    with pytest.raises(ValueError):
+        si.remove_subordinate("a")
+
+    si2 = NodeInfo().load(_dump)
+    assert si2.subordinate == ["c", "a", "b"]
+    si2.remove_subordinate("c")
+    assert si2.subordinate == ["a", "b"]
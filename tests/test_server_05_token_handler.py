@@ -3,6 +3,7 @@ import hashlib
 import hmac
 import os
 import secrets
+from unittest import mock
 
 import pytest
 from cryptojwt.jwe.fernet import FernetEncrypter
@@ -12,8 +13,11 @@ from idpyoidc.server import Server
 from idpyoidc.server.configure import OPConfiguration
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.token import is_expired
+from idpyoidc.server.token.exception import UnknownToken
+from idpyoidc.server.token.handle_token import HandleToken
 from idpyoidc.server.token.handler import DefaultToken
 from idpyoidc.server.token.handler import TokenHandler
+from idpyoidc.server.token.handler import token_class_hint
 from idpyoidc.server.token.id_token import IDToken
 from idpyoidc.server.token.jwt_token import JWTToken
 from idpyoidc.time_util import utc_time_sans_frac
@@ -77,6 +81,88 @@ class TestDefaultToken(object):
         assert self.th.is_expired(_token, int(when) + 86400)
 
 
+MAC_KEYS = {"key_defs": [{"type": "oct", "bytes": 32, "kid": "mac1"}]}
+
+
+class TestHandleToken(object):
+    @pytest.fixture(autouse=True)
+    def setup_token_handler(self):
+        self.th = HandleToken(token_class="access_token", lifetime=600, keys=MAC_KEYS)
+
+    def test_info(self):
+        _token = self.th("session_id")
+        assert len(_token) < 60
+        assert token_class_hint(_token) == "access_token"
+        _info = self.th.info(_token)
+        assert _info["sid"] == "session_id"
+        assert _info["token_class"] == "access_token"
+        assert _info["handler"] == self.th
+        assert self.th.is_expired(_token) is False
+        assert self.th.is_expired(_token, utc_time_sans_frac() + 601)
+
+    def test_usage_rules_lifetime(self):
+        _token = self.th("session_id", usage_rules={"expires_in": 30})
+        assert self.th.is_expired(_token, utc_time_sans_frac() + 31)
+
+    def test_tampered(self):
+        _token = self.th("session_id")
+        _char = "A" if _token[-5] != "A" else "B"
+        with pytest.raises(UnknownToken):
+            self.th.info(_token[:-5] + _char + _token[-4:])
+        with pytest.raises(UnknownToken):
+            self.th.info(_token[:-50])
+
+    def test_unknown_handle(self):
+        _token = self.th("session_id")
+        self.th.remove(_token)
+        with pytest.raises(UnknownToken):
+            self.th.info(_token)
+
+    def test_key_rotation(self):
+        _token = self.th("session_id")
+        _keys = {
+            "key_defs": [{"type": "oct", "bytes": 32, "kid": "mac2"}],
+        }
+        _new = HandleToken(token_class="access_token", lifetime=600, keys=_keys)
+        # Handles are kept, the old key is still usable for verification
+        _new.db = self.th.db
+        _new.mac_keys.update(self.th.mac_keys)
+        assert _new.info(_token)["sid"] == "session_id"
+        _new_token = _new("session_id")
+        assert _new_token.startswith("T.mac2")
+        assert _new.info(_new_token)["sid"] == "session_id"
+        # Unknown key
+        with pytest.raises(UnknownToken):
+            self.th.info(_new_token)
+
+    def test_remove_expired(self):
+        self.th("session_1")
+        _forever = HandleToken(token_class="access_token", lifetime=-1, keys=MAC_KEYS)
+        _forever.db = self.th.db
+        _forever.mac_keys = self.th.mac_keys
+        _token = _forever("session_2")
+        assert self.th.remove_expired(utc_time_sans_frac() + 601) == 1
+        assert self.th.info(_token)["sid"] == "session_2"
+
+    def test_expired_removed_on_mint(self):
+        class NoScanDict(dict):
+            def keys(self):
+                raise AssertionError("The storage should not be scanned")
+
+        self.th.db = NoScanDict()
+        _tokens = [self.th(f"session_{n}") for n in range(3)]
+        _later = utc_time_sans_frac() + 600 + 2 * self.th.bucket_size
+        with mock.patch(
+            "idpyoidc.server.token.handle_token.utc_time_sans_frac", return_value=_later
+        ):
+            _token = self.th("session_3")
+
+        assert len(self.th.db) == 1
+        assert self.th.info(_token)["sid"] == "session_3"
+        with pytest.raises(UnknownToken):
+            self.th.info(_tokens[0])
+
+
 class TestTokenHandler(object):
     @pytest.fixture(autouse=True)
     def setup_token_handler(self):
@@ -140,6 +226,29 @@ class TestTokenHandler(object):
     def test_keys(self):
         assert set(self.handler.keys()) == {"access_token", "authorization_code", "refresh_token"}
 
+    def test_direct_dispatch(self):
+        _token = self.handler["refresh_token"]("another_id")
+        assert token_class_hint(_token) == "refresh_token"
+        th, _ = self.handler.get_handler(_token)
+        assert th.token_class == "refresh_token"
+        assert self.handler.dispatch_stats == {"direct": 1, "misdispatch": 0, "fallback": 0}
+
+    def test_legacy_token(self):
+        _token = self.handler["refresh_token"]("another_id")
+        # A token minted before the token class tag was added
+        _legacy = _token[2:]
+        assert token_class_hint(_legacy) is None
+        th, _ = self.handler.get_handler(_legacy)
+        assert th.token_class == "refresh_token"
+        assert self.handler.dispatch_stats["fallback"] == 1
+
+    def test_misdispatch(self):
+        _token = self.handler["refresh_token"]("another_id")
+        _wrong = "T" + _token[1:]
+        th, _ = self.handler.get_handler(_wrong)
+        assert th.token_class == "refresh_token"
+        assert self.handler.dispatch_stats["misdispatch"] == 1
+
 
 KEYDEFS = [
     {"type": "RSA", "key": "", "use": ["sig"]},
@@ -219,6 +328,87 @@ def test_token_handler_from_config():
     assert token_handler.handler["id_token"].lifetime == 300
     assert "base_claims" in token_handler.handler["id_token"].kwargs
 
+    _token = token_handler.handler["refresh_token"]("session_id", aud=["client_1"])
+    assert token_class_hint(_token) == "refresh_token"
+    th, _info = token_handler.get_handler(_token)
+    assert th == token_handler.handler["refresh_token"]
+    assert _info["sid"] == "session_id"
+    assert token_handler.dispatch_stats["direct"] == 1
+
+
+def test_handle_token_from_config():
+    conf = {
+        "issuer": "https://example.com/op",
+        "keys": {"uri_path": "static/jwks.json", "key_defs": KEYDEFS},
+        "endpoint": {
+            "endpoint": {"path": "endpoint", "class": Endpoint, "kwargs": {}},
+        },
+        "token_handler_args": {
+            "code": {
+                "class": "idpyoidc.server.token.handle_token.HandleToken",
+                "kwargs": {"lifetime": 600, "keys": MAC_KEYS},
+            },
+            "token": {
+                "class": "idpyoidc.server.token.handle_token.HandleToken",
+                "kwargs": {"lifetime": 3600, "keys": MAC_KEYS},
+            },
+        },
+        "session_params": SESSION_PARAMS,
+    }
+
+    server = Server(OPConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+    token_handler = server.context.session_manager.token_handler
+    assert isinstance(token_handler.handler["authorization_code"], HandleToken)
+    assert isinstance(token_handler.handler["access_token"], HandleToken)
+
+    _code = token_handler.handler["authorization_code"]("session_id")
+    _token = token_handler.handler["access_token"]("session_id")
+    assert token_handler.info(_code)["token_class"] == "authorization_code"
+    assert token_handler.info(_token)["token_class"] == "access_token"
+    assert token_handler.dispatch_stats["direct"] == 2
+
+
+def test_jwt_token_signer_cache():
+    conf = {
+        "issuer": "https://example.com/op",
+        "keys": {"uri_path": "static/jwks.json", "key_defs": KEYDEFS},
+        "endpoint": {
+            "endpoint": {"path": "endpoint", "class": Endpoint, "kwargs": {}},
+        },
+        "token_handler_args": {
+            "jwks_def": {
+                "private_path": "private/token_jwks.json",
+                "read_only": False,
+                "key_defs": [{"type": "oct", "bytes": "24", "use": ["enc"], "kid": "code"}],
+            },
+            "code": {"kwargs": {"lifetime": 600}},
+            "token": {
+                "class": "idpyoidc.server.token.jwt_token.JWTToken",
+                "kwargs": {"lifetime": 3600},
+            },
+        },
+        "session_params": SESSION_PARAMS,
+    }
+
+    server = Server(OPConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+    handler = server.context.session_manager.token_handler.handler["access_token"]
+
+    _token_1 = handler("session_id", aud=["client_1"])
+    _signer = handler.get_signer(3600, True)
+    _token_2 = handler("session_id", aud=["client_1"])
+    assert handler.get_signer(3600, True) is _signer
+    assert handler.info(_token_1)["sid"] == "session_id"
+    assert handler.info(_token_2)["sid"] == "session_id"
+    assert len(handler.get_verifier().verify_keys) == 1
+
+    # Rotate the keys, the signer is replaced and old tokens can still be verified
+    _keyjar = server.keyjar
+    _keyjar.rotate_keys(KEYDEFS)
+    _token_3 = handler("session_id", aud=["client_1"])
+    assert handler.get_signer(3600, True) is not _signer
+    assert handler.info(_token_1)["sid"] == "session_id"
+    assert handler.info(_token_3)["sid"] == "session_id"
+
 
 @pytest.mark.parametrize(
     "jwks",
@@ -1,3 +1,6 @@
+import os
+from unittest import mock
+
 import pytest
 from cryptojwt.key_jar import build_keyjar
 
@@ -13,6 +16,8 @@ from idpyoidc.server.session.token import AuthorizationCode
 from idpyoidc.server.session.token import SessionToken
 from idpyoidc.server.token import DefaultToken
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from idpyoidc.storage.sqlite import SQLiteDLDict
+from idpyoidc.time_util import utc_time_sans_frac
 
 from . import CRYPT_CONFIG
 from . import full_path
@@ -580,3 +585,195 @@ class TestGrant:
 
         grant.revoke_token(value=access_token.value)
         assert len(grant.issued_token) == 1
+
+    def test_token_index(self):
+        session_id = self._create_session(AREQ)
+        session_info = self.context.session_manager.get_session_info(
+            session_id=session_id, grant=True
+        )
+        grant = session_info["grant"]
+        code = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="authorization_code",
+            token_handler=TOKEN_HANDLER["authorization_code"],
+        )
+
+        access_token = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="access_token",
+            token_handler=TOKEN_HANDLER["access_token"],
+            based_on=code,
+        )
+
+        assert grant.get_token(code.value) is code
+        assert grant.get_token(access_token.value) is access_token
+        assert grant.get_token("unknown") is None
+        assert grant.last_issued_token_of_type("access_token") is access_token
+        assert grant.last_issued_token_of_type("refresh_token") is None
+
+        # Tokens added without going through mint_token are picked up
+        other = SessionToken("access_token", value="1234567890")
+        grant.issued_token.append(other)
+        assert grant.get_token("1234567890") is other
+
+        # The index survives a dump/load cycle
+        _grant_copy = Grant().load(grant.dump())
+        _code = _grant_copy.get_token(code.value)
+        assert _code.id == code.id
+        assert _grant_copy.get_token(access_token.value).based_on == code.value
+
+        _grant_copy.revoke_token(value=code.value, recursive=True)
+        # remove_inactive_token is not set on the copy
+        assert len(_grant_copy.issued_token) == 3
+        assert _grant_copy.get_token(code.value).revoked is True
+        assert _grant_copy.get_token(access_token.value).revoked is True
+        assert _grant_copy.get_token("1234567890").revoked is False
+
+    def test_revoke_removes_from_index(self):
+        session_id = self._create_session(AREQ)
+        session_info = self.context.session_manager.get_session_info(
+            session_id=session_id, grant=True
+        )
+        grant = session_info["grant"]
+        code = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="authorization_code",
+            token_handler=TOKEN_HANDLER["authorization_code"],
+        )
+
+        refresh_token = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="refresh_token",
+            token_handler=TOKEN_HANDLER["refresh_token"],
+            based_on=code,
+        )
+
+        access_token = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="access_token",
+            token_handler=TOKEN_HANDLER["access_token"],
+            based_on=refresh_token,
+        )
+
+        grant.revoke_token(based_on=code.value)
+        assert grant.issued_token == [code]
+        assert grant.get_token(refresh_token.value) is None
+        assert grant.get_token(access_token.value) is None
+        assert grant.last_issued_token_of_type("access_token") is None
+        assert grant.last_issued_token_of_type("authorization_code") is code
+
+    def test_compact_tokens(self):
+        session_id = self._create_session(AREQ)
+        session_info = self.context.session_manager.get_session_info(
+            session_id=session_id, grant=True
+        )
+        grant = session_info["grant"]
+        code = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="authorization_code",
+            token_handler=TOKEN_HANDLER["authorization_code"],
+        )
+
+        access_token = grant.mint_token(
+            session_id,
+            context=self.context,
+            token_class="access_token",
+            token_handler=TOKEN_HANDLER["access_token"],
+            based_on=code,
+        )
+        code.register_usage()
+
+        expired = []
+        for i in range(3):
+            _token = grant.mint_token(
+                session_id,
+                context=self.context,
+                token_class="access_token",
+                token_handler=TOKEN_HANDLER["access_token"],
+                expires_at=utc_time_sans_frac() - 10,
+            )
+            expired.append(_token)
+
+        # The used code is kept since an active token is based on it
+        assert grant.compact_tokens(keep=1) == 2
+        assert grant.issued_token == [code, access_token, expired[-1]]
+        assert grant.get_token(expired[0].value) is None
+
+        access_token.revoked = True
+        assert grant.compact_tokens() == 3
+        assert grant.issued_token == []
+
+    def test_compact_tokens_on_mint(self):
+        self.context.session_manager.token_compaction = {"on_mint": True, "keep": 2}
+        session_id = self._create_session(AREQ)
+        session_info = self.context.session_manager.get_session_info(
+            session_id=session_id, grant=True
+        )
+        grant = session_info["grant"]
+        for i in range(20):
+            code = grant.mint_token(
+                session_id,
+                context=self.context,
+                token_class="authorization_code",
+                token_handler=TOKEN_HANDLER["authorization_code"],
+            )
+            code.register_usage()
+
+        _len = len(grant.issued_token)
+        assert _len <= 6
+
+        assert self.context.session_manager.compact_grants() == _len - 2
+        assert len(grant.issued_token) == 2
+        assert grant.issued_token[-1] is code
+
+    def test_compact_tokens_on_mint_amortized(self):
+        self.context.session_manager.token_compaction = {"on_mint": True, "keep": 2}
+        session_id = self._create_session(AREQ)
+        grant = self.context.session_manager.get_session_info(
+            session_id=session_id, grant=True
+        )["grant"]
+
+        with mock.patch.object(
+            Grant, "compact_tokens", autospec=True, side_effect=Grant.compact_tokens
+        ) as compact_tokens:
+            for i in range(200):
+                code = grant.mint_token(
+                    session_id,
+                    context=self.context,
+                    token_class="authorization_code",
+                    token_handler=TOKEN_HANDLER["authorization_code"],
+                )
+                code.register_usage()
+
+        # Only when the number of tokens has grown enough since the last compaction
+        assert compact_tokens.call_count < 200 // 3
+        assert len(grant.issued_token) <= 6
+
+    def test_compact_grants_sqlite_storage(self, tmp_path):
+        _filename = os.path.join(tmp_path, "session.db")
+        _mngr = self.context.session_manager
+        _mngr.db = SQLiteDLDict(filename=_filename)
+        session_id = self._create_session(AREQ)
+        grant = _mngr.get_session_info(session_id=session_id, grant=True)["grant"]
+        for i in range(3):
+            code = grant.mint_token(
+                session_id,
+                context=self.context,
+                token_class="authorization_code",
+                token_handler=TOKEN_HANDLER["authorization_code"],
+            )
+            code.register_usage()
+        _mngr[session_id] = grant
+
+        assert _mngr.compact_grants(keep=1) == 2
+
+        # What another worker sharing the storage sees
+        _key = _mngr.branch_key(*_mngr.decrypt_branch_id(session_id))
+        _grant = SQLiteDLDict(filename=_filename)[_key]
+        assert [t.value for t in _grant.issued_token] == [code.value]
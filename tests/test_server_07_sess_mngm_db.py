@@ -1,16 +1,23 @@
 # Database is organized in 3 layers. User-session-grant.
+import base64
+import threading
+
 import pytest
 
+from idpyoidc.encrypter import KeyedEncrypter
 from idpyoidc.message.oauth2 import AuthorizationRequest
 from idpyoidc.server.authn_event import create_authn_event
 from idpyoidc.server.exception import NoSuchClientSession
 from idpyoidc.server.exception import NoSuchGrant
 from idpyoidc.server.session.database import Database
 from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.grant_manager import GrantManager
 from idpyoidc.server.session.info import ClientSessionInfo
 from idpyoidc.server.session.info import UserSessionInfo
 from idpyoidc.server.session.manager import public_id
 from idpyoidc.server.session.token import SessionToken
+from idpyoidc.server.util import lv_pack
+from idpyoidc.time_util import utc_time_sans_frac
 from tests import CRYPT_CONFIG
 
 AUTHZ_REQ = AuthorizationRequest(
@@ -268,3 +275,246 @@ class TestDB:
         self.db.delete(["diana"])
         with pytest.raises(KeyError):
             self.db.get(["diana"])
+
+    def test_branch_id_cache(self):
+        grant = Grant()
+        self.db.set(["diana", "client_1", "G1"], grant)
+        branch_id = self.db.encrypted_branch_id("diana", "client_1", "G1")
+
+        assert self.db.decrypt_branch_id(branch_id) == ["diana", "client_1", "G1"]
+        assert self.db.decrypt_branch_id(branch_id) == ["diana", "client_1", "G1"]
+        assert self.db.branch_id_cache.stats()["hits"] == 1
+
+        # Changing the returned path must not change the cached value
+        _path = self.db.decrypt_branch_id(branch_id)
+        _path.append("X")
+        assert self.db.decrypt_branch_id(branch_id) == ["diana", "client_1", "G1"]
+
+        self.db.delete(["diana", "client_1", "G1"])
+        assert branch_id not in self.db.branch_id_cache
+
+    def test_branch_id_cache_delete_sub_tree(self):
+        self.db.set(["diana", "client_1", "G1"], Grant())
+        self.db.set(["diana", "client_2", "G2"], Grant())
+        self.db.set(["bob", "client_1", "G3"], Grant())
+        _ids = [
+            self.db.encrypted_branch_id("diana", "client_1", "G1"),
+            self.db.encrypted_branch_id("diana", "client_2", "G2"),
+            self.db.encrypted_branch_id("bob", "client_1", "G3"),
+        ]
+        for _id in _ids:
+            self.db.decrypt_branch_id(_id)
+
+        self.db.delete_sub_tree("diana")
+        assert len(self.db.branch_id_cache) == 1
+        assert _ids[2] in self.db.branch_id_cache
+
+    def test_delta(self):
+        self.db.set(["diana", "client_1", "G1"], Grant())
+        self.db.set(["bob", "client_1", "G2"], Grant())
+        _copy = Database(crypt_config=CRYPT_CONFIG).load(self.db.dump())
+        self.db.checkpoint()
+
+        grant = self.db.get(["diana", "client_1", "G1"])
+        grant.add_issued_token(SessionToken("access_token", value="1234567890"))
+        self.db.set(["diana", "client_1", "G1"], grant)
+        self.db.delete(["bob", "client_1", "G2"])
+
+        delta = self.db.dump_delta()
+        # Only the changed grant, not the nodes above it
+        assert list(delta["set"].keys()) == ["diana;;client_1;;G1"]
+        assert set(delta["delete"]) == {"bob", "bob;;client_1", "bob;;client_1;;G2"}
+
+        _copy.apply_delta(delta)
+        assert _copy.dump() == self.db.dump()
+        assert _copy.get(["diana", "client_1", "G1"]).get_token("1234567890")
+
+    def test_branch_id_cache_disabled(self):
+        db = Database(crypt_config=CRYPT_CONFIG, session_params={"branch_id_cache": {"max_size": 0}})
+        branch_id = db.encrypted_branch_id("diana", "client_1", "G1")
+        assert db.decrypt_branch_id(branch_id) == ["diana", "client_1", "G1"]
+        assert len(db.branch_id_cache) == 0
+
+    def test_keyed_encrypter_rotation(self):
+        db = Database(
+            crypt_config={
+                "class": "idpyoidc.encrypter.KeyedEncrypter",
+                "kwargs": {
+                    "keys": {"key_defs": [{"type": "OCT", "use": ["enc"], "kid": "one"}]},
+                    "legacy": CRYPT_CONFIG,
+                },
+            },
+            session_params={"branch_id_cache": {"max_size": 0}},
+        )
+        assert isinstance(db.crypt, KeyedEncrypter)
+        _legacy_id = base64.b64encode(db.crypt.legacy.encrypt(lv_pack("rnd", "diana;;client_1")))
+        _old_id = db.encrypted_branch_id("diana", "client_1", "G1")
+        assert db.crypt.key_id(base64.b64decode(_old_id)) == "one"
+
+        db.crypt.rotate(kid="two")
+        _new_id = db.encrypted_branch_id("diana", "client_1", "G1")
+        assert db.crypt.key_id(base64.b64decode(_new_id)) == "two"
+        # Branch IDs created before the rotation are still valid
+        assert db.decrypt_branch_id(_old_id) == ["diana", "client_1", "G1"]
+        assert db.decrypt_branch_id(_new_id) == ["diana", "client_1", "G1"]
+        assert db.decrypt_branch_id(_legacy_id.decode()) == ["diana", "client_1"]
+
+        _reencrypted = db.crypt.reencrypt(base64.b64decode(_old_id))
+        assert db.crypt.is_current(_reencrypted)
+
+        db.crypt.remove_key("one")
+        with pytest.raises(ValueError):
+            db.decrypt_branch_id(_old_id)
+        with pytest.raises(ValueError):
+            db.crypt.remove_key("two")
+
+    def test_keyed_encrypter_dump_load(self):
+        _crypt_config = {"class": "idpyoidc.encrypter.KeyedEncrypter", "kwargs": {}}
+        db = Database(crypt_config=_crypt_config)
+        db.set(["diana", "client_1", "G1"], Grant())
+        _old_id = db.encrypted_branch_id("diana", "client_1", "G1")
+
+        _copy = Database(crypt_config=_crypt_config).load(db.dump())
+        assert _copy.decrypt_branch_id(_old_id) == ["diana", "client_1", "G1"]
+
+        _kid = db.crypt.rotate()
+        _new_id = db.encrypted_branch_id("diana", "client_1", "G1")
+        _copy = Database(crypt_config=_crypt_config).load(db.dump())
+        assert _copy.crypt.kid == _kid
+        assert _copy.decrypt_branch_id(_old_id) == ["diana", "client_1", "G1"]
+        assert _copy.decrypt_branch_id(_new_id) == ["diana", "client_1", "G1"]
+        assert _copy.crypt.is_current(base64.b64decode(_copy.encrypted_branch_id("bob")))
+
+
+class TestExpirySweeper:
+    @pytest.fixture(autouse=True)
+    def setup_environment(self):
+        self.mngr = GrantManager(
+            None,
+            conf={
+                "session_params": {
+                    "encrypter": CRYPT_CONFIG,
+                    "node_type": ["user", "client", "grant"],
+                    "node_info_class": {
+                        "user": UserSessionInfo,
+                        "client": ClientSessionInfo,
+                        "grant": Grant,
+                    },
+                    "expiry_sweeper": {"max_work": 10, "every": 3, "recheck": 100},
+                }
+            },
+        )
+
+    def _add_grant(self, path, expires_at=0):
+        branch_id = self.mngr.add_grant(path)
+        self.mngr[branch_id].expires_at = expires_at
+        return branch_id
+
+    def test_sweep(self):
+        now = utc_time_sans_frac()
+        self._add_grant(["diana", "client_1"], now - 10)
+        self._add_grant(["diana", "client_2"], now + 50)
+        _id = self._add_grant(["bob", "client_1"])
+        assert self.mngr.expiry_sweeper.pending() == 3
+
+        assert self.mngr.sweep(now=now) == 3
+        assert "diana;;client_1" not in self.mngr.db
+        assert "diana;;client_2" in self.mngr.db
+        assert self.mngr[_id]
+        _stats = self.mngr.expiry_sweeper.stats
+        assert _stats["grants_removed"] == 1
+        assert _stats["nodes_removed"] == 1
+
+        # Nothing is due
+        assert self.mngr.sweep(now=now) == 0
+        # The grant that expires is looked at when it has expired
+        assert self.mngr.sweep(now=now + 51) == 1
+        assert "diana" not in self.mngr.db
+        assert self.mngr.expiry_sweeper.stats["nodes_removed"] == 3
+        # The one without expiration time is rechecked
+        assert self.mngr.sweep(now=now + 101) == 1
+        assert self.mngr[_id]
+
+    def test_sweep_revoked(self):
+        _id = self._add_grant(["diana", "client_1"])
+        self._add_grant(["bob", "client_1"])
+        self.mngr.revoke_sub_tree(_id, 0)
+
+        self.mngr.sweep()
+        assert "diana" not in self.mngr.db
+        assert "bob" in self.mngr.db
+
+    def test_sweep_compacts_tokens(self):
+        _id = self._add_grant(["diana", "client_1"])
+        grant = self.mngr[_id]
+        for n in range(3):
+            _token = SessionToken("access_token", value=f"T{n}")
+            if n < 2:
+                _token.revoked = True
+            grant.add_issued_token(_token)
+
+        self.mngr.sweep()
+        assert [t.value for t in self.mngr[_id].issued_token] == ["T2"]
+        assert self.mngr.expiry_sweeper.stats["tokens_removed"] == 2
+
+    def test_sweep_max_work(self):
+        now = utc_time_sans_frac()
+        for n in range(15):
+            self._add_grant([f"user{n}", "client_1"], now - 10)
+
+        assert self.mngr.sweep(now=now) == 10
+        assert self.mngr.sweep(now=now) == 5
+        assert len(self.mngr.db) == 0
+
+    def test_tick(self):
+        now = utc_time_sans_frac()
+        self._add_grant(["diana", "client_1"], now - 10)
+        self.mngr.expiry_sweeper.tick()
+        self.mngr.expiry_sweeper.tick()
+        assert "diana" in self.mngr.db
+        self.mngr.expiry_sweeper.tick()
+        assert "diana" not in self.mngr.db
+
+    def test_tick_interval(self):
+        now = utc_time_sans_frac()
+        _sweeper = self.mngr.expiry_sweeper
+        _sweeper.every = 0
+        _sweeper.interval = 60
+        self._add_grant(["diana", "client_1"], now - 10)
+        _sweeper.tick()
+        assert "diana" in self.mngr.db
+        _sweeper._last_sweep = now - 60
+        _sweeper.tick()
+        assert "diana" not in self.mngr.db
+
+    def test_sweep_holds_database_lock(self):
+        assert self.mngr.expiry_sweeper._lock is self.mngr.lock
+        now = utc_time_sans_frac()
+        self._add_grant(["diana", "client_1"], now - 10)
+
+        _swept = threading.Event()
+
+        def sweep():
+            self.mngr.sweep(now=now)
+            _swept.set()
+
+        with self.mngr.lock:
+            _thread = threading.Thread(target=sweep)
+            _thread.start()
+            # Has to wait for the lock
+            assert not _swept.wait(0.2)
+            assert "diana" in self.mngr.db
+        _thread.join()
+        assert "diana" not in self.mngr.db
+
+    def test_load(self):
+        now = utc_time_sans_frac()
+        self._add_grant(["diana", "client_1"], now - 10)
+        _dump = self.mngr.dump()
+        self.mngr.flush()
+        assert self.mngr.expiry_sweeper.pending() == 0
+
+        self.mngr.load(_dump)
+        assert self.mngr.expiry_sweeper.pending() == 1
+        self.mngr.sweep()
+        assert len(self.mngr.db) == 0
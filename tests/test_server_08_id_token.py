@@ -5,12 +5,16 @@ import pytest
 from cryptojwt import JWT
 from cryptojwt import KeyJar
 from cryptojwt.jws.jws import factory
+from cryptojwt.key_jar import build_keyjar
 
 from idpyoidc.message.oidc import AuthorizationRequest
 from idpyoidc.server import Server
 from idpyoidc.server.authn_event import create_authn_event
 from idpyoidc.server.client_authn import verify_client
+from idpyoidc.server.signing_executor import ProcessSigningExecutor
+from idpyoidc.server.signing_executor import ThreadSigningExecutor
 from idpyoidc.server.token.id_token import get_sign_and_encrypt_algorithms
+from idpyoidc.server.token.id_token import resolve_algorithms
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
 from idpyoidc.server.user_info import UserInfo
 from idpyoidc.time_util import utc_time_sans_frac
@@ -420,6 +424,30 @@ class TestEndpoint(object):
         assert isinstance(res, dict)
         assert res["aud"] == ["client_1"]
 
+    @pytest.mark.parametrize("executor", [ThreadSigningExecutor, ProcessSigningExecutor])
+    @pytest.mark.parametrize("encrypt", [False, True])
+    def test_submit_id_token(self, executor, encrypt):
+        client_keyjar = build_keyjar([{"type": "RSA", "use": ["enc"]}], issuer_id="client_1")
+        if encrypt:
+            self.context.cdb["client_1"]["id_token_encrypted_response_alg"] = "RSA-OAEP"
+            self.context.cdb["client_1"]["id_token_encrypted_response_enc"] = "A128CBC-HS256"
+            _jwks = client_keyjar.export_jwks(issuer_id="client_1")
+            self.server.keyjar.import_jwks(_jwks, "client_1")
+        self.context.signing_executor = executor(max_workers=2)
+        session_id = self._create_session(AREQ)
+        _handler = self.session_manager.token_handler["id_token"]
+        _futures = [_handler.submit(session_id, encrypt=encrypt) for _ in range(3)]
+        _id_tokens = [_future.result() for _future in _futures]
+        self.context.signing_executor.shutdown()
+
+        client_keyjar.import_jwks(self.server.keyjar.export_jwks(), self.context.issuer)
+        _jwt = JWT(key_jar=client_keyjar, iss="client_1")
+        for _id_token in _id_tokens:
+            assert _id_token.count(".") == (4 if encrypt else 2)
+            res = _jwt.unpack(_id_token)
+            assert res["aud"] == ["client_1"]
+            assert res["nonce"] == AREQ["nonce"]
+
     def test_get_sign_algorithm(self):
         client_info = self.context.cdb[AREQ["client_id"]]
         algs = get_sign_and_encrypt_algorithms(
@@ -437,6 +465,35 @@ class TestEndpoint(object):
         # default signing alg
         assert algs == {"sign": True, "encrypt": True, "sign_alg": "RS256"}
 
+    def test_resolve_algorithms_cached(self):
+        algs = resolve_algorithms(self.context, "client_1", "id_token", sign=True)
+        assert algs == {"sign": True, "encrypt": False, "sign_alg": "RS256"}
+        assert ("client_1", "id_token", True, False) in self.context.jwx_cache.db
+
+        # The client's own parameters are checked every time
+        self.context.cdb["client_1"]["id_token_signed_response_alg"] = "ES256"
+        algs = resolve_algorithms(self.context, "client_1", "id_token", sign=True)
+        assert algs["sign_alg"] == "ES256"
+        del self.context.cdb["client_1"]["id_token_signed_response_alg"]
+        algs = resolve_algorithms(self.context, "client_1", "id_token", sign=True)
+        assert algs["sign_alg"] == "RS256"
+
+        # Changes to the server defaults made in place need an invalidation
+        self.context.jwx_def["signing_alg"] = {"id_token": "PS256"}
+        algs = resolve_algorithms(self.context, "client_1", "id_token", sign=True)
+        assert algs["sign_alg"] == "RS256"
+        self.context.jwx_cache.invalidate("client_1")
+        algs = resolve_algorithms(self.context, "client_1", "id_token", sign=True)
+        assert algs["sign_alg"] == "PS256"
+
+        # A new provider info is noticed
+        self.context.jwx_def = {}
+        self.context.provider_info = dict(
+            self.context.provider_info, id_token_signing_alg_values_supported=["ES256"]
+        )
+        algs = resolve_algorithms(self.context, "client_1", "id_token", sign=True)
+        assert algs["sign_alg"] == "ES256"
+
     def test_available_claims(self):
         req = dict(AREQ)
         req["claims"] = {"id_token": {"nickname": {"essential": True}}}
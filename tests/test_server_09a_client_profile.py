@@ -0,0 +1,96 @@
+import pytest
+
+from idpyoidc.server.client_profile import ClientProfile
+from idpyoidc.server.client_profile import ClientProfileCache
+from idpyoidc.server.client_profile import client_profile
+from idpyoidc.server.client_profile import uri_matcher
+from idpyoidc.server.exception import RedirectURIError
+from idpyoidc.server.oauth2.authorization import verify_uri
+from idpyoidc.server.scopes import Scopes
+
+CLIENT_ID = "client_1"
+
+
+class Context(object):
+    def __init__(self):
+        self.cdb = {
+            CLIENT_ID: {
+                "allowed_scopes": ["openid", "email"],
+                "redirect_uris": [
+                    ("https://rp.example.com/cb", {}),
+                    ("https://rp.example.com/cb2", {"foo": ["bar"]}),
+                ],
+                "add_claims": {"always": {"userinfo": ["email"]}},
+            }
+        }
+        self.client_profiles = ClientProfileCache()
+
+
+def test_uri_matcher():
+    assert uri_matcher(None) is None
+    assert uri_matcher(
+        ["https://a.example.com", ("https://b.example.com", {"x": ["1"]}), "https://a.example.com"]
+    ) == {"https://a.example.com": {}, "https://b.example.com": {"x": ["1"]}}
+
+
+def test_client_profile():
+    _context = Context()
+    _profile = client_profile(_context, CLIENT_ID)
+    assert isinstance(_profile, ClientProfile)
+    assert _profile.allowed_scope_set == {"openid", "email"}
+    assert _profile.scopes_to_claims is None
+    assert _profile.uris["post_logout_redirect_uri"] is None
+    assert _profile.add_claims_always == {"userinfo": ["email"]}
+    assert _profile.add_claims_by_scope == {}
+    assert client_profile(_context, "unknown") is None
+
+    # Compiled once
+    assert client_profile(_context, CLIENT_ID) is _profile
+
+    # A new value is noticed
+    _context.cdb[CLIENT_ID]["allowed_scopes"] = ["openid"]
+    _new = client_profile(_context, CLIENT_ID)
+    assert _new is not _profile
+    assert _new.allowed_scope_set == {"openid"}
+
+    # Changes made in place are not, unless the profile is invalidated
+    _context.cdb[CLIENT_ID]["allowed_scopes"].append("email")
+    assert client_profile(_context, CLIENT_ID) is _new
+    _context.client_profiles.invalidate(CLIENT_ID)
+    assert client_profile(_context, CLIENT_ID).allowed_scope_set == {"openid", "email"}
+
+
+def test_scopes():
+    _context = Context()
+    scopes = Scopes(lambda *args: _context)
+    assert scopes.get_allowed_scopes(CLIENT_ID) == ["openid", "email"]
+    assert scopes.filter_scopes(["openid", "profile", "email"], CLIENT_ID) == ["openid", "email"]
+    # Server defaults
+    assert scopes.filter_scopes(["openid", "profile", "xyz"]) == ["openid", "profile"]
+    assert scopes.get_scopes_mapping(CLIENT_ID)["email"] == ["email", "email_verified"]
+
+
+def test_verify_uri():
+    _context = Context()
+    verify_uri(_context, {"redirect_uri": "https://rp.example.com/cb"}, "redirect_uri", CLIENT_ID)
+    verify_uri(
+        _context, {"redirect_uri": "https://rp.example.com/cb2?foo=bar"}, "redirect_uri", CLIENT_ID
+    )
+    with pytest.raises(RedirectURIError):
+        verify_uri(
+            _context, {"redirect_uri": "https://rp.example.com/cb3"}, "redirect_uri", CLIENT_ID
+        )
+    with pytest.raises(ValueError):
+        verify_uri(
+            _context,
+            {"redirect_uri": "https://rp.example.com/cb?foo=bar"},
+            "redirect_uri",
+            CLIENT_ID,
+        )
+    with pytest.raises(RedirectURIError):
+        verify_uri(
+            _context,
+            {"post_logout_redirect_uri": "https://rp.example.com/cb"},
+            "post_logout_redirect_uri",
+            CLIENT_ID,
+        )
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from cryptojwt.jws.jws import factory
 
@@ -11,6 +13,8 @@ from idpyoidc.server.session.info import ClientSessionInfo
 from idpyoidc.server.session.token import AccessToken
 from idpyoidc.server.session.token import AuthorizationCode
 from idpyoidc.server.session.token import RefreshToken
+from idpyoidc.server.signing_executor import SigningExecutor
+from idpyoidc.storage.sqlite import SQLiteDLDict
 from idpyoidc.time_util import utc_time_sans_frac
 
 from . import CRYPT_CONFIG
@@ -714,3 +718,155 @@ class TestSessionManager:
         idt = grant.last_issued_token_of_type("id_token")
 
         assert idt.session_id == id_token_3.session_id
+
+    def _create_user_client_session(self, user_id, client_id):
+        authz_req = AUTH_REQ.copy()
+        authz_req["client_id"] = client_id
+        return self.session_manager.create_session(
+            authn_event=self.authn_event, auth_req=authz_req, user_id=user_id, client_id=client_id
+        )
+
+    def test_revoke_all_for_client(self):
+        _sid_1 = self._create_user_client_session("diana", "client_1")
+        _sid_2 = self._create_user_client_session("bob", "client_1")
+        _sid_3 = self._create_user_client_session("diana", "client_2")
+        _sid_4 = self._create_user_client_session("bob", "client_1")
+
+        assert self.session_manager.revoke_all_for_client("client_1") == 3
+        assert self.session_manager[_sid_1].revoked
+        assert self.session_manager[_sid_2].revoked
+        assert self.session_manager[_sid_4].revoked
+        assert self.session_manager[_sid_3].revoked is False
+        assert self.session_manager.revoke_all_for_client("client_3") == 0
+
+    def test_sessions_for_user(self):
+        _sid_1 = self._create_user_client_session("diana", "client_1")
+        _sid_2 = self._create_user_client_session("diana", "client_2")
+        self._create_user_client_session("bob", "client_1")
+
+        grant = self.session_manager[_sid_1]
+        code = self._mint_token("authorization_code", grant, _sid_1)
+        id_token = self._mint_token("id_token", grant, _sid_1, code)
+
+        _sessions = self.session_manager.sessions_for_user("diana")
+        assert [s["client_id"] for s in _sessions] == ["client_1", "client_2"]
+        assert _sessions[0]["grant"] is grant
+        assert _sessions[0]["id_token"] is id_token
+        assert _sessions[1]["id_token"] is None
+        assert self.session_manager.decrypt_session_id(
+            _sessions[1]["branch_id"]
+        ) == self.session_manager.decrypt_session_id(_sid_2)
+
+        self.session_manager.revoke_grant(_sid_2)
+        assert len(self.session_manager.sessions_for_user("diana")) == 1
+
+        self.session_manager.remove_session(_sid_1)
+        assert self.session_manager.sessions_for_user("diana") == []
+        assert self.session_manager.sessions_for_user("bob")
+
+        # Indexes are rebuilt on load
+        _dump = self.session_manager.dump()
+        self.session_manager.flush()
+        assert self.session_manager.sessions_for_user("bob") == []
+        self.session_manager.load(_dump)
+        assert self.session_manager.sessions_for_user("bob")
+
+    def test_revoke_all_for_client_shared_storage(self, tmp_path):
+        _filename = os.path.join(tmp_path, "session.db")
+        self.session_manager.db = SQLiteDLDict(filename=_filename)
+        _sid_1 = self._create_user_client_session("diana", "client_1")
+        _sid_2 = self._create_user_client_session("bob", "client_1")
+        self._create_user_client_session("diana", "client_2")
+
+        # A worker that shares the storage but did not create the sessions
+        self.session_manager.db = SQLiteDLDict(filename=_filename)
+        self.session_manager._client_index = {}
+        self.session_manager._user_index = {}
+
+        assert {s["client_id"] for s in self.session_manager.sessions_for_user("diana")} == {
+            "client_1",
+            "client_2",
+        }
+        assert self.session_manager.revoke_all_for_client("client_1") == 2
+        assert self.session_manager[_sid_1].revoked
+        assert self.session_manager[_sid_2].revoked
+        assert [s["client_id"] for s in self.session_manager.sessions_for_user("diana")] == [
+            "client_2"
+        ]
+
+    def test_mint_tokens(self):
+        token_usage_rules = self.endpoint_context.authz.usage_rules("client_1")
+        _session_id = self.session_manager.create_session(
+            authn_event=self.authn_event,
+            auth_req=AUTH_REQ,
+            user_id="diana",
+            client_id="client_1",
+            token_usage_rules=token_usage_rules,
+        )
+        grant = self.session_manager[_session_id]
+        code = self._mint_token("authorization_code", grant, _session_id)
+
+        _calls = []
+        _userinfo = self.endpoint_context.userinfo
+
+        def _counting_userinfo(user_id, client_id, **kwargs):
+            _calls.append(user_id)
+            return _userinfo(user_id, client_id, **kwargs)
+
+        self.endpoint_context.userinfo = _counting_userinfo
+        access_token, refresh_token, id_token = grant.mint_tokens(
+            _session_id,
+            self.endpoint_context,
+            [
+                {"token_class": "access_token"},
+                {"token_class": "refresh_token"},
+                {"token_class": "id_token"},
+            ],
+            based_on=code,
+        )
+
+        assert isinstance(access_token, AccessToken)
+        assert isinstance(refresh_token, RefreshToken)
+        assert id_token.token_class == "id_token"
+        assert {access_token.based_on, refresh_token.based_on, id_token.based_on} == {code.value}
+        assert _calls == ["diana"]
+
+        _payload = factory(id_token.value).jwt.payload()
+        assert _payload["email"] == "diana@example.org"
+
+    def test_mint_tokens_signing_executor(self):
+        token_usage_rules = self.endpoint_context.authz.usage_rules("client_1")
+        _session_id = self.session_manager.create_session(
+            authn_event=self.authn_event,
+            auth_req=AUTH_REQ,
+            user_id="diana",
+            client_id="client_1",
+            token_usage_rules=token_usage_rules,
+        )
+        grant = self.session_manager[_session_id]
+        code = self._mint_token("authorization_code", grant, _session_id)
+
+        _issued = []
+
+        class RecordingExecutor(SigningExecutor):
+            def submit(self, jwt, payload, **kwargs):
+                # How many tokens had been issued when this one was handed over
+                _issued.append(len(grant.issued_token))
+                return SigningExecutor.submit(self, jwt, payload, **kwargs)
+
+        self.endpoint_context.signing_executor = RecordingExecutor()
+        _tokens = grant.mint_tokens(
+            _session_id,
+            self.endpoint_context,
+            [
+                {"token_class": "access_token"},
+                {"token_class": "refresh_token"},
+                {"token_class": "id_token"},
+            ],
+            based_on=code,
+        )
+
+        # All three handed to the executor before any of them was issued
+        assert _issued == [1, 1, 1]
+        assert [t.token_class for t in _tokens] == ["access_token", "refresh_token", "id_token"]
+        assert all(grant.get_token(t.value) is t for t in _tokens)
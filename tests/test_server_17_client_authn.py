@@ -22,6 +22,7 @@ from idpyoidc.server.client_authn import ClientSecretPost
 from idpyoidc.server.client_authn import JWSAuthnMethod
 from idpyoidc.server.client_authn import PrivateKeyJWT
 from idpyoidc.server.client_authn import basic_authn
+from idpyoidc.server.client_authn import record_auth_method
 from idpyoidc.server.client_authn import verify_client
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.exception import ClientAuthenticationError
@@ -518,6 +519,29 @@ class TestVerify:
         assert set(res.keys()) == {"method", "client_id"}
         assert res["method"] == "client_secret_post"
 
+    def test_verify_client_records_auth_method_once(self):
+        class CountingDB(dict):
+            writes = 0
+
+            def __setitem__(self, key, value):
+                self.writes += 1
+                dict.__setitem__(self, key, value)
+
+        _cdb = CountingDB({client_id: {"client_secret": client_secret}})
+        self.server.context.cdb = _cdb
+        request = {"client_id": client_id, "client_secret": client_secret}
+        for _ in range(3):
+            res = verify_client(request=request, endpoint=self.server.get_endpoint("endpoint_1"))
+            assert res["method"] == "client_secret_post"
+
+        assert _cdb[client_id]["auth_method"] == {"dict": "client_secret_post"}
+        assert _cdb.writes == 1
+
+        # A new method is recorded
+        record_auth_method(_cdb, client_id, "dict", "client_secret_basic")
+        assert _cdb[client_id]["auth_method"] == {"dict": "client_secret_basic"}
+        assert _cdb.writes == 2
+
     def test_verify_client_jws_authn_method(self):
         client_keyjar = KeyJar()
         client_keyjar.import_jwks(KEYJAR.export_jwks(private=True), CONF["issuer"])
@@ -539,6 +563,30 @@ class TestVerify:
         assert res["method"] == "client_secret_jwt"
         assert res["client_id"] == "client_id"
 
+    def test_client_authn_dispatch(self):
+        _endpoint = self.server.get_endpoint("endpoint_1")
+        _methods = [self.context.client_authn_methods[m] for m in _endpoint.client_authn_method]
+        _dispatch = _endpoint.client_authn_dispatch
+
+        _candidates = _dispatch.candidates(_methods, {"client_id": client_id, "client_secret": "x"})
+        assert [m.tag for m in _candidates] == ["client_secret_post"]
+
+        # Only the method that accepts the signing algorithm of the assertion
+        client_keyjar = KeyJar()
+        client_keyjar.add_symmetric("", client_secret, ["sig"])
+        _jwt = JWT(client_keyjar, iss=client_id, sign_alg="HS256")
+        request = {
+            "client_assertion": _jwt.pack({"aud": ["x"]}),
+            "client_assertion_type": JWT_BEARER,
+        }
+        _candidates = _dispatch.candidates(_methods, request)
+        assert [m.tag for m in _candidates] == ["client_secret_jwt"]
+
+        # Schemes no method looks for all have the same shape
+        _dispatch.candidates(_methods, {}, "Digest abc")
+        _dispatch.candidates(_methods, {}, "Other abc")
+        assert len(_dispatch.table) == 3
+
     def test_verify_client_bearer_body(self):
         request = {"access_token": "1234567890", "client_id": client_id}
         self.context.registration_access_token["1234567890"] = client_id
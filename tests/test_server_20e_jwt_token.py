@@ -4,6 +4,8 @@ import pytest
 from cryptojwt.jwt import JWT
 from cryptojwt.key_jar import init_key_jar
 
+from idpyoidc.message import Message
+from idpyoidc.message.oauth2 import JWTAccessToken
 from idpyoidc.message.oidc import AccessTokenRequest
 from idpyoidc.message.oidc import AuthorizationRequest
 from idpyoidc.server import Server
@@ -18,6 +20,10 @@ from idpyoidc.server.oidc.registration import Registration
 from idpyoidc.server.oidc.session import Session
 from idpyoidc.server.oidc.token import Token
 from idpyoidc.server.scopes import SCOPE2CLAIMS
+from idpyoidc.server.signing_executor import ProcessSigningExecutor
+from idpyoidc.server.signing_executor import SigningExecutor
+from idpyoidc.server.signing_executor import ThreadSigningExecutor
+from idpyoidc.server.token.jwt_token import CompiledProfile
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
 from idpyoidc.time_util import utc_time_sans_frac
 from tests import CRYPT_CONFIG
@@ -295,6 +301,41 @@ class TestEndpoint(object):
         # 4000 seconds in the future. Passed the lifetime.
         assert access_token.is_active(now=utc_time_sans_frac() + 4000) is False
 
+    @pytest.mark.parametrize(
+        "executor", [SigningExecutor, ThreadSigningExecutor, ProcessSigningExecutor]
+    )
+    def test_submit(self, executor):
+        self.context.signing_executor = executor(max_workers=2)
+        session_id = self._create_session(AUTH_REQ)
+        _handler = self.session_manager.token_handler.handler["access_token"]
+
+        _futures = [_handler.submit(session_id, sub="diana") for _ in range(4)]
+        _tokens = [_future.result() for _future in _futures]
+        self.context.signing_executor.shutdown()
+
+        assert len(set(_tokens)) == 4
+        for _token in _tokens:
+            _info = _handler.info(_token)
+            assert _info["sid"] == session_id
+            assert _info["token_class"] == "access_token"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"sub": "diana", "aud": ["a", "b"], "scope": ["openid", "email"], "sid": "s"},
+        {"sub": "diana", "aud": "a", "scope": "openid email", "iat": "1234", "auth_time": 5},
+        {"scope": ["openid email"], "amr": [], "acr": None, "groups": [""], "extra": ""},
+        {"sub": "", "other": [""], "none": None, "empty": [], "info": {"a": 1}},
+        {"message": Message(a=1), "name#en": "Diana", "scope#en": "a b"},
+    ],
+)
+def test_compiled_profile(payload):
+    _compiled = CompiledProfile(JWTAccessToken)
+    # The second time around the template is used
+    for _ in range(2):
+        assert _compiled(payload) == JWTAccessToken(**payload).to_dict()
+
 
 class TestEndpointWebID(object):
     @pytest.fixture(autouse=True)
@@ -287,3 +287,14 @@ class TestCookieHandlerFernetEnc(object):
         assert _c_info[0]["type"] == "sso"
         assert _c_info[1]["value"] == "session_state"
         assert _c_info[1]["type"] == "session"
+
+
+def test_cookie_keyed_encrypter_rotation():
+    cookie_handler = CookieHandler(
+        crypt_config={"class": "idpyoidc.encrypter.KeyedEncrypter", "kwargs": {}}
+    )
+    _old = cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+    cookie_handler.crypt.rotate()
+    _new = cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+    _info = cookie_handler.parse_cookie("idpyoidc.server", [_old, _new])
+    assert [i["value"] for i in _info] == ["value", "value"]
@@ -34,6 +34,7 @@ from idpyoidc.server.oauth2.authorization import get_uri
 from idpyoidc.server.oauth2.authorization import inputs
 from idpyoidc.server.oauth2.authorization import join_query
 from idpyoidc.server.oauth2.authorization import verify_uri
+from idpyoidc.server.signing_executor import SigningExecutor
 from idpyoidc.server.user_info import UserInfo
 from idpyoidc.time_util import in_a_while
 from tests import CRYPT_CONFIG
@@ -499,6 +500,43 @@ class TestEndpoint(object):
         resp = self.endpoint.create_authn_response(request, session_id)
         assert isinstance(resp["response_args"], AuthorizationErrorResponse)
 
+    def test_create_authn_response_code_token(self):
+        request = AuthorizationRequest(
+            client_id="client_id",
+            redirect_uri="https://rp.example.com/cb",
+            response_type=["code", "token"],
+            state="state",
+            scope="openid",
+        )
+
+        _context = self.endpoint.upstream_get("context")
+        _context.cdb["client_id"] = {
+            "client_id": "client_id",
+            "redirect_uris": [("https://rp.example.com/cb", {})],
+            "allowed_scopes": ["openid", "profile", "email", "address", "phone", "offline_access"],
+        }
+
+        # Only RSA keys here
+        _context.session_manager.token_handler.handler["access_token"].alg = "RS256"
+        session_id = self._create_session(request)
+        grant = _context.session_manager[session_id]
+        _issued = []
+
+        class RecordingExecutor(SigningExecutor):
+            def submit(self, jwt, payload, **kwargs):
+                # How many tokens had been issued when the access token was handed over
+                _issued.append(len(grant.issued_token))
+                return SigningExecutor.submit(self, jwt, payload, **kwargs)
+
+        _context.signing_executor = RecordingExecutor()
+        resp = self.endpoint.create_authn_response(request, session_id)
+        _args = resp["response_args"]
+        assert set(_args.keys()).issuperset({"code", "access_token", "token_type"})
+        # Not even the code was issued before the access token was handed to the executor
+        assert _issued == [0]
+        assert grant.get_token(_args["code"]).token_class == "authorization_code"
+        assert grant.get_token(_args["access_token"]).token_class == "access_token"
+
     def test_setup_auth(self):
         request = AuthorizationRequest(
             client_id="client_id",
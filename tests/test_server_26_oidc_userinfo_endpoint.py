@@ -3,6 +3,8 @@ import os
 
 import pytest
 
+from idpyoidc.client.defaults import DEFAULT_OIDC_SERVICES
+from idpyoidc.client.entity import Entity
 from idpyoidc.message.oauth2 import ResponseMessage
 from idpyoidc.message.oidc import AccessTokenRequest
 from idpyoidc.message.oidc import AuthorizationRequest
@@ -28,6 +30,7 @@ from tests import SESSION_PARAMS
 KEYDEFS = [
     {"type": "RSA", "key": "", "use": ["sig"]},
     {"type": "EC", "crv": "P-256", "use": ["sig"]},
+    {"type": "OKP", "crv": "Ed25519", "use": ["sig"]},
 ]
 
 # RESPONSE_TYPES_SUPPORTED = [
@@ -360,6 +363,37 @@ class TestEndpoint(object):
         res = self.endpoint.do_response(request=_req, **args)
         assert res
 
+    def test_do_signed_response_eddsa(self):
+        _context = self.endpoint.upstream_get("context")
+        assert "EdDSA" in _context.provider_info["userinfo_signing_alg_values_supported"]
+        _context.cdb["client_1"]["userinfo_signed_response_alg"] = "EdDSA"
+
+        session_id = self._create_session(AUTH_REQ)
+        grant = self.session_manager[session_id]
+        code = self._mint_code(grant, session_id)
+        access_token = self._mint_token("access_token", grant, session_id, code)
+
+        http_info = {"headers": {"authorization": "Bearer {}".format(access_token.value)}}
+        _req = self.endpoint.parse_request({}, http_info=http_info)
+        args = self.endpoint.process_request(_req)
+        res = self.endpoint.do_response(request=_req, **args)
+        assert ("Content-type", "application/jwt") in res["http_headers"]
+
+        # The RP verifies the signed response with the OP's public keys
+        client = Entity(
+            config={
+                "client_id": "client_1",
+                "redirect_uris": ["https://example.com/cb"],
+                "issuer": _context.issuer,
+            },
+            services=DEFAULT_OIDC_SERVICES,
+            client_type="oidc",
+        )
+        client.keyjar.import_jwks(self.server.keyjar.export_jwks(), _context.issuer)
+        client.get_context().claims.use = {"userinfo_signed_response_alg": "EdDSA"}
+        _info = client.get_service("userinfo")._do_jwt(res["response"])
+        assert _info["sub"] == args["response_args"]["sub"]
+
     def test_scopes_to_claims(self):
         _auth_req = AUTH_REQ.copy()
         _auth_req["scope"] = ["openid", "research_and_scholarship"]
@@ -8,6 +8,7 @@ from cryptojwt import JWT
 from cryptojwt.key_jar import build_keyjar
 from cryptojwt.utils import as_bytes
 
+from idpyoidc.cache import LRUCache
 from idpyoidc.message.oauth2 import TokenIntrospectionRequest
 from idpyoidc.message.oidc import AccessTokenRequest
 from idpyoidc.message.oidc import AuthorizationRequest
@@ -215,6 +216,13 @@ class TestEndpoint:
         self.session_manager = context.session_manager
         self.user_id = "diana"
 
+    @pytest.fixture
+    def info_cache(self):
+        # Same server with verified token information cached
+        _handler = self.session_manager.token_handler
+        _handler.info_cache = LRUCache(max_size=100)
+        return _handler.info_cache
+
     def _create_session(self, auth_req, sub_type="public", sector_identifier=""):
         if sector_identifier:
             authz_req = auth_req.copy()
@@ -492,6 +500,35 @@ class TestEndpoint:
         _resp = self.introspection_endpoint.process_request(_req)
         assert _resp["response_args"]["active"] is False
 
+    def test_cached_info(self, info_cache):
+        access_token = self._get_access_token(AUTH_REQ)
+        _context = self.introspection_endpoint.upstream_get("context")
+
+        for _ in range(2):
+            _req = self.introspection_endpoint.parse_request(
+                {
+                    "token": access_token.value,
+                    "client_id": "client_1",
+                    "client_secret": _context.cdb["client_1"]["client_secret"],
+                }
+            )
+            _resp = self.introspection_endpoint.process_request(_req)
+            assert _resp["response_args"]["active"] is True
+
+        assert info_cache.hits >= 1
+
+        # Revocation is still noticed
+        access_token.revoked = True
+        _req = self.introspection_endpoint.parse_request(
+            {
+                "token": access_token.value,
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        _resp = self.introspection_endpoint.process_request(_req)
+        assert _resp["response_args"]["active"] is False
+
     def test_wrong_aud(self):
         auth_req = AUTH_REQ.copy()
         auth_req["client_id"] = "client_2"
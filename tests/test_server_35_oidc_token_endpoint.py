@@ -329,6 +329,33 @@ class TestEndpoint(_TestEndpoint):
         msg = self.token_endpoint.do_response(request=_req, **_resp)
         assert isinstance(msg, dict)
 
+    def test_process_request_user_info_fetched_once(self):
+        areq = AUTH_REQ.copy()
+        areq["scope"] = ["openid", "profile", "offline_access"]
+        session_id = self._create_session(areq)
+        grant = self.context.authz(session_id, areq)
+        code = self._mint_code(grant, areq["client_id"])
+
+        _calls = []
+
+        def _userinfo(user_id, client_id, **kwargs):
+            _calls.append(user_id)
+            return USERINFO(user_id, client_id, **kwargs)
+
+        self.context.userinfo = _userinfo
+
+        _token_request = TOKEN_REQ_DICT.copy()
+        _token_request["code"] = code.value
+        _req = self.token_endpoint.parse_request(_token_request)
+        _resp = self.token_endpoint.process_request(request=_req)
+
+        assert {"access_token", "refresh_token", "id_token"}.issubset(_resp["response_args"])
+        assert _calls == ["diana"]
+        _payload = self.session_manager.token_handler["access_token"].get_payload(
+            _resp["response_args"]["access_token"]
+        )
+        assert _payload["name"] == "Diana Krall"
+
     def test_process_request_using_private_key_jwt(self):
         session_id = self._create_session(AUTH_REQ)
         grant = self.session_manager[session_id]
@@ -399,6 +426,10 @@ class TestEndpoint(_TestEndpoint):
         msg = self.token_endpoint.do_response(request=_req, **_resp)
         assert isinstance(msg, dict)
 
+    def test_do_refresh_access_token_compact_tokens(self):
+        self.session_manager.compact_tokens = True
+        self.test_do_refresh_access_token()
+
     def test_do_2nd_refresh_access_token(self):
         areq = AUTH_REQ.copy()
         areq["scope"] = ["openid", "offline_access"]
@@ -17,11 +17,16 @@ from idpyoidc.server.configure import ASConfiguration
 from idpyoidc.server.exception import ClientAuthenticationError
 from idpyoidc.server.oauth2.authorization import Authorization
 from idpyoidc.server.oauth2.introspection import Introspection
+from idpyoidc.server.oauth2.revocation_list import TokenRevocationList
 from idpyoidc.server.oauth2.token_revocation import TokenRevocation
 from idpyoidc.server.oauth2.token_revocation import validate_token_revocation_policy
 from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.token.revocation_list import BloomFilter
+from idpyoidc.server.token.revocation_list import RevocationListVerifier
+from idpyoidc.server.token.revocation_list import token_jti
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
 from idpyoidc.server.user_info import UserInfo
+from idpyoidc.storage.sqlite import SQLiteDLDict
 from idpyoidc.time_util import utc_time_sans_frac
 from tests import CRYPT_CONFIG
 from tests import SESSION_PARAMS
@@ -102,6 +107,7 @@ class TestEndpoint:
                         "lifetime": 3600,
                         "add_claims_by_scope": True,
                         "aud": ["https://example.org/appl"],
+                        "revocation_list": {"sweep_every": 10},
                     },
                 },
                 "refresh": {
@@ -136,6 +142,11 @@ class TestEndpoint:
                         "client_authn_method": ["client_secret_post"],
                     },
                 },
+                "revocation_list": {
+                    "path": "{}/revoked",
+                    "class": TokenRevocationList,
+                    "kwargs": {},
+                },
                 "token": {
                     "path": "token",
                     "class": Token,
@@ -190,7 +201,7 @@ class TestEndpoint:
         if jwt_token:
             conf["token_handler_args"]["token"] = {
                 "class": "idpyoidc.server.token.jwt_token.JWTToken",
-                "kwargs": {},
+                "kwargs": {"revocation_list": {}},
             }
         server = Server(ASConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
         endpoint_context = server.context
@@ -221,6 +232,7 @@ class TestEndpoint:
             endpoint_context.issuer,
         )
         self.revocation_endpoint = server.get_endpoint("token_revocation")
+        self.revocation_list_endpoint = server.get_endpoint("revocation_list")
         self.token_endpoint = server.get_endpoint("token")
         self.session_manager = endpoint_context.session_manager
         self.user_id = "diana"
@@ -370,6 +382,114 @@ class TestEndpoint:
         assert "response_msg" in _resp
         assert access_token.revoked
 
+    def test_access_token_sqlite_storage(self, tmp_path):
+        _filename = os.path.join(tmp_path, "session.db")
+        self.session_manager.db = SQLiteDLDict(filename=_filename)
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        session_id = self._create_session(AUTH_REQ)
+        grant = _context.authz(session_id, AUTH_REQ)
+        self.session_manager[session_id] = grant
+        code = self._mint_token("authorization_code", grant, session_id)
+        access_token = self._mint_token("access_token", grant, session_id, code)
+        self.session_manager[session_id] = grant
+
+        _req = self.revocation_endpoint.parse_request(
+            {
+                "token": access_token.value,
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        _resp = self.revocation_endpoint.process_request(_req)
+        assert "response_msg" in _resp
+
+        # What another worker sharing the storage sees
+        _key = self.session_manager.branch_key(*self.session_manager.decrypt_branch_id(session_id))
+        _grant = SQLiteDLDict(filename=_filename)[_key]
+        assert _grant.get_token(access_token.value).revoked
+
+    def test_revocation_list(self):
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        session_id = self._create_session(AUTH_REQ)
+        grant = _context.authz(session_id, AUTH_REQ)
+        self.session_manager[session_id] = grant
+        code = self._mint_token("authorization_code", grant, session_id)
+        tokens = [self._mint_token("access_token", grant, session_id, code) for _ in range(3)]
+
+        # Revoked by the client
+        _req = self.revocation_endpoint.parse_request(
+            {
+                "token": tokens[0].value,
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        self.revocation_endpoint.process_request(_req)
+
+        _req = self.revocation_list_endpoint.parse_request({})
+        _doc = self.revocation_list_endpoint.process_request(_req)["response_args"]
+        assert _doc["since"] == 0
+        assert list(_doc["revoked"].keys()) == [token_jti(tokens[0].value)[0]]
+
+        verifier = RevocationListVerifier()
+        verifier.update(_doc)
+        assert verifier.is_revoked(tokens[0].value)
+        assert verifier.is_revoked(tokens[1].value) is False
+
+        # Everything minted using the code is revoked, only the new ones are in the delta
+        grant.revoke_token(based_on=code.value)
+        _req = self.revocation_list_endpoint.parse_request(f"since={verifier.since}")
+        _doc = self.revocation_list_endpoint.process_request(_req)["response_args"]
+        assert set(_doc["revoked"].keys()) == {token_jti(t.value)[0] for t in tokens[1:]}
+        verifier.update(_doc)
+        assert all(verifier.is_revoked(t.value) for t in tokens)
+
+        _bloom = BloomFilter.from_dict(_doc["bloom"])
+        assert all(token_jti(t.value)[0] in _bloom for t in tokens)
+
+        # A delta from another list can not be applied
+        _doc["id"] = "other"
+        with pytest.raises(ValueError):
+            verifier.update(_doc)
+
+    def test_revocation_list_sqlite_storage(self, tmp_path):
+        _filename = os.path.join(tmp_path, "session.db")
+        self.session_manager.db = SQLiteDLDict(filename=_filename)
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        session_id = self._create_session(AUTH_REQ)
+        grant = _context.authz(session_id, AUTH_REQ)
+        self.session_manager[session_id] = grant
+        code = self._mint_token("authorization_code", grant, session_id)
+        tokens = [self._mint_token("access_token", grant, session_id, code) for _ in range(2)]
+        self.session_manager[session_id] = grant
+
+        # Another worker sharing the storage revokes them
+        self.session_manager.db = SQLiteDLDict(filename=_filename)
+        _grant = self.session_manager[session_id]
+        assert _grant is not grant
+        _grant.revoke_token(based_on=code.value)
+
+        _req = self.revocation_list_endpoint.parse_request({})
+        _doc = self.revocation_list_endpoint.process_request(_req)["response_args"]
+        assert set(_doc["revoked"].keys()) == {token_jti(t.value)[0] for t in tokens}
+
+    def test_revocation_list_after_load(self):
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        session_id = self._create_session(AUTH_REQ)
+        grant = _context.authz(session_id, AUTH_REQ)
+        self.session_manager[session_id] = grant
+        code = self._mint_token("authorization_code", grant, session_id)
+        access_token = self._mint_token("access_token", grant, session_id, code)
+
+        _dump = self.session_manager.dump()
+        self.session_manager.flush()
+        self.session_manager.load(_dump)
+        self.session_manager.revoke_grant(session_id)
+
+        _req = self.revocation_list_endpoint.parse_request({})
+        _doc = self.revocation_list_endpoint.process_request(_req)["response_args"]
+        assert token_jti(access_token.value)[0] in _doc["revoked"]
+
     def test_access_token_per_client(self):
         def custom_token_revocation_policy(token, session_info, **kwargs):
             _token = token
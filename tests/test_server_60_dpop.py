@@ -31,6 +31,15 @@ DPOP_HEADER = (
 )
 
 
+def fresh_dpop_header(iat: int = 0) -> str:
+    """A copy of DPOP_HEADER, signed with a new key and issued now or at iat."""
+    _dpop = DPoPProof().verify_header(DPOP_HEADER)
+    _dpop.key = new_ec_key(crv="P-256")
+    _dpop["jwk"] = _dpop.key.serialize()
+    _dpop["iat"] = iat or utc_time_sans_frac()
+    return _dpop.create_header()
+
+
 def test_verify_header():
     _dpop = DPoPProof()
     assert _dpop.verify_header(DPOP_HEADER)
@@ -223,12 +232,13 @@ class TestEndpoint(object):
         return _code
 
     def test_post_parse_request(self):
+        _header = fresh_dpop_header()
         auth_req = token_post_parse_request(
             AUTH_REQ,
             AUTH_REQ["client_id"],
             self.context,
             http_info={
-                "headers": {"dpop": DPOP_HEADER},
+                "headers": {"dpop": _header},
                 "url": "https://server.example.com/token",
                 "method": "POST",
             },
@@ -236,6 +246,35 @@ class TestEndpoint(object):
         assert auth_req
         assert "dpop_jkt" in auth_req
 
+        # The same proof can't be used twice
+        with pytest.raises(ValueError):
+            token_post_parse_request(
+                AUTH_REQ,
+                AUTH_REQ["client_id"],
+                self.context,
+                http_info={
+                    "headers": {"dpop": _header},
+                    "url": "https://server.example.com/token",
+                    "method": "POST",
+                },
+            )
+
+    @pytest.mark.parametrize("iat", [-301, 61])
+    def test_post_parse_request_iat(self, iat):
+        # Too old to be remembered or too far into the future
+        with pytest.raises(ValueError):
+            token_post_parse_request(
+                AUTH_REQ,
+                AUTH_REQ["client_id"],
+                self.context,
+                http_info={
+                    "headers": {"dpop": fresh_dpop_header(utc_time_sans_frac() + iat)},
+                    "url": "https://server.example.com/token",
+                    "method": "POST",
+                },
+            )
+        assert len(self.context.jti_db) == 0
+
     def test_process_request(self):
         session_id = self._create_session(AUTH_REQ)
         grant = self.session_manager[session_id]
@@ -247,7 +286,7 @@ class TestEndpoint(object):
         _req = self.token_endpoint.parse_request(
             _token_request,
             http_info={
-                "headers": {"dpop": DPOP_HEADER},
+                "headers": {"dpop": fresh_dpop_header()},
                 "url": "https://server.example.com/token",
                 "method": "POST",
             },